@@ -23,6 +23,7 @@ from moviepy.decorators import (
     requires_duration,
     use_clip_fps_by_default,
 )
+from moviepy.FrameCache import FrameCache
 
 
 class Clip:
@@ -59,6 +60,9 @@ class Clip:
         self.memoized_t = None
         self.memoized_frame = None
 
+        self.frame_cache = None
+        self._frame_cache_function = None
+
     def copy(self):
         """Allows the usage of ``.copy()`` in clips as chained methods invocation."""
         return _copy.copy(self)
@@ -77,6 +81,13 @@ class Clip:
 
         """
         # Coming soon: smart error handling for debugging at this point
+        if (
+            self.frame_cache is not None
+            and self._frame_cache_function is self.frame_function
+        ):
+            # The cache only holds frames of the frame function it was attached
+            # with, not those of the clips derived from this one by transforms
+            return self.frame_cache.get_frame(self.frame_function, t)
         if self.memoize:
             if t == self.memoized_t:
                 return self.memoized_frame
@@ -379,6 +390,38 @@ class Clip:
         """
         self.memoize = memoize
 
+    @outplace
+    def with_frame_cache(self, frame_cache=100e6):
+        """Keeps the frames computed by the clip in a least-recently-used cache,
+        so that frames requested several times are only computed once.
+
+        The cache is shared by the copies of the clip (e.g. with a different
+        ``start``), but not used by the clips obtained by transforming the
+        frames of the clip.
+
+        Parameters
+        ----------
+
+        frame_cache : FrameCache or int or None, optional
+          Cache to use, which can be shared by several clips with the same
+          frames, or maximal size in bytes of the frames kept in a new cache.
+          Set to ``None`` to stop caching the frames of the clip.
+
+        Examples
+        --------
+
+        .. code:: python
+
+            clip = clip.with_frame_cache(200e6)
+            clip.get_frame(1)
+            clip.get_frame(1)  # computed once
+            print(clip.frame_cache.hits, clip.frame_cache.misses)
+        """
+        if frame_cache is not None and not isinstance(frame_cache, FrameCache):
+            frame_cache = FrameCache(max_bytes=frame_cache)
+        self.frame_cache = frame_cache
+        self._frame_cache_function = self.frame_function
+
     @convert_parameter_to_seconds(["start_time", "end_time"])
     @apply_to_mask
     @apply_to_audio
@@ -0,0 +1,125 @@
+"""Defines the FrameCache, a cache of the last frames computed by a clip."""
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FrameCache:
+    """Least-recently-used cache of the frames of a clip, with a byte budget.
+
+    Once attached to a clip (see ``Clip.with_frame_cache``), the frames
+    returned by ``clip.get_frame(t)`` are kept in the cache, and given back
+    without being computed again when the same frame is asked for later, as
+    long as they fit in the budget. This avoids decoding the same frames of a
+    video file several times, and restarting the reader, when an effect reads
+    the frames around ``t`` again and again (``SuperSample``,
+    ``TimeSymmetrize``, crossfades...).
+
+    Parameters
+    ----------
+
+    max_bytes : int, optional
+      Maximal total size of the frames kept in the cache, in bytes. The least
+      recently used frames are removed from the cache to stay under this size.
+
+    fps : float, optional
+      If provided, the frames are cached by frame index ``int(fps * t)``,
+      so that all the times of the same frame share one entry. Only use it
+      for clips whose frames change at most ``fps`` times per second, like
+      video files. Otherwise the frames are cached by time ``t``.
+
+    Attributes
+    ----------
+
+    hits : int
+      Number of frames which were found in the cache.
+
+    misses : int
+      Number of frames which were computed and added to the cache.
+
+    nbytes : int
+      Total size of the frames in the cache, in bytes.
+
+    Examples
+    --------
+
+    .. code:: python
+
+        from moviepy import FrameCache, VideoFileClip
+
+        cache = FrameCache(max_bytes=500e6)
+        clip = VideoFileClip("media/chaplin.mp4").with_frame_cache(cache)
+        ...
+        print(cache.hits, cache.misses)
+    """
+
+    # The cache doesn't change the frames of the clips using it, so it is not
+    # part of their fingerprint (see ``moviepy.video.io.render_cache``)
+    _render_cache_ignored = True
+
+    def __init__(self, max_bytes=100e6, fps=None):
+        self.max_bytes = max_bytes
+        self.fps = fps
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return "%s(%d frames, %d/%d bytes, %d hits, %d misses)" % (
+            self.__class__.__name__,
+            len(self),
+            self.nbytes,
+            self.max_bytes,
+            self.hits,
+            self.misses,
+        )
+
+    def key(self, t):
+        """Returns the key of the frame at time ``t`` in the cache."""
+        if self.fps:
+            return int(self.fps * t + 0.00001)
+        return t
+
+    def get_frame(self, frame_function, t):
+        """Returns the frame at time ``t`` from the cache, or computes it with
+        ``frame_function(t)`` and adds it to the cache.
+        """
+        if not np.isscalar(t):
+            # Arrays of times (as requested to audio clips) are not cached
+            return frame_function(t)
+
+        key = self.key(t)
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = frame_function(t)
+        self.add(key, frame)
+        return frame
+
+    def add(self, key, frame):
+        """Adds a frame to the cache, removing the least recently used frames
+        to keep the size of the cache under ``max_bytes``.
+        """
+        nbytes = getattr(frame, "nbytes", None)
+        if nbytes is None or nbytes > self.max_bytes:
+            return
+        if key in self.frames:
+            self.nbytes -= self.frames.pop(key).nbytes
+        while self.frames and self.nbytes + nbytes > self.max_bytes:
+            self.nbytes -= self.frames.popitem(last=False)[1].nbytes
+        self.frames[key] = frame
+        self.nbytes += nbytes
+
+    def clear(self):
+        """Removes all the frames from the cache."""
+        self.frames.clear()
+        self.nbytes = 0
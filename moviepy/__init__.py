@@ -11,6 +11,7 @@ from moviepy.audio.AudioClip import (
 )
 from moviepy.audio.io.AudioFileClip import AudioFileClip
 from moviepy.Effect import Effect
+from moviepy.FrameCache import FrameCache
 from moviepy.tools import convert_to_seconds
 from moviepy.version import __version__
 from moviepy.video import fx as vfx, tools as videotools
@@ -22,6 +23,7 @@ from moviepy.video.compositing.CompositeVideoClip import (
 from moviepy.video.io import ffmpeg_tools
 from moviepy.video.io.display_in_notebook import display_in_notebook
 from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
+from moviepy.video.io.render_cache import RenderCache
 from moviepy.video.io.VideoFileClip import VideoFileClip
 from moviepy.video.VideoClip import (
     BitmapClip,
@@ -60,6 +62,8 @@ __all__ = [
     "concatenate_audioclips",
     "AudioFileClip",
     "Effect",
+    "FrameCache",
+    "RenderCache",
     "vfx",
     "afx",
     "videotools",
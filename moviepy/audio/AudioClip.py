@@ -14,7 +14,7 @@ from moviepy.audio.io.ffmpeg_audiowriter import ffmpeg_audiowrite
 from moviepy.audio.io.ffplay_audiopreviewer import ffplay_audiopreview
 from moviepy.Clip import Clip
 from moviepy.decorators import convert_path_to_string, requires_duration
-from moviepy.tools import extensions_dict
+from moviepy.tools import IntervalTree, extensions_dict
 
 
 class AudioClip(Clip):
@@ -392,6 +392,10 @@ class CompositeAudioClip(AudioClip):
 
         super().__init__(duration=duration, fps=fps)
 
+        # Index of the times of the clips, to only evaluate the clips playing.
+        # It is built again whenever these times change (see frame_function).
+        self._playing_index = None
+
     @property
     def starts(self):
         """Returns starting times for all clips in the composition."""
@@ -404,11 +408,21 @@ class CompositeAudioClip(AudioClip):
 
     def frame_function(self, t):
         """Renders a frame for the composition for the time ``t``."""
-        played_parts = [clip.is_playing(t) for clip in self.clips]
+        times = tuple((clip.start, clip.end) for clip in self.clips)
+        if self._playing_index is None or self._playing_index[0] != times:
+            self._playing_index = (times, IntervalTree(self.starts, self.ends))
+        clips = self.clips
+        index = self._playing_index[1]
+        if isinstance(t, np.ndarray):
+            indices = index.overlapping(t.min(), t.max())
+        else:
+            indices = index.overlapping(t)
+        clips = [clips[i] for i in indices]
+        played_parts = [clip.is_playing(t) for clip in clips]
 
         sounds = [
             clip.get_frame(t - clip.start) * np.array([part]).T
-            for clip, part in zip(self.clips, played_parts)
+            for clip, part in zip(clips, played_parts)
             if (part is not False)
         ]
 
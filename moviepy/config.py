@@ -18,6 +18,10 @@ except ImportError:
 FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg-imageio")
 FFPLAY_BINARY = os.getenv("FFPLAY_BINARY", "auto-detect")
 
+# Directory where the informations read by ffmpeg on the media files are kept
+# between runs. The cache is disabled if not set.
+MOVIEPY_CACHE_DIR = os.getenv("MOVIEPY_CACHE_DIR", None)
+
 IS_POSIX_OS = os.name == "posix"
 
 
@@ -82,6 +86,9 @@ def check():
     else:  # pragma: no cover
         print(f"MoviePy: can't find or access ffplay in '{FFPLAY_BINARY}'.")
 
+    if MOVIEPY_CACHE_DIR:
+        print(f"MoviePy: media informations are cached in '{MOVIEPY_CACHE_DIR}'.")
+
     if DOTENV:
         print(f"\n.env file content at {DOTENV}:\n")
         print(Path(DOTENV).read_text())
@@ -1,5 +1,6 @@
 """Misc. useful functions that can be used at many places in the program."""
 
+import math
 import os
 import platform
 import subprocess as sp
@@ -152,6 +153,9 @@ extensions_dict = {
     "webm": {"type": "video", "codec": ["libvpx"]},
     "avi": {"type": "video"},
     "mov": {"type": "video", "codec": ["libx264", "prores"]},
+    "ts": {"type": "video", "codec": ["libx264", "aac"]},
+    "m3u8": {"type": "video", "codec": ["libx264", "aac"]},
+    "mpd": {"type": "video", "codec": ["libx264", "aac"]},
     "ogg": {"type": "audio", "codec": ["libvorbis"]},
     "mp3": {"type": "audio", "codec": ["libmp3lame"]},
     "wav": {"type": "audio", "codec": ["pcm_s16le", "pcm_s24le", "pcm_s32le"]},
@@ -312,3 +316,88 @@ def compute_position(
 
     # Return as int, rounding if necessary
     return (int(pos[0]), int(pos[1]))
+
+
+class IntervalTree:
+    """Static index of the time intervals ``[start, end)`` of clips, finding
+    the intervals which overlap a time, or a range of times, in
+    ``O(log n + k)`` for ``n`` intervals of which ``k`` overlap it, instead of
+    testing all the intervals.
+
+    Parameters
+    ----------
+
+    starts
+      The starts of the intervals.
+
+    ends
+      The ends of the intervals, ``None`` for intervals without end. Empty
+      intervals never overlap anything.
+    """
+
+    def __init__(self, starts, ends):
+        intervals = [
+            (start, math.inf if end is None else end, index)
+            for index, (start, end) in enumerate(zip(starts, ends))
+            if end is None or end > start
+        ]
+        self.root = self._build(intervals)
+
+    def _build(self, intervals):
+        """Returns the node of the tree holding the intervals, as a tuple
+        ``(center, by_start, by_end, left, right)`` where ``by_start`` and
+        ``by_end`` are the intervals containing ``center`` sorted by start and
+        by decreasing end, ``left`` the node of the intervals ending before
+        ``center`` and ``right`` the node of the ones starting after it.
+        """
+        if not intervals:
+            return None
+        # The median start is contained by its interval, so each node holds
+        # at least one interval and the tree has a depth of O(log n)
+        center = sorted(start for start, _, _ in intervals)[len(intervals) // 2]
+        left, right, middle = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= center:
+                left.append(interval)
+            elif start > center:
+                right.append(interval)
+            else:
+                middle.append(interval)
+        by_start = sorted((start, index) for start, _, index in middle)
+        by_end = sorted(((end, index) for _, end, index in middle), reverse=True)
+        return (center, by_start, by_end, self._build(left), self._build(right))
+
+    def overlapping(self, t_start, t_end=None):
+        """Returns the sorted indices of the intervals ``[start, end)`` which
+        contain the time ``t_start``, or, if ``t_end`` is provided, which
+        overlap the range of times from ``t_start`` to ``t_end``, meaning that
+        ``start <= t_end`` and ``end > t_start``.
+        """
+        if t_end is None:
+            t_end = t_start
+        indices = []
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+            if t_end < center:
+                for start, index in by_start:
+                    if start > t_end:
+                        break
+                    indices.append(index)
+                nodes.append(left)
+            elif t_start >= center:
+                for end, index in by_end:
+                    if end <= t_start:
+                        break
+                    indices.append(index)
+                nodes.append(right)
+            else:
+                indices.extend(index for _, index in by_start)
+                nodes.append(left)
+                nodes.append(right)
+        indices.sort()
+        return indices
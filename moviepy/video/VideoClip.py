@@ -38,7 +38,12 @@ from moviepy.tools import compute_position, extensions_dict, find_extension
 from moviepy.video.fx.Crop import Crop
 from moviepy.video.fx.Resize import Resize
 from moviepy.video.fx.Rotate import Rotate
-from moviepy.video.io.ffmpeg_writer import ffmpeg_write_video
+from moviepy.video.io.ffmpeg_tools import ffmpeg_merge_video_audio
+from moviepy.video.io.ffmpeg_writer import (
+    _output_name,
+    _writes_to_stdout,
+    ffmpeg_write_video,
+)
 from moviepy.video.io.gif_writers import write_gif_with_imageio
 
 
@@ -204,7 +209,7 @@ class VideoClip(Clip):
     @requires_duration
     @use_clip_fps_by_default
     @convert_masks_to_RGB
-    @convert_path_to_string(["filename", "temp_audiofile", "temp_audiofile_path"])
+    @convert_path_to_string(["temp_audiofile", "temp_audiofile_path"])
     def write_videofile(
         self,
         filename,
@@ -226,6 +231,12 @@ class VideoClip(Clip):
         ffmpeg_params=None,
         logger="bar",
         pixel_format=None,
+        n_jobs=1,
+        queue_size=0,
+        audio_mode="prepass",
+        output_format=None,
+        render_cache=None,
+        smart_cut=False,
     ):
         """Write the clip to a videofile.
 
@@ -235,7 +246,12 @@ class VideoClip(Clip):
         filename
           Name of the video file to write in, as a string or a path-like object.
           The extension must correspond to the "codec" used (see below),
-          or simply be '.avi' (which will work with any codec).
+          or simply be '.avi' (which will work with any codec). Can also be a
+          file object open for writing in binary mode (a file, a socket, a
+          ``io.BytesIO``, the standard output...), to which the encoded video is
+          streamed, in which case ``output_format`` must be provided. An
+          extension ``.m3u8`` (or ``.mpd``) writes the video as HLS (or DASH)
+          segments next to the playlist.
 
         fps
           Number of frames per second in the resulting video file. If None is
@@ -318,10 +334,71 @@ class VideoClip(Clip):
 
         logger
           Either ``"bar"`` for progress bar or ``None`` or any Proglog logger.
+          Nothing is logged with ``"bar"`` when the video is written to the
+          standard output.
 
         pixel_format
           Pixel format for the output video file.
 
+        n_jobs
+          Number of processes computing the frames of the clip in parallel,
+          which speeds up the rendering of clips whose frames are slow to
+          compute (effects, compositing...) on multicore computers. The video
+          is split in ``n_jobs`` consecutive segments, each one computed and
+          encoded by a process forked from the current one (so the clip is not
+          copied), and the encoded segments are then joined without encoding
+          them again. The audio is written once, before the video. Only
+          available on platforms where processes can be forked (not Windows).
+
+        queue_size
+          Set to a positive number to have the frames written to ffmpeg by a
+          separate thread, from a queue of at most ``queue_size`` frames, so
+          that the next frames are computed while ffmpeg encodes the previous
+          ones. The time spent computing the frames and writing them to ffmpeg
+          is logged at the end of the writing, to tell which one is the
+          bottleneck.
+
+        audio_mode
+          How the audio of the clip is written. With ``"prepass"`` (default),
+          the audio is written to the temporary audio file before the video is
+          written. With ``"concurrent"``, the audio is written by a separate
+          thread while the video is written to a temporary file without audio,
+          and both are then joined in the final file without encoding them
+          again, so that long clips don't wait for their audio to be written
+          first. With ``"stream"``, the audio is sent to the ffmpeg process
+          writing the video through a second pipe, while the video is written,
+          without any temporary file (not available on Windows, or with a
+          ``render_cache`` or a ``smart_cut``, for which ``"concurrent"`` is
+          used instead). With ``n_jobs``, the audio is always written before
+          the video.
+
+        output_format
+          Container format of the video, like ``"mp4"``, ``"webm"``,
+          ``"mkv"`` or ``"ts"`` (any ffmpeg format name also works). Guessed
+          from the extension of ``filename`` if not provided, but required when
+          ``filename`` is a file object. MP4 and MOV videos written to a file
+          object are fragmented, as they can't be rewritten once finished.
+
+        render_cache
+          A ``RenderCache``, or the path of its directory, where the encoded
+          segments of the video are kept. When the video is written again,
+          the segments whose clips, effects and parameters didn't change are
+          copied from the cache without being computed or encoded again, and
+          only the other ones are rendered (with ``n_jobs`` processes). The
+          video is written to a file, not a file object.
+
+        smart_cut
+          Set to ``True`` to write the clips which are cut lists of video files
+          (subclips of ``VideoFileClip`` without effects, possibly joined with
+          ``concatenate_videoclips``) much faster: the frames of the files
+          between their keyframes are copied without being decoded and encoded
+          again, and only the frames around the cuts (and the frames which are
+          not from the files, like title cards) are encoded, with the codec and
+          pixel format of the files. The files must have the same codec, size
+          and fps, which must be the ones of the written video. Otherwise, all
+          the frames are rendered as usual. The video is written to a file, not
+          a file object.
+
         Examples
         --------
 
@@ -333,9 +410,22 @@ class VideoClip(Clip):
             clip.close()
 
         """
-        name, ext = os.path.splitext(os.path.basename(filename))
-        ext = ext[1:].lower()
+        if hasattr(filename, "write"):
+            if output_format is None:
+                raise ValueError(
+                    "MoviePy error: the output_format must be provided to write "
+                    "a video to a file object."
+                )
+            name, ext = "stream", output_format.lower()
+            if logger == "bar" and _writes_to_stdout(filename):
+                # The messages of the logger would be mixed with the video
+                logger = None
+        else:
+            filename = os.fspath(filename)
+            name, ext = os.path.splitext(os.path.basename(filename))
+            ext = ext[1:].lower()
         logger = proglog.default_bar_logger(logger)
+        output_name = _output_name(filename)
 
         if codec is None:
             try:
@@ -362,19 +452,96 @@ class VideoClip(Clip):
             (audiofile is None) and (audio is True) and (self.audio is not None)
         )
 
+        if audio_mode not in ("prepass", "concurrent", "stream"):
+            raise ValueError(
+                "audio_mode must be 'prepass', 'concurrent' or 'stream', not %r"
+                % audio_mode
+            )
+        if n_jobs > 1:
+            # The audio is written before the processes rendering the video are
+            # forked, as no other thread must be running when they are
+            audio_mode = "prepass"
+        elif audio_mode == "stream" and (
+            os.name == "nt" or render_cache is not None or smart_cut
+        ):
+            audio_mode = "concurrent"
+        if audio_mode == "concurrent" and hasattr(filename, "write"):
+            # A file object can't be rewritten to join the audio to the video
+            audio_mode = "prepass" if os.name == "nt" else "stream"
+
         if make_audio and temp_audiofile:
             # The audio will be the clip's audio
             audiofile = temp_audiofile
-        elif make_audio:
+        elif make_audio and audio_mode != "stream":
             audio_ext = find_extension(audio_codec)
             audiofile = os.path.join(
                 temp_audiofile_path,
                 name + Clip._TEMP_FILES_PREFIX + "wvf_snd.%s" % audio_ext,
             )
+        if make_audio and audio_mode == "stream":
+            logger(message="MoviePy - Building video %s." % output_name)
+            ffmpeg_write_video(
+                self,
+                filename,
+                fps,
+                codec,
+                bitrate=bitrate,
+                preset=preset,
+                write_logfile=write_logfile,
+                audio_codec=audio_codec,
+                threads=threads,
+                ffmpeg_params=ffmpeg_params,
+                logger=logger,
+                pixel_format=pixel_format,
+                queue_size=queue_size,
+                audio_clip=self.audio,
+                audio_fps=audio_fps,
+                audio_nbytes=audio_nbytes,
+                audio_bufsize=audio_bufsize,
+                audio_bitrate=audio_bitrate,
+                output_format=output_format,
+            )
+            logger(message="MoviePy - video ready %s" % output_name)
+            return
+        if make_audio and audio_mode == "concurrent":
+            self._write_videofile_with_concurrent_audio(
+                filename,
+                audiofile,
+                dict(
+                    fps=audio_fps,
+                    nbytes=audio_nbytes,
+                    buffersize=audio_bufsize,
+                    codec=audio_codec,
+                    bitrate=audio_bitrate,
+                    write_logfile=write_logfile,
+                ),
+                dict(
+                    fps=fps,
+                    codec=codec,
+                    bitrate=bitrate,
+                    preset=preset,
+                    write_logfile=write_logfile,
+                    threads=threads,
+                    ffmpeg_params=ffmpeg_params,
+                    logger=logger,
+                    pixel_format=pixel_format,
+                    n_jobs=n_jobs,
+                    queue_size=queue_size,
+                    output_format=output_format,
+                    render_cache=render_cache,
+                    smart_cut=smart_cut,
+                ),
+                os.path.join(
+                    temp_audiofile_path,
+                    name + Clip._TEMP_FILES_PREFIX + "wvf_video.%s" % ext,
+                ),
+                remove_temp=remove_temp,
+                logger=logger,
+            )
+            logger(message="MoviePy - video ready %s" % output_name)
+            return
 
-        # enough cpu for multiprocessing ? USELESS RIGHT NOW, WILL COME AGAIN
-        # enough_cpu = (multiprocessing.cpu_count() > 1)
-        logger(message="MoviePy - Building video %s." % filename)
+        logger(message="MoviePy - Building video %s." % output_name)
         if make_audio:
             self.audio.write_audiofile(
                 audiofile,
@@ -404,12 +571,57 @@ class VideoClip(Clip):
             ffmpeg_params=ffmpeg_params,
             logger=logger,
             pixel_format=pixel_format,
+            n_jobs=n_jobs,
+            queue_size=queue_size,
+            output_format=output_format,
+            render_cache=render_cache,
+            smart_cut=smart_cut,
         )
 
         if remove_temp and make_audio:
             if os.path.exists(audiofile):
                 os.remove(audiofile)
-        logger(message="MoviePy - video ready %s" % filename)
+        logger(message="MoviePy - video ready %s" % output_name)
+
+    def _write_videofile_with_concurrent_audio(
+        self,
+        filename,
+        audiofile,
+        audio_params,
+        video_params,
+        videofile,
+        remove_temp,
+        logger,
+    ):
+        """Writes the audio of the clip to ``audiofile`` in a separate thread
+        while its video is written to ``videofile``, then joins both in
+        ``filename``. See ``write_videofile`` (``audio_mode="concurrent"``).
+        """
+        audio_errors = []
+
+        def write_audio():
+            try:
+                self.audio.write_audiofile(audiofile, logger=None, **audio_params)
+            except BaseException as error:
+                audio_errors.append(error)
+
+        logger(message="MoviePy - Building video %s." % filename)
+        audio_thread = threading.Thread(target=write_audio, daemon=True)
+        audio_thread.start()
+        try:
+            ffmpeg_write_video(self, videofile, **video_params)
+        finally:
+            audio_thread.join()
+        try:
+            if audio_errors:
+                raise audio_errors[0]
+            logger(message="MoviePy - Joining the video and the audio.")
+            ffmpeg_merge_video_audio(videofile, audiofile, filename, logger=None)
+        finally:
+            if remove_temp:
+                for temp_filename in (videofile, audiofile):
+                    if os.path.exists(temp_filename):
+                        os.remove(temp_filename)
 
     @requires_duration
     @use_clip_fps_by_default
@@ -717,50 +929,69 @@ class VideoClip(Clip):
             post_array = np.hstack((post_array, x_1))
         return post_array
 
-    def compose_on(
-        self, background: np.ndarray, t, background_mask: Union[np.ndarray, None] = None
-    ) -> Tuple[np.ndarray, Union[np.ndarray, None]]:
-        """Returns the result of the clip's frame at time `t` on top
-        on the given `picture`, the position of the clip being given
-        by the clip's ``pos`` attribute. Meant for compositing.
-
-        If the clip/backgrounds have transparency the transparency will
-        be accounted for.
-
-        The return is either a numpy array for image with no transparency or
-        a tuple (image, mask) for image with transparency
-
-        Parameters
-        ----------
-        background: (np.ndarray)
-          The background image to apply current clip on top of
-          if the background image is transparent it must be given as a RGBA image
-
-        t: (float)
-          The time of clip to apply on top of clip
-
-        background_mask: (np.ndarray|None), default None
-          The background mask to apply current clip on top of
-          if the background image is transparent it must be given as a mask
-          if None, the background is assumed to be fully opaque
-
-
-        Return
-        -------
-        (np.ndarray, np.ndarray|None)
-          A tuple with the new image and a mask if applicable, or None
-
+    def constant_opacity(self) -> Union[float, None]:
+        """Returns the opacity of the clip if it is known to be the same in all
+        its pixels and at all times, without computing any frame of its mask,
+        or None if it may vary.
 
+        Clips without mask are opaque (opacity 1). The masks of image clips
+        (including the ones of ``ColorClip`` and ``with_mask()``) and of
+        ``with_opacity`` have a known constant opacity, as long as no effect
+        changes their frames. The compositing skips the masks of opaque clips,
+        and blends the clips of constant opacity with a single value.
+        """
+        if self.mask is None:
+            return 1.0
+        size = getattr(self, "size", None)
+        if size is None or tuple(getattr(self.mask, "size", ())) != tuple(size):
+            return None
+        return self.mask._constant_frame_value()
+
+    def _constant_frame_value(self):
+        """Returns the value of all the pixels of all the frames of the mask
+        clip if it's known, else None.
+        """
+        constant = getattr(self, "_constant_frame", None)
+        if constant is not None and constant[1] is self.frame_function:
+            return constant[0]
+        return None
+
+    def _chain_concatenation(self):
+        """Returns the timings and the clips of a clip made by
+        ``concatenate_videoclips(method="chain")``, whose frames were not
+        transformed since, or ``None`` for other clips.
+        """
+        concatenation = getattr(self, "_concatenation", None)
+        if concatenation is not None and concatenation[2] is self.frame_function:
+            return concatenation[:2]
+        return None
+
+    def _compose_region(self, t, background_size):
+        """Returns the region of the clip's frame at time ``t`` seen on a
+        background of the given size, with its opacity and the region of the
+        background it covers, for the compositing with ``compose_on`` and
+        ``compose_premultiplied_on``, or None if the clip is invisible or out
+        of the background.
+
+        The opacity is None if the region is opaque, else a float32 value or an
+        array of float32 of the size of the region.
         """
         ct = t - self.start  # clip time
 
         # GET IMAGE AND MASK IF ANY
         clip_frame = self.get_frame(ct).astype("uint8")
-        background_height, background_width = background.shape[:2]
+        background_width, background_height = background_size
         clip_height, clip_width = clip_frame.shape[:2]
         clip_mask = None
 
-        if self.mask is not None:
+        # The frames of the masks of known constant opacity are not computed
+        opacity = None
+        if tuple(getattr(self, "size", ())) == (clip_width, clip_height):
+            opacity = self.constant_opacity()
+        if opacity == 0:
+            return None
+
+        if self.mask is not None and opacity is None:
             # Clip mask normalize to 0 (fully transparent) to 1 (fully opaque)
             clip_mask = self.mask.get_frame(ct)
 
@@ -794,6 +1025,8 @@ class VideoClip(Clip):
         y2_bg = min(y_start + clip_height, background_height)
         x1_bg = max(x_start, 0)
         x2_bg = min(x_start + clip_width, background_width)
+        if y2_bg <= y1_bg or x2_bg <= x1_bg:
+            return None
 
         # Corresponding source region in clip
         y1_clip = max(-y_start, 0)
@@ -801,48 +1034,104 @@ class VideoClip(Clip):
         x1_clip = max(-x_start, 0)
         x2_clip = x1_clip + (x2_bg - x1_bg)
 
-        # We will ignore any mask with no transparency so we only ever compute mask
-        # if really necessary
-        if background_mask is not None and np.min(background_mask) == 1:
-            background_mask = None
+        # We will ignore any mask with no transparency in the region of the
+        # clip, so we only ever compute with masks if really necessary
+        clip_alpha = None
+        if opacity is not None:
+            if opacity < 1:
+                clip_alpha = np.float32(opacity)
+        elif clip_mask is not None:
+            clip_alpha = clip_mask[y1_clip:y2_clip, x1_clip:x2_clip]
+            if np.min(clip_alpha) == 1:
+                clip_alpha = None
+            else:
+                clip_alpha = clip_alpha.astype(np.float32, copy=False)
 
-        if clip_mask is not None and np.min(clip_mask) == 1:
-            clip_mask = None
+        frame = clip_frame[y1_clip:y2_clip, x1_clip:x2_clip]
+        region = (slice(y1_bg, y2_bg), slice(x1_bg, x2_bg))
+        return frame, clip_alpha, region
+
+    def compose_on(
+        self,
+        background: np.ndarray,
+        t,
+        background_mask: Union[np.ndarray, None] = None,
+        inplace: bool = False,
+    ) -> Tuple[np.ndarray, Union[np.ndarray, None]]:
+        """Returns the result of the clip's frame at time `t` on top
+        on the given `picture`, the position of the clip being given
+        by the clip's ``pos`` attribute. Meant for compositing.
+
+        If the clip/backgrounds have transparency the transparency will
+        be accounted for.
+
+        The return is either a numpy array for image with no transparency or
+        a tuple (image, mask) for image with transparency
+
+        Parameters
+        ----------
+        background: (np.ndarray)
+          The background image to apply current clip on top of
+          if the background image is transparent it must be given as a RGBA image
+
+        t: (float)
+          The time of clip to apply on top of clip
+
+        background_mask: (np.ndarray|None), default None
+          The background mask to apply current clip on top of
+          if the background image is transparent it must be given as a mask
+          if None, the background is assumed to be fully opaque
+
+        inplace: (bool), default False
+          If True, the clip is blended directly in ``background`` and
+          ``background_mask``, which are returned, instead of in copies of
+          them. Only the region covered by the clip is modified.
+
+
+        Return
+        -------
+        (np.ndarray, np.ndarray|None)
+          A tuple with the new image and a mask if applicable, or None
 
-        # Copy the background to avoid modifying the original
-        bg_copy = background.copy()
 
+        """
+        # Copy the background to avoid modifying the original
+        bg_copy = background if inplace else background.copy()
+        bg_mask_copy = None
         if background_mask is not None:
-            bg_mask_copy = background_mask.copy()
+            bg_mask_copy = background_mask if inplace else background_mask.copy()
 
-        # If neither background nor clip have a mask, we can just paste clip on top
-        if background_mask is None and clip_mask is None:
-            bg_copy[y1_bg:y2_bg, x1_bg:x2_bg] = clip_frame[
-                y1_clip:y2_clip, x1_clip:x2_clip
-            ]
-            return (bg_copy, None)
+        background_height, background_width = background.shape[:2]
+        clip_region = self._compose_region(t, (background_width, background_height))
+        # Nothing to blend if the clip is invisible or out of the background
+        if clip_region is None:
+            return (bg_copy, bg_mask_copy)
+        frame, clip_alpha, region = clip_region
+
+        opaque_background = (
+            background_mask is None or np.min(background_mask[region]) == 1
+        )
 
-        # If clip has no alpha layer, we can compute final clip
+        # If the clip has no alpha layer, we can compute final clip
         # by replacing the background region with the clip region
         # and fill the region mask with 1
-        if clip_mask is None:
-            bg_copy[y1_bg:y2_bg, x1_bg:x2_bg] = clip_frame[
-                y1_clip:y2_clip, x1_clip:x2_clip
-            ]
-            bg_mask_copy[y1_bg:y2_bg, x1_bg:x2_bg] = np.ones(
-                (y2_bg - y1_bg, x2_bg - x1_bg), dtype=np.float32
-            )
+        if clip_alpha is None:
+            bg_copy[region] = frame
+            if bg_mask_copy is not None:
+                bg_mask_copy[region] = 1
             return (bg_copy, bg_mask_copy)
 
-        # If background has no alpha layer, we can compute final color
-        # accounting for transparency and return a result with no transparency
-        if background_mask is None:
-            # Extract regions, convert to float32 instead of letting numpy go for float64
-            frame = clip_frame[y1_clip:y2_clip, x1_clip:x2_clip].astype(np.float32)
-            bg = bg_copy[y1_bg:y2_bg, x1_bg:x2_bg].astype(np.float32)
-            alpha = clip_mask[y1_clip:y2_clip, x1_clip:x2_clip][..., None].astype(
-                np.float32
-            )
+        if not np.isscalar(clip_alpha):
+            clip_alpha = clip_alpha[..., None]
+
+        # If the background has no alpha layer in the region of the clip, we can
+        # compute final color accounting for transparency, and the region stays
+        # opaque
+        if opaque_background:
+            # Convert regions to float32 instead of letting numpy go for float64
+            frame = frame.astype(np.float32)
+            bg = bg_copy[region].astype(np.float32)
+            alpha = clip_alpha
 
             # To understand the math, think in "passing light" (see self.compose_mask)
             # if first layer is 100% opacity with 100 red photons, 0 green, 0 blue [100, 0, 0]
@@ -853,8 +1142,8 @@ class VideoClip(Clip):
             result = frame * alpha + bg * (1 - alpha)
 
             # Finally we update the regions with result back to int
-            bg_copy[y1_bg:y2_bg, x1_bg:x2_bg] = result.astype(np.uint8)
-            return (bg_copy, None)
+            bg_copy[region] = result.astype(np.uint8)
+            return (bg_copy, bg_mask_copy)
 
         # For images with alpha layer on both clip and background
         # we must compute both new color and new mask
@@ -880,28 +1169,74 @@ class VideoClip(Clip):
         # again we get aB + aA * (1 - aB)
         # at the end we must divide color by resulting alpha to keep true colors
 
-        # Extract regions, convert to float32 instead of letting numpy go for float64
-        frame = clip_frame[y1_clip:y2_clip, x1_clip:x2_clip].astype(np.float32)
-        bg = bg_copy[y1_bg:y2_bg, x1_bg:x2_bg].astype(np.float32)
-        alpha_clip = clip_mask[y1_clip:y2_clip, x1_clip:x2_clip].astype(np.float32)
-        alpha_bg = background_mask[y1_bg:y2_bg, x1_bg:x2_bg].astype(np.float32)
-
-        # Ensure alpha channels have the right shape for broadcasting
-        if alpha_clip.ndim == 2:
-            alpha_clip = alpha_clip[..., None]
-        if alpha_bg.ndim == 2:
-            alpha_bg = alpha_bg[..., None]
+        # Convert regions to float32 instead of letting numpy go for float64
+        frame = frame.astype(np.float32)
+        bg = bg_copy[region].astype(np.float32)
+        alpha_clip = clip_alpha
+        alpha_bg = background_mask[region][..., None].astype(np.float32)
 
         final_alpha = alpha_clip + alpha_bg * (1 - alpha_clip)
         safe_alpha = np.where(final_alpha == 0, 1.0, final_alpha)
         result = (frame * alpha_clip + bg * alpha_bg * (1 - alpha_clip)) / safe_alpha
 
-        bg_copy[y1_bg:y2_bg, x1_bg:x2_bg] = np.round(result).astype(np.uint8)
+        bg_copy[region] = np.round(result).astype(np.uint8)
 
-        bg_mask_copy[y1_bg:y2_bg, x1_bg:x2_bg] = final_alpha.squeeze()
+        bg_mask_copy[region] = final_alpha[..., 0]
         return (bg_copy, bg_mask_copy)
 
-    def compose_mask(self, background_mask: np.ndarray, t: float) -> np.ndarray:
+    def compose_premultiplied_on(
+        self, color: np.ndarray, t, alpha: Union[np.ndarray, None] = None
+    ) -> None:
+        """Blends the clip's frame at time `t` over the given accumulators of
+        premultiplied colors and opacities, in place, the position of the clip
+        being given by the clip's ``pos`` attribute. Meant for compositing with
+        ``CompositeVideoClip(..., premultiplied_alpha=True)``.
+
+        The colors are kept in float32 and premultiplied by their opacity, so
+        that blending a layer is the single operation
+        ``color = clip_color * clip_alpha + color * (1 - clip_alpha)``, without
+        any division or rounding, which are done once at the end of the
+        composition.
+
+        Parameters
+        ----------
+        color: (np.ndarray)
+          The float32 accumulator of the premultiplied colors of the layers
+          below the clip, of shape (height, width, 3).
+
+        t: (float)
+          The time of clip to apply on top of clip
+
+        alpha: (np.ndarray|None), default None
+          The float32 accumulator of the opacities of the layers below the clip,
+          of shape (height, width), or None if they are fully opaque.
+        """
+        background_height, background_width = color.shape[:2]
+        clip_region = self._compose_region(t, (background_width, background_height))
+        if clip_region is None:
+            return
+        frame, clip_alpha, region = clip_region
+        color_region = color[region]
+        alpha_region = None if alpha is None else alpha[region]
+
+        if clip_alpha is None:
+            color_region[...] = frame
+            if alpha_region is not None:
+                alpha_region[...] = 1
+            return
+
+        # color + (clip_color - color) * clip_alpha, computed in a single
+        # float32 temporary array
+        difference = frame.astype(np.float32)
+        difference -= color_region
+        difference *= clip_alpha if np.isscalar(clip_alpha) else clip_alpha[..., None]
+        color_region += difference
+        if alpha_region is not None:
+            alpha_region += (1 - alpha_region) * clip_alpha
+
+    def compose_mask(
+        self, background_mask: np.ndarray, t: float, inplace: bool = False
+    ) -> np.ndarray:
         """Returns the result of the clip's mask at time `t` composited
         on the given `background_mask`, the position of the clip being given
         by the clip's ``pos`` attribute. Meant for compositing.
@@ -915,13 +1250,23 @@ class VideoClip(Clip):
 
         t:
           The time position in the clip at which to extract the mask.
+
+        inplace:
+          If True, the clip mask is composited directly in ``background_mask``,
+          which is returned, instead of in a copy of it.
         """
         ct = t - self.start  # clip time
-        clip_mask = self.get_frame(ct).astype("float")
+
+        # The frames of masks of known constant value are not computed
+        value = self._constant_frame_value()
+        if value is None:
+            clip_mask = self.get_frame(ct).astype("float")
+            clip_h, clip_w = clip_mask.shape
+        else:
+            clip_w, clip_h = self.size
 
         # numpy shape is H*W not W*H
         bg_h, bg_w = background_mask.shape
-        clip_h, clip_w = clip_mask.shape
 
         # SET POSITION
         pos = self.pos(ct)
@@ -958,12 +1303,17 @@ class VideoClip(Clip):
         # of (100-30)*100 = 70% opacity !
 
         # Copy the background mask to avoid modifying the original
-        b = background_mask.copy()
+        b = background_mask if inplace else background_mask.copy()
+
+        if value is not None:
+            if value:
+                b[y1_bg:y2_bg, x1_bg:x2_bg] *= 1 - value
+                b[y1_bg:y2_bg, x1_bg:x2_bg] += value
+            return b
 
-        b[y1_bg:y2_bg, x1_bg:x2_bg] = clip_mask[
-            y1_clip:y2_clip, x1_clip:x2_clip
-        ] + background_mask[y1_bg:y2_bg, x1_bg:x2_bg] * (
-            1 - clip_mask[y1_clip:y2_clip, x1_clip:x2_clip]
+        region = clip_mask[y1_clip:y2_clip, x1_clip:x2_clip]
+        b[y1_bg:y2_bg, x1_bg:x2_bg] = region + b[y1_bg:y2_bg, x1_bg:x2_bg] * (
+            1 - region
         )
 
         return b
@@ -1083,7 +1433,10 @@ class VideoClip(Clip):
         Returns a semi-transparent copy of the clip where the mask is
         multiplied by ``op`` (any float, normally between 0 and 1).
         """
+        value = self.mask._constant_frame_value()
         self.mask = self.mask.image_transform(lambda pic: opacity * pic)
+        if value is not None:
+            self.mask._constant_frame = (opacity * value, self.mask.frame_function)
 
     @apply_to_mask
     @outplace
@@ -1455,6 +1808,7 @@ class ImageClip(VideoClip):
         self.frame_function = lambda t: img
         self.size = img.shape[:2][::-1]
         self.img = img
+        self._set_constant_frame()
 
     def transform(self, func, apply_to=None, keep_duration=True):
         """General transformation filter.
@@ -1472,6 +1826,14 @@ class ImageClip(VideoClip):
         new_clip.__class__ = VideoClip
         return new_clip
 
+    def _set_constant_frame(self):
+        """Records the value of all the pixels of the image of a mask clip, if
+        they all have the same, to skip the mask during compositing.
+        """
+        img = self.img
+        if self.is_mask and img.size and img.min() == img.max():
+            self._constant_frame = (float(img.flat[0]), self.frame_function)
+
     @outplace
     def image_transform(self, image_func, apply_to=None):
         """Image-transformation filter.
@@ -1486,6 +1848,7 @@ class ImageClip(VideoClip):
         self.size = arr.shape[:2][::-1]
         self.frame_function = lambda t: arr
         self.img = arr
+        self._set_constant_frame()
 
         for attr in apply_to:
             a = getattr(self, attr, None)
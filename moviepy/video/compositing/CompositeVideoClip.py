@@ -5,6 +5,7 @@ from functools import reduce
 import numpy as np
 
 from moviepy.audio.AudioClip import CompositeAudioClip
+from moviepy.tools import IntervalTree
 from moviepy.video.VideoClip import ColorClip, VideoClip
 
 
@@ -53,11 +54,18 @@ class CompositeVideoClip(VideoClip):
       Set to True if the composite clip is a mask.
 
     memoize_mask
-        Set to True if the mask of the composite clip should be memoized during
-        frame generation. This is useful for performances in speed with the trafe-off
-        beeing a larger memory usage. If set to False, the mask will be
-        recomputed at each frame generation. Default is True.
+        Set to True to keep the frame and the mask of the last time composited,
+        so that the mask of a transparent composite clip at time ``t`` is given
+        without compositing the clips again after its frame at time ``t``.
+        This is useful for performances in speed with
+        the trade-off being a larger memory usage. If set to False, the clips
+        are composited again for the mask. Default is True.
 
+    premultiplied_alpha
+        Set to True to composite the clips in float32 colors premultiplied by
+        their opacity, rounded to integers only once all the clips are blended,
+        instead of blending each clip in an integer frame. This is faster and
+        more accurate for deep stacks of transparent clips. Default is False.
 
 
     The clip with the highest FPS will be the FPS of the composite clip.
@@ -72,6 +80,7 @@ class CompositeVideoClip(VideoClip):
         use_bgclip=False,
         is_mask=False,
         memoize_mask=True,
+        premultiplied_alpha=False,
     ):
         if size is None:
             size = clips[0].size
@@ -100,6 +109,7 @@ class CompositeVideoClip(VideoClip):
         self.clips = clips
         self.bg_color = bg_color
         self.memoize_mask = memoize_mask
+        self.premultiplied_alpha = premultiplied_alpha
 
         # Use first clip as background if necessary, else use color
         # either set by user or previously generated
@@ -114,6 +124,8 @@ class CompositeVideoClip(VideoClip):
 
         # order self.clips by layer
         self.clips = sorted(self.clips, key=lambda clip: clip.layer_index)
+        self._playing_index = None
+        self.playing_clips()
 
         # compute duration
         ends = [clip.end for clip in self.clips]
@@ -127,58 +139,78 @@ class CompositeVideoClip(VideoClip):
         if audioclips:
             self.audio = CompositeAudioClip(audioclips)
 
-        # compute mask if necessary
+        # The frame and the mask of the last time composited, shared with the
+        # copies of the clip
+        self._composition_cache = {}
+
+        # compute mask if necessary: its frames are the opacities obtained
+        # while compositing the frames of the clip
+        self._mask_frame_function = None
         if transparent:
-            maskclips = [
-                (clip.mask if (clip.mask is not None) else clip.with_mask().mask)
-                .with_position(clip.pos)
-                .with_end(clip.end)
-                .with_start(clip.start, change_end=False)
-                .with_layer_index(clip.layer_index)
-                for clip in self.clips
-            ]
-
-            if use_bgclip and self.bg.mask:
-                maskclips = [self.bg.mask] + maskclips
-
-            self.mask = CompositeVideoClip(
-                maskclips,
-                self.size,
-                is_mask=True,
-                bg_color=0.0,
-                memoize_mask=memoize_mask,
-            )
 
-        if self.memoize_mask and self.is_mask:
-            # Memoize the mask to speed up frame generation
-            self.precomputed = {}
+            def mask_frame_function(t):
+                mask = self._get_frame_and_mask(t)[1]
+                if mask is None:
+                    return np.ones((self.size[1], self.size[0]), dtype=np.float32)
+                return mask
+
+            self._mask_frame_function = mask_frame_function
+            self.mask = VideoClip(is_mask=True)
+            self.mask.frame_function = mask_frame_function
+            self.mask.size = self.size
+            if self.duration is not None:
+                self.mask.duration = self.mask.end = self.duration
 
     def frame_function(self, t):
         """The clips playing at time `t` are blitted over one another."""
-        # For the mask we recalculate the final transparency we'll need
-        # to apply on the result image
         if self.is_mask:
-            if (
-                self.memoize_mask
-                and t in self.precomputed
-                and self.precomputed[t] is not None
-            ):
-                mask = self.precomputed[t].copy()
-                del self.precomputed[t]  # Free memory as soon as possible
-                return mask
-
             mask = np.zeros((self.size[1], self.size[0]), dtype=float)
             for clip in self.playing_clips(t):
-                mask = clip.compose_mask(mask, t)
+                mask = clip.compose_mask(mask, t, inplace=True)
 
             return mask
 
-        # Clip merging in pure numpy
+        return self._get_frame_and_mask(t)[0]
+
+    def _get_frame_and_mask(self, t):
+        """Returns the frame at time ``t`` of the composition of the clips, and
+        its mask, computed together in a single pass over the clips, or None
+        for the mask if the frame is fully opaque.
+
+        ``t`` is the time of the composition, not the one of a transformed
+        copy of the clip (like ``subclipped``), whose frames and mask must be
+        read with ``get_frame`` and ``mask.get_frame``.
+
+        With ``memoize_mask``, the last result is kept, so that the frame and
+        the mask of a transparent composite clip at the same time ``t`` (as
+        asked by the writers) are only composited once.
+        """
+        cached = self._composition_cache.get(t)
+        if cached is not None:
+            return cached
+
+        if self.premultiplied_alpha:
+            result = self._compose_premultiplied(t)
+        else:
+            result = self._compose(t)
+        if self.memoize_mask and self._mask_frame_function is not None:
+            self._composition_cache.clear()
+            self._composition_cache[t] = result
+        return result
+
+    def _compose(self, t):
+        """Blits the clips playing at time `t` over one another, and returns the
+        resulting frame and mask.
+        """
+        # Clip merging in pure numpy. The frame (and mask) of the background
+        # are copied once, and all the clips are blended in these copies
         bg_t = t - self.bg.start
-        bg_frame = self.bg.get_frame(bg_t).astype("uint8")
+        bg_frame = np.array(self.bg.get_frame(bg_t), dtype="uint8")
         clip_height, clip_width = bg_frame.shape[:2]
 
-        if self.bg.mask:
+        # The mask of an opaque background is skipped
+        bg_mask = None
+        if self.bg.mask and self.bg.constant_opacity() != 1:
             bgm_t = t - self.bg.mask.start
             bg_mask = self.bg.mask.get_frame(bgm_t)
 
@@ -196,23 +228,54 @@ class CompositeVideoClip(VideoClip):
                     new_mask[:mask_height, :mask_width] = bg_mask
                     bg_mask = new_mask
 
+            bg_mask = np.array(bg_mask)
+
         # For each clip apply on top of current img
         current_frame = bg_frame
-        current_mask = bg_mask if self.bg.mask else None
+        current_mask = bg_mask
         for clip in self.playing_clips(t):
             current_frame, current_mask = clip.compose_on(
-                current_frame, t, current_mask
+                current_frame, t, current_mask, inplace=True
             )
-            if self.mask and self.memoize_mask:
-                self.mask.precomputed[t] = current_mask
 
-        return current_frame
+        return current_frame, current_mask
+
+    def _compose_premultiplied(self, t):
+        """Blits the clips playing at time `t` over one another in float32
+        accumulators of premultiplied colors and opacities.
+        """
+        bg_frame = self.bg.get_frame(t - self.bg.start).astype("uint8")
+        color = bg_frame.astype(np.float32)
+        alpha = None
+        if self.bg.mask and self.bg.constant_opacity() != 1:
+            bg_mask = self.bg.mask.get_frame(t - self.bg.mask.start)
+            height, width = bg_frame.shape[:2]
+            alpha = np.zeros((height, width), dtype=np.float32)
+            alpha[: bg_mask.shape[0], : bg_mask.shape[1]] = bg_mask[:height, :width]
+            color *= alpha[..., None]
+
+        for clip in self.playing_clips(t):
+            clip.compose_premultiplied_on(color, t, alpha)
+
+        if alpha is not None:
+            # The colors are divided by the final opacities
+            np.divide(color, alpha[..., None], out=color, where=alpha[..., None] > 0)
+        np.rint(color, out=color)
+        return color.astype("uint8"), alpha
 
     def playing_clips(self, t=0):
         """Returns a list of the clips in the composite clips that are
         actually playing at the given time `t`.
         """
-        return [clip for clip in self.clips if clip.is_playing(t)]
+        # The index of the times of the clips is built again whenever these
+        # times change, as clips can be added, removed, replaced or moved in
+        # self.clips after the composition was created
+        times = tuple((clip.start, clip.end) for clip in self.clips)
+        if self._playing_index is None or self._playing_index[0] != times:
+            starts, ends = zip(*times) if times else ((), ())
+            self._playing_index = (times, IntervalTree(starts, ends))
+        clips = self.clips
+        return [clips[i] for i in self._playing_index[1].overlapping(t)]
 
     def close(self):
         """Closes the instance, releasing all the resources."""
@@ -362,7 +425,9 @@ def concatenate_videoclips(
     if method == "chain":
 
         def frame_function(t):
-            i = max([i for i, e in enumerate(timings) if e <= t])
+            i = np.searchsorted(timings, t, side="right") - 1
+            # The times out of the clips are the ones of the first or last clip
+            i = min(max(i, 0), len(clips) - 1)
             return clips[i].get_frame(t - timings[i])
 
         def get_mask(clip):
@@ -372,6 +437,9 @@ def concatenate_videoclips(
             return mask
 
         result = VideoClip(is_mask=is_mask, frame_function=frame_function)
+        # The clips whose frames are the ones of the result, while it is not
+        # transformed (see ``VideoClip._chain_concatenation``)
+        result._concatenation = (timings, clips, frame_function)
         if any([clip.mask is not None for clip in clips]):
             masks = [get_mask(clip) for clip in clips]
             result.mask = concatenate_videoclips(masks, method="chain", is_mask=True)
@@ -45,6 +45,19 @@ class Crop(Effect):
 
     def apply(self, clip: Clip) -> Clip:
         """Apply the effect to the clip."""
+        self._compute_box(clip.size)
+
+        return clip.image_transform(
+            lambda frame: frame[
+                int(self.y1) : int(self.y2), int(self.x1) : int(self.x2)
+            ],
+            apply_to=["mask"],
+        )
+
+    def _compute_box(self, size):
+        """Sets ``x1, y1, x2, y2`` from the parameters of the effect, for a clip
+        of the given size.
+        """
         if self.width and self.x1 is not None:
             self.x2 = self.x1 + self.width
         elif self.width and self.x2 is not None:
@@ -69,12 +82,5 @@ class Crop(Effect):
 
         self.x1 = self.x1 or 0
         self.y1 = self.y1 or 0
-        self.x2 = self.x2 or clip.size[0]
-        self.y2 = self.y2 or clip.size[1]
-
-        return clip.image_transform(
-            lambda frame: frame[
-                int(self.y1) : int(self.y2), int(self.x1) : int(self.x2)
-            ],
-            apply_to=["mask"],
-        )
+        self.x2 = self.x2 or size[0]
+        self.y2 = self.y2 or size[1]
@@ -55,6 +55,27 @@ class Resize(Effect):
             interpolation = cv2.INTER_AREA
         return cv2.resize(+pic.astype("uint8"), (lx, ly), interpolation=interpolation)
 
+    def _get_constant_size(self, size):
+        """Returns the ``[width, height]`` of a clip of the given size once
+        resized, or ``None`` if the resizing is a function of time.
+        """
+        w, h = size
+        if self.new_size is not None:
+            if hasattr(self.new_size, "__call__"):
+                return None
+            elif isinstance(self.new_size, numbers.Number):
+                return [self.new_size * w, self.new_size * h]
+            return list(self.new_size)
+        elif self.height is not None:
+            if hasattr(self.height, "__call__"):
+                return None
+            return [w * self.height / h, self.height]
+        elif self.width is not None:
+            if hasattr(self.width, "__call__"):
+                return None
+            return [self.width, h * self.width / w]
+        return None
+
     def apply(self, clip):
         """Apply the effect to the clip."""
         w, h = clip.size
@@ -1,8 +1,29 @@
 """Implements VideoFileClip, a class for video clips creation using video files."""
 
+import hashlib
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+
 from moviepy.audio.io.AudioFileClip import AudioFileClip
-from moviepy.decorators import convert_path_to_string
-from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.decorators import convert_parameter_to_seconds, convert_path_to_string
+from moviepy.FrameCache import FrameCache
+from moviepy.video.fx.Crop import Crop
+from moviepy.video.fx.Resize import Resize
+from moviepy.video.io.ffmpeg_reader import (
+    FFMPEG_VideoReader,
+    _target_size,
+    ffmpeg_iter_keyframes,
+    ffmpeg_read_frame_at,
+    ffmpeg_read_keyframes,
+)
+from moviepy.video.io.raw_proxy import (
+    RawProxyReader,
+    read_raw_proxy_header,
+    write_raw_proxy,
+)
 from moviepy.video.VideoClip import VideoClip
 
 
@@ -32,6 +53,11 @@ class VideoFileClip(VideoClip):
       can save it to a videofile with a mask. (see also
       ``VideoClip.write_videofile`` for more details).
 
+    mask_dtype:
+      Floating point type of the frames of the mask when ``has_mask`` is
+      ``True``. Defaults to ``"float32"``, which takes half the memory of
+      ``"float64"`` and is faster to compute with.
+
     audio:
       Set to `False` if the clip doesn't have any audio or if you do not
       wish to read the audio.
@@ -63,6 +89,72 @@ class VideoFileClip(VideoClip):
     audio_stream_index
       The index of the audio stream to read from the file.
 
+    keyframe_index
+      Set to ``True`` to build an index of the keyframes of the file when
+      opening it. Random accesses to frames will then seek to the nearest
+      preceding keyframe and only decode the frames needed from there, which
+      makes scrubbing and non-linear edits on long GOP videos much faster.
+
+    prefetch
+      Number of frames decoded ahead by a background thread while the current
+      frame is processed, which speeds up sequential reading (for instance
+      when rendering) on multi-core machines. Disabled by default (0).
+
+    frame_buffers
+      Set to a number N to read the frames into N preallocated arrays reused
+      in turns, which avoids allocating memory for each frame. A frame
+      returned by the reader is then only valid until N other frames have
+      been read, and must be copied to be kept longer.
+
+    reader_pool
+      A ``FFMPEG_VideoReaderPool`` from which the clip leases its readers,
+      instead of starting its own ffmpeg process. The clips created on the
+      same file with the same pool share a bounded number of ffmpeg
+      processes, each frame being read by the process closest to it.
+
+    decoder_options
+      List of ffmpeg options applied to the decoding of the file, like
+      ``["-threads", "4"]``, ``["-skip_frame", "nokey"]`` (only decode the
+      keyframes) or ``["-flags2", "+fast"]``.
+
+    input_filters
+      A ffmpeg filter chain, as a string or a list of filters, applied by
+      ffmpeg to the frames before they are resized to ``target_resolution``,
+      like ``"crop=640:360:0:0"`` or ``["hflip", "fps=10"]``. Cropping,
+      scaling or changing the frame rate in ffmpeg is much faster than doing
+      it on the frames in Python. The size and fps of the clip are the ones of
+      the filtered frames.
+
+    frame_cache
+      Cache of the frames read from the file, so that the frames requested
+      again (for instance by effects reading the frames around each time, like
+      ``SuperSample``, or by crossfades) are not decoded again, which would
+      restart the reader. By default (``True``) the last frames read are
+      kept in a ``FrameCache`` of at most 8 frames and 64MB (so only 2 frames
+      of a 4K video). It can
+      also be a ``FrameCache`` (shared only by clips reading the same file
+      with the same parameters), or ``False`` to not cache the frames. There is
+      no cache with ``frame_buffers``, as the frames are then overwritten.
+
+    ffmpeg_resize
+      Set to ``True`` to have the constant ``vfx.Resize`` effects applied first
+      to the clip done by ffmpeg while decoding (see "Effects done by ffmpeg"
+      below). This is faster, but the pixels slightly differ from the ones
+      resized with OpenCV.
+
+    Effects done by ffmpeg
+    ----------------------
+
+    When ``vfx.Crop`` effects are the first ones applied to a clip read from a
+    file (without mask), with ``with_effects`` or ``cropped``, they are done by
+    ffmpeg while decoding instead of on the full frames in Python: the new clip
+    has its own reader whose ``input_filters`` crop the frames, the same
+    reader doing all the leading effects of a ``with_effects`` call. With
+    ``ffmpeg_resize=True``, the constant ``vfx.Resize`` effects (``resized``)
+    are done the same way, with the ``area`` algorithm of ffmpeg for downsizing
+    and ``bilinear`` for upsizing, so the pixels slightly differ from the ones
+    resized with OpenCV.
+
 
     Attributes
     ----------
@@ -103,6 +195,15 @@ class VideoFileClip(VideoClip):
         pixel_format=None,
         is_mask=False,
         audio_stream_index=0,
+        keyframe_index=False,
+        prefetch=0,
+        frame_buffers=None,
+        reader_pool=None,
+        decoder_options=None,
+        input_filters=None,
+        mask_dtype="float32",
+        frame_cache=True,
+        ffmpeg_resize=False,
     ):
         VideoClip.__init__(self, is_mask=is_mask)
 
@@ -110,14 +211,22 @@ class VideoFileClip(VideoClip):
         if not pixel_format:
             pixel_format = "rgba" if has_mask else "rgb24"
 
-        self.reader = FFMPEG_VideoReader(
-            filename,
-            decode_file=decode_file,
-            pixel_format=pixel_format,
-            target_resolution=target_resolution,
-            resize_algo=resize_algorithm,
-            fps_source=fps_source,
-        )
+        reader_params = {
+            "decode_file": decode_file,
+            "pixel_format": pixel_format,
+            "target_resolution": target_resolution,
+            "resize_algo": resize_algorithm,
+            "fps_source": fps_source,
+            "keyframe_index": keyframe_index,
+            "prefetch": prefetch,
+            "frame_buffers": frame_buffers,
+            "decoder_options": decoder_options,
+            "input_filters": input_filters,
+        }
+        self._reader_params = reader_params
+        self._reader_pool = reader_pool
+        self._ffmpeg_resize = ffmpeg_resize
+        self.reader = self._make_reader(filename, reader_params)
 
         # Make some of the reader's attributes accessible from the clip
         self.duration = self.reader.duration
@@ -130,10 +239,28 @@ class VideoFileClip(VideoClip):
         self.filename = filename
 
         if has_mask:
+            mask_dtype = np.dtype(mask_dtype)
+            if mask_dtype.kind != "f":
+                raise ValueError(
+                    "mask_dtype must be a floating point type, as the values of "
+                    "masks are between 0 and 1, not %s" % mask_dtype
+                )
+
             self.frame_function = lambda t: self.reader.get_frame(t)[:, :, :3]
 
+            # The last RGBA frame read and its alpha channel converted to a
+            # mask, so that the clip and its mask (and their copies) which read
+            # the same frame only convert it once. The number of the frame is
+            # part of the key as frame buffers are reused for new frames.
+            last_mask = _LastMask()
+
             def mask_frame_function(t):
-                return self.reader.get_frame(t)[:, :, 3] / 255.0
+                frame = self.reader.get_frame(t)
+                key = (id(frame), self.reader.get_frame_number(t))
+                if key != last_mask.key:
+                    last_mask.key = key
+                    last_mask.mask = np.divide(frame[:, :, 3], 255, dtype=mask_dtype)
+                return last_mask.mask
 
             self.mask = VideoClip(
                 is_mask=True, frame_function=mask_frame_function
@@ -142,6 +269,25 @@ class VideoFileClip(VideoClip):
 
         else:
             self.frame_function = lambda t: self.reader.get_frame(t)
+        # The frame function reading the frames as they come out of the reader,
+        # which only clips without mask have
+        self._reader_frame_function = None if has_mask else self.frame_function
+        # The frame function of the clip while its frames are the ones of the
+        # file from a given time, unmodified (see ``_file_offset``)
+        self._file_frames = (self._reader_frame_function, 0)
+
+        if frame_cache is True:
+            frame_cache = None if frame_buffers else self._default_frame_cache()
+        elif frame_cache is False:
+            frame_cache = None
+        if frame_cache is not None:
+            if frame_buffers:
+                raise ValueError(
+                    "The frames of a VideoFileClip can't be cached when read into "
+                    "reused frame_buffers"
+                )
+            self.frame_cache = frame_cache
+            self._frame_cache_function = self.frame_function
 
         # Make a reader for the audio, if any.
         if audio and self.reader.infos["audio_found"]:
@@ -153,6 +299,372 @@ class VideoFileClip(VideoClip):
                 audio_stream_index=audio_stream_index,
             )
 
+    def _make_reader(self, filename, reader_params, infos=None):
+        """Returns a reader of the file, leased from the reader pool if any.
+        ``infos`` are the informations on the file, if already known.
+        """
+        if self._reader_pool is not None:
+            return self._reader_pool.lease(filename, **reader_params)
+        return FFMPEG_VideoReader(filename, infos=infos, **reader_params)
+
+    def _default_frame_cache(self):
+        """Returns a cache of the last frames read from the file (at most 8
+        frames and 64MB), keyed on their index in the file.
+        """
+        w, h = self.reader.size
+        return FrameCache(max_bytes=min(8 * w * h * 3, 64e6), fps=self.reader.fps)
+
+    def with_effects(self, effects):
+        """Return a copy of the current clip with the effects applied.
+
+        The ``vfx.Crop`` (and, with ``ffmpeg_resize=True``, constant
+        ``vfx.Resize``) effects at the beginning of ``effects`` are done by
+        ffmpeg while decoding the file when possible (see "Effects done by
+        ffmpeg" in the class documentation).
+        """
+        effects = list(effects)
+        if (
+            self.reader is None
+            or self.mask is not None
+            or self.is_mask
+            or self.frame_function is not self._reader_frame_function
+        ):
+            return VideoClip.with_effects(self, effects)
+
+        # The filters of all the leading effects are done by a single reader
+        new_filters, size = [], self.size
+        n_filtered = 0
+        while n_filtered < len(effects):
+            reader_filter = self._reader_filter(effects[n_filtered], size)
+            if reader_filter is None:
+                break
+            filters, size = reader_filter
+            new_filters += filters
+            n_filtered += 1
+        # The frames are still the ones of the reader if nothing is filtered
+        clip = self._with_reader_filters(new_filters) if new_filters else self
+        return VideoClip.with_effects(clip, effects[n_filtered:])
+
+    def _reader_filter(self, effect, size):
+        """Returns the ffmpeg filters doing the effect on frames of the given
+        size, and the size of the filtered frames, or ``None`` if the effect
+        can't be done by ffmpeg.
+        """
+        w, h = size
+        if isinstance(effect, Crop):
+            effect = effect.copy()
+            effect._compute_box(size)
+            x1, y1, x2, y2 = (
+                int(effect.x1),
+                int(effect.y1),
+                int(effect.x2),
+                int(effect.y2),
+            )
+            if not (0 <= x1 < x2 <= w and 0 <= y1 < y2 <= h):
+                return None
+            if (x1, y1, x2, y2) == (0, 0, w, h):
+                # Nothing is cropped
+                return [], size
+            # Cropping the frames once converted to the pixel format of the
+            # reader, so that the chroma of subsampled formats isn't shifted.
+            filters = [
+                "format=%s" % self._reader_params["pixel_format"],
+                "crop=%d:%d:%d:%d:exact=1" % (x2 - x1, y2 - y1, x1, y1),
+            ]
+            return filters, [x2 - x1, y2 - y1]
+        elif isinstance(effect, Resize) and self._ffmpeg_resize:
+            new_size = effect._get_constant_size(size)
+            if new_size is None:
+                return None
+            new_w, new_h = int(new_size[0]), int(new_size[1])
+            if new_w < 1 or new_h < 1:
+                return None
+            if [new_w, new_h] == [w, h]:
+                # Nothing is resized
+                return [], size
+            # Same choice of algorithms than Resize with OpenCV
+            algorithm = "bilinear" if (new_w > w or new_h > h) else "area"
+            filters = ["scale=%d:%d:flags=%s" % (new_w, new_h, algorithm)]
+            return filters, [new_w, new_h]
+        return None
+
+    def _with_reader_filters(self, new_filters):
+        """Returns a copy of the clip reading its frames with a new reader,
+        applying the ffmpeg filters ``new_filters`` to the frames of the reader
+        of the clip.
+        """
+        reader_params = self._filtered_reader_params(new_filters)
+        new_clip = self.copy()
+        new_clip._reader_params = reader_params
+        # The file isn't probed again for the new reader
+        new_clip.reader = new_clip._make_reader(
+            self.filename, reader_params, infos=self.reader.infos
+        )
+        new_clip.size = new_clip.reader.size
+        new_clip.frame_function = lambda t: new_clip.reader.get_frame(t)
+        new_clip._reader_frame_function = new_clip.frame_function
+        new_clip.memoized_t = None
+        new_clip.memoized_frame = None
+        if self.frame_cache is not None:
+            new_clip.frame_cache = new_clip._default_frame_cache()
+            new_clip._frame_cache_function = new_clip.frame_function
+        return new_clip
+
+    def _filtered_reader_params(self, new_filters):
+        """Returns the parameters of a reader of the file applying the ffmpeg
+        filters ``new_filters`` to the frames of the reader of the clip.
+        """
+        reader_params = dict(self._reader_params)
+        input_filters = reader_params["input_filters"] or []
+        if isinstance(input_filters, str):
+            input_filters = [input_filters]
+        input_filters = list(input_filters)
+        if reader_params["target_resolution"]:
+            # The resizing of the reader must be done before the new filters
+            input_filters.append("scale=%d:%d" % tuple(self.reader.size))
+            reader_params["target_resolution"] = None
+        reader_params["input_filters"] = input_filters + new_filters
+        return reader_params
+
+    @convert_parameter_to_seconds(["start_time", "end_time"])
+    def subclipped(self, start_time=0, end_time=None):
+        """Returns a clip playing the content of the current clip between times
+        ``start_time`` and ``end_time``. See ``Clip.subclipped``.
+        """
+        new_clip = VideoClip.subclipped(self, start_time, end_time)
+        offset = self._file_offset()
+        if offset is not None:
+            if start_time < 0:
+                start_time = self.duration + start_time
+            # The subclip is still a span of the file, which can be copied
+            # without being encoded again (see ``write_videofile(smart_cut=True)``)
+            new_clip._file_frames = (new_clip.frame_function, offset + start_time)
+        return new_clip
+
+    def _file_offset(self):
+        """Returns the time of the file from which the frames of the clip are
+        the frames of its video stream, as encoded in the file (the clip is the
+        file or a subclip of it, without effects), or ``None`` if they are not.
+        """
+        frame_function, offset = self._file_frames
+        if (
+            self.reader is None
+            or self.frame_function is not frame_function
+            or self._reader_params["target_resolution"]
+            or self._reader_params["input_filters"]
+            or self.rotation
+        ):
+            return None
+        return offset
+
+    def to_proxy_cache(self, filename, target_resolution=None, logger="bar"):
+        """Decodes the frames of the file once into a raw proxy file, and
+        returns a copy of the clip reading its frames from this file.
+
+        The frames are stored uncompressed in the proxy file, which is
+        memory-mapped: the new clip returns any frame in constant time as a
+        read-only view of the file, without decoding or copying it, whatever
+        the order in which the frames are requested. This makes the renders
+        following the first one, and random accesses, much faster, at the
+        cost of disk space (``width * height * 3`` bytes per frame). Several
+        processes using the same proxy file share its pages in memory.
+
+        If ``filename`` is a proxy file written for the same file and reading
+        parameters, which hasn't been modified since, it is used as is.
+
+        Parameters
+        ----------
+
+        filename
+          Path of the proxy file.
+
+        target_resolution
+          Set to ``(width, height)`` to store smaller frames in the proxy file,
+          for instance to edit a 4K video with a lower resolution proxy. Either
+          dimension can be ``None`` to keep the aspect ratio.
+
+        logger
+          Either ``"bar"`` for progress bar or ``None`` or any Proglog logger.
+
+        Examples
+        --------
+
+        .. code:: python
+
+            clip = VideoFileClip("video.mp4").to_proxy_cache("video.mpyraw")
+            clip.with_effects([vfx.TimeMirror()]).write_videofile("reversed.mp4")
+        """
+        if (
+            self.reader is None
+            or self.mask is not None
+            or self.frame_function is not self._reader_frame_function
+        ):
+            raise ValueError(
+                "MoviePy error: only the frames of a file read without mask "
+                "and without effects can be stored in a proxy file"
+            )
+
+        reader_params = dict(self._reader_params)
+        if target_resolution:
+            reader_params = self._filtered_reader_params([])
+            reader_params["target_resolution"] = target_resolution
+
+        filename = os.fspath(filename)
+        key = self._proxy_key(reader_params)
+        header = read_raw_proxy_header(filename)
+        if header is None or header["key"] != key:
+            reader = FFMPEG_VideoReader(self.filename, **reader_params)
+            try:
+                n_frames = max(1, int(reader.duration * reader.fps))
+                write_raw_proxy(filename, reader, n_frames, key=key, logger=logger)
+            finally:
+                reader.close()
+
+        new_clip = self.copy()
+        new_clip._reader_params = reader_params
+        new_clip.reader = RawProxyReader(filename, key=key)
+        # The keyframes and thumbnails are still read from the file, with the
+        # options of its reader
+        for attribute in [
+            "infos",
+            "keyframes",
+            "pixel_format",
+            "resize_algo",
+            "decoder_options",
+            "input_filters",
+        ]:
+            setattr(new_clip.reader, attribute, getattr(self.reader, attribute))
+        new_clip.size = new_clip.reader.size
+        new_clip.frame_function = lambda t: new_clip.reader.get_frame(t)
+        # Effects are done in Python on the frames of the proxy, which are
+        # faster to get than the ones of a new ffmpeg reader of the file
+        new_clip._reader_frame_function = None
+        new_clip.memoized_t = None
+        new_clip.memoized_frame = None
+        new_clip.frame_cache = None
+        return new_clip
+
+    def _proxy_key(self, reader_params):
+        """Returns the key identifying the file, in its current version, and
+        the parameters of its reading in a proxy file.
+        """
+        stat = os.stat(self.filename)
+        params = {
+            name: value
+            for name, value in reader_params.items()
+            if name not in ("keyframe_index", "prefetch", "frame_buffers")
+        }
+        description = json.dumps(
+            [os.path.abspath(self.filename), stat.st_size, stat.st_mtime_ns, params],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.md5(description.encode("utf8")).digest()
+
+    def iter_keyframes(self, size=None):
+        """Iterates over the keyframes of the video file, yielding tuples
+        ``(t, frame)`` where ``t`` is the time of the keyframe in the file.
+
+        Only the keyframes are decoded, and they are resized by ffmpeg, which
+        makes it a very fast way to get an overview of a long video, for
+        instance to make a contact sheet. The frames are the ones of the file,
+        read with the same options as the clip's (``target_resolution``,
+        ``input_filters``...), except the filters changing the times of the
+        frames (like ``fps`` or ``trim``), and without the effects applied to
+        the clip in Python. Each frame is only valid until the next one is
+        yielded.
+
+        Parameters
+        ----------
+
+        size
+          Size ``(width, height)`` of the frames, in which one of the
+          dimensions can be ``None`` to keep the aspect ratio. Defaults to the
+          size of the frames of the reader.
+
+        Examples
+        --------
+
+        .. code:: python
+
+            clip = VideoFileClip("long_video.mp4")
+            for t, frame in clip.iter_keyframes(size=(160, None)):
+                ...
+        """
+        reader = self.reader
+        keyframes = self._keyframe_times()
+        frames = ffmpeg_iter_keyframes(
+            self.filename,
+            _target_size(reader.size, size) if size else reader.size,
+            decoder_options=reader.decoder_options,
+            input_filters=reader.input_filters,
+            pixel_format=reader.pixel_format,
+            resize_algo=reader.resize_algo,
+        )
+        yield from zip(keyframes, frames)
+
+    def _keyframe_times(self):
+        """Returns the sorted times of the keyframes of the video file."""
+        if self.reader.keyframes is not None:
+            return self.reader.keyframes
+        return ffmpeg_read_keyframes(
+            self.filename, start=self.reader.infos.get("start") or 0
+        )
+
+    def thumbnails(self, n=10, size=None, accurate=True):
+        """Returns ``n`` frames evenly spread over the video file, as a list of
+        tuples ``(t, frame)`` where ``t`` is the time of the frame in the file.
+
+        Each frame is read by a ffmpeg process which seeks directly to it, and
+        resized by ffmpeg, so that thumbnailing a long video only needs to
+        decode a few frames around each thumbnail. The frames are read as in
+        ``iter_keyframes``.
+
+        Parameters
+        ----------
+
+        n
+          Number of frames. They are taken in the middle of ``n`` equal parts
+          of the video.
+
+        size
+          Size ``(width, height)`` of the frames, in which one of the
+          dimensions can be ``None`` to keep the aspect ratio. Defaults to the
+          size of the frames of the reader.
+
+        accurate
+          If ``False``, each frame is the keyframe at or before the middle of
+          its part of the video, and ``t`` is the time of this keyframe. This
+          is even faster as only keyframes are decoded.
+        """
+        reader = self.reader
+        size = _target_size(reader.size, size) if size else reader.size
+        decoder_options = list(reader.decoder_options)
+        keyframes = None if accurate else self._keyframe_times()
+        if keyframes:
+            # Only the keyframes are decoded, up to the one at the time sought
+            decoder_options += ["-skip_frame", "nokey"]
+        thumbnails = []
+        for i in range(n):
+            t = (i + 0.5) * reader.duration / n
+            seek_time = t
+            if keyframes:
+                t = keyframes[max(0, bisect_right(keyframes, t) - 1)]
+                # Just before the keyframe, whatever the rounding of the time
+                seek_time = max(0, t - 1e-6)
+            frame = ffmpeg_read_frame_at(
+                self.filename,
+                seek_time,
+                size,
+                decoder_options=decoder_options,
+                input_filters=reader.input_filters,
+                pixel_format=reader.pixel_format,
+                resize_algo=reader.resize_algo,
+            )
+            if frame is not None:
+                thumbnails.append((t, frame))
+        return thumbnails
+
     def __deepcopy__(self, memo):
         """Implements ``copy.deepcopy(clip)`` behaviour as ``copy.copy(clip)``.
 
@@ -172,9 +684,26 @@ class VideoFileClip(VideoClip):
             self.reader.close()
             self.reader = None
 
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
+
         try:
             if self.audio:
                 self.audio.close()
                 self.audio = None
         except AttributeError:  # pragma: no cover
             pass
+
+
+class _LastMask:
+    """The key of the last RGBA frame read by a ``VideoFileClip`` with a mask,
+    and its alpha channel converted to a mask.
+    """
+
+    # Only a cache, which is not part of the fingerprint of the mask (see
+    # ``moviepy.video.io.render_cache``)
+    _render_cache_ignored = True
+
+    def __init__(self):
+        self.key = None
+        self.mask = None
@@ -1,24 +1,79 @@
 """Implements all the functions to read a video or a picture using ffmpeg."""
 
+import hashlib
+import json
 import os
+import queue
 import re
+import shutil
 import subprocess as sp
+import threading
 import warnings
+import weakref
+from bisect import bisect_right
+from functools import lru_cache
 from typing import List
 
 import numpy as np
 
 from moviepy.config import FFMPEG_BINARY  # ffmpeg, ffmpeg.exe, etc...
+from moviepy.config import MOVIEPY_CACHE_DIR
 from moviepy.tools import (
     convert_to_seconds,
     cross_platform_popen_params,
     ffmpeg_escape_filename,
 )
 from moviepy.video.io.errors import VideoCorruptedError
+from moviepy.video.io.ffmpeg_tools import ffmpeg_version
+
+# Frames further away than this are reached by restarting ffmpeg with a seek
+# rather than by reading (and throwing away) all the frames in between
+MAX_FORWARD_FRAMES = 100
+
+# The readers of the current process whose prefetch thread is running
+_PREFETCHING_READERS = weakref.WeakSet()
 
 
 class FFMPEG_VideoReader:
-    """Class for video byte-level reading with ffmpeg."""
+    """Class for video byte-level reading with ffmpeg.
+
+    If ``keyframe_index`` is ``True``, the keyframes of the file are indexed
+    (see ``ffmpeg_read_keyframes``) and used to seek directly to the keyframe
+    preceding a requested frame instead of using a fixed pre-roll, and to
+    avoid restarting ffmpeg when no keyframe stands between the current
+    position and the requested frame.
+
+    If ``prefetch`` is a positive number, a background thread reads up to that
+    many frames ahead from ffmpeg while the current frame is being processed,
+    so that decoding overlaps with compositing and encoding when frames are
+    accessed sequentially. Seeking discards the frames read ahead.
+
+    If ``frame_buffers`` is a positive number, the frames are read directly
+    into a pool of preallocated arrays which are reused, instead of allocating
+    new ones for every frame. The returned frames are read-only views on the
+    pool, and a frame is overwritten by the ``frame_buffers``-th frame read
+    after it: frames which must be kept longer should be copied.
+
+    ``decoder_options`` is a list of ffmpeg options placed before the input
+    file, like ``["-threads", "4"]`` or ``["-skip_frame", "nokey"]``, and
+    ``input_filters`` a ffmpeg filter chain (as a string or a list of filters)
+    applied to the frames before they are resized to ``target_resolution``,
+    like ``"crop=640:360:0:0"``. When they are provided, the size and frame
+    rate of the frames are read from a one-frame run of ffmpeg (see
+    ``ffmpeg_probe_video_output``), as filters may change them. Filters
+    changing the timing of the frames other than their rate are not supported.
+
+    ``infos`` are the informations on the file returned by
+    ``ffmpeg_parse_infos``, when they are already known (for instance by
+    another reader of the file), so that the file isn't probed again.
+
+    When the frames are requested with a constant stride (like every 5th
+    frame, which happens when iterating over the frames of a clip with a lower
+    fps than the file's), ffmpeg is restarted with a ``select`` filter, so that
+    only the requested frames are piped instead of being read and thrown away.
+    Strides of more than ``MAX_FORWARD_FRAMES`` frames are read with a seek
+    for each frame instead.
+    """
 
     def __init__(
         self,
@@ -31,36 +86,60 @@ class FFMPEG_VideoReader:
         target_resolution=None,
         resize_algo="bicubic",
         fps_source="fps",
+        keyframe_index=False,
+        prefetch=0,
+        frame_buffers=None,
+        decoder_options=None,
+        input_filters=None,
+        infos=None,
     ):
         self.filename = filename
         self.proc = None
-        infos = ffmpeg_parse_infos(
-            filename,
-            check_duration=check_duration,
-            fps_source=fps_source,
-            decode_file=decode_file,
-            print_infos=print_infos,
-        )
+        # Only every ``stride``-th frame is output by ffmpeg (see get_frame)
+        self.stride = 1
+        self._last_requested_frame = None
+        self._last_step = None
+        self._step_repeats = 0
+        self.prefetch = prefetch
+        self._prefetch_thread = None
+        if infos is None:
+            infos = ffmpeg_parse_infos(
+                filename,
+                check_duration=check_duration,
+                fps_source=fps_source,
+                decode_file=decode_file,
+                print_infos=print_infos,
+            )
         # If framerate is unavailable, assume 1.0 FPS to avoid divide-by-zero errors.
         self.fps = infos.get("video_fps", 1.0)
         # If frame size is unavailable, set 1x1 divide-by-zero errors.
         self.size = infos.get("video_size", (1, 1))
 
+        self.decoder_options = list(decoder_options or [])
+        if isinstance(input_filters, str):
+            input_filters = [input_filters]
+        self.input_filters = list(input_filters or [])
+
         # ffmpeg automatically rotates videos if rotation information is
         # available, so exchange width and height
         self.rotation = abs(infos.get("video_rotation", 0))
-        if self.rotation in [90, 270]:
+        if self.decoder_options or self.input_filters:
+            # The size read is the one after the rotation and the filters
+            output_infos = ffmpeg_probe_video_output(
+                filename, self.decoder_options, self.input_filters
+            )
+            self.size = output_infos["video_size"]
+            output_fps = output_infos.get("video_fps")
+            if output_fps and abs(output_fps - self.fps) > 0.01:
+                self.fps = output_fps
+                infos = {**infos, "video_fps": output_fps}
+                if infos.get("video_duration"):
+                    infos["video_n_frames"] = int(infos["video_duration"] * output_fps)
+        elif self.rotation in [90, 270]:
             self.size = [self.size[1], self.size[0]]
 
         if target_resolution:
-            if None in target_resolution:
-                ratio = 1
-                for idx, target in enumerate(target_resolution):
-                    if target:
-                        ratio = target / self.size[idx]
-                self.size = (int(self.size[0] * ratio), int(self.size[1] * ratio))
-            else:
-                self.size = target_resolution
+            self.size = _target_size(self.size, target_resolution)
         self.resize_algo = resize_algo
 
         self.duration = infos.get("video_duration", 0.0)
@@ -70,6 +149,19 @@ class FFMPEG_VideoReader:
 
         self.infos = infos
 
+        # Times (in seconds) of the keyframes of the video stream, used to seek
+        # directly to the keyframe preceding a requested frame. None if the
+        # index has not been requested.
+        self.keyframes = None
+        self.keyframe_numbers = None
+        if keyframe_index:
+            self.keyframes = ffmpeg_read_keyframes(
+                filename, start=infos.get("start") or 0
+            )
+            self.keyframe_numbers = [
+                self.get_frame_number(keyframe) for keyframe in self.keyframes
+            ]
+
         self.pixel_format = pixel_format
         self.depth = 4 if pixel_format[-1] == "a" else 3
         # 'a' represents 'alpha' which means that each pixel has 4 values instead of 3.
@@ -80,6 +172,20 @@ class FFMPEG_VideoReader:
             bufsize = self.depth * w * h + 100
 
         self.bufsize = bufsize
+
+        # Pool of arrays in which the frames are read, used in turns. One more
+        # holds the frame being read, so that the last frame read is kept if
+        # the read is incomplete (at the end of the file), and the prefetch
+        # thread needs as many more as the frames it can read ahead.
+        self.frame_buffers = frame_buffers
+        self._buffers = None
+        self._skip_buffer = None
+        if frame_buffers:
+            w, h = self.size
+            n_buffers = frame_buffers + 1 + (prefetch if prefetch > 0 else 0)
+            self._buffers = np.empty((n_buffers, self.depth * w * h), dtype="uint8")
+            self._buffer_index = 0
+
         self.initialize()
 
     def initialize(self, start_time=0):
@@ -112,11 +218,28 @@ class FFMPEG_VideoReader:
         else:
             start_time = 0.0
 
-        if start_time != 0:
-            offset = min(1, start_time)
+        if (start_time != 0) and (self.stride > 1):
+            # ffmpeg drops the frames before the seek point before filtering,
+            # so the frames are selected from the first one.
+            i_arg = [
+                "-ss",
+                "%.06f" % start_time,
+                "-i",
+                ffmpeg_escape_filename(self.filename),
+            ]
+        elif start_time != 0:
+            seek_time = start_time - min(1, start_time)
+            if self.keyframes is not None:
+                # Seek to the keyframe preceding the frame, and let ffmpeg
+                # decode forward only the frames between them.
+                keyframe_number = self.get_keyframe_number(self.pos)
+                seek_time = 0.0
+                if keyframe_number is not None:
+                    seek_time = self.keyframes[keyframe_number]
+            offset = max(0, start_time - seek_time)
             i_arg = [
                 "-ss",
-                "%.06f" % (start_time - offset),
+                "%.06f" % seek_time,
                 "-i",
                 ffmpeg_escape_filename(self.filename),
                 "-ss",
@@ -124,6 +247,7 @@ class FFMPEG_VideoReader:
             ]
         else:
             i_arg = ["-i", ffmpeg_escape_filename(self.filename)]
+        i_arg = self.decoder_options + i_arg
 
         # For webm video (vp8 and vp9) with transparent layer, force libvpx/libvpx-vp9
         # as ffmpeg native webm decoder dont decode alpha layer
@@ -137,16 +261,23 @@ class FFMPEG_VideoReader:
             elif codec_name == "vp8":
                 i_arg = ["-c:v", "libvpx"] + i_arg
 
+        filters = self.input_filters + ["scale=%d:%d" % tuple(self.size)]
+        output_options = []
+        if self.stride > 1:
+            filters.insert(-1, "select='not(mod(n\\,%d))'" % self.stride)
+            output_options = _passthrough_options()
+
         cmd = (
             [FFMPEG_BINARY]
             + i_arg
+            + output_options
             + [
                 "-loglevel",
                 "error",
                 "-f",
                 "image2pipe",
                 "-vf",
-                "scale=%d:%d" % tuple(self.size),
+                ",".join(filters),
                 "-sws_flags",
                 self.resize_algo,
                 "-pix_fmt",
@@ -166,16 +297,72 @@ class FFMPEG_VideoReader:
             }
         )
         self.proc = sp.Popen(cmd, **popen_params)
+        self._pid = os.getpid()
+
+        if self.prefetch > 0:
+            w, h = self.size
+            self._prefetch_queue = queue.Queue(maxsize=self.prefetch)
+            self._prefetch_stop = threading.Event()
+            self._prefetch_ended = False
+            # The thread gets no reference to the reader, so that the reader
+            # can still be garbage collected (and closed) while it runs.
+            self._prefetch_thread = threading.Thread(
+                target=_prefetch_frames,
+                args=(
+                    self.proc.stdout,
+                    self.depth * w * h,
+                    self._prefetch_queue,
+                    self._prefetch_stop,
+                    self._buffers,
+                    self._buffer_index if self._buffers is not None else 0,
+                ),
+                daemon=True,
+            )
+            self._prefetch_thread.start()
+            _PREFETCHING_READERS.add(self)
+
+        # self.pos is moved forward by a stride when the frame is read
+        self.pos -= self.stride - 1
         self.last_read = self.read_frame()
 
+    def _read_raw_frame(self):
+        """Returns the bytes of the next frame output by ffmpeg, taken from the
+        prefetch queue if there is one. Less bytes than a frame are returned at
+        the end of the stream.
+        """
+        w, h = self.size
+        if self._prefetch_thread is not None and self._prefetch_ended:
+            return b""
+
+        buffer = None
+        if self._buffers is not None:
+            # the prefetch thread uses the buffers in the same order
+            buffer = self._buffers[self._buffer_index]
+            self._buffer_index = (self._buffer_index + 1) % len(self._buffers)
+
+        if self._prefetch_thread is None:
+            return _read_frame_bytes(self.proc.stdout, self.depth * w * h, buffer)
+        data = self._prefetch_queue.get()
+        if len(data) != self.depth * w * h:
+            # the prefetch thread stops after the last (incomplete) frame
+            self._prefetch_ended = True
+        return data
+
     def skip_frames(self, n=1):
         """Reads and throws away n frames"""
         w, h = self.size
+        nbytes = self.depth * w * h
         for i in range(n):
-            self.proc.stdout.read(self.depth * w * h)
+            if self._prefetch_thread is None:
+                # The frames thrown away are all read in the same array
+                if self._skip_buffer is None:
+                    self._skip_buffer = np.empty(nbytes, dtype="uint8")
+                _read_frame_bytes(self.proc.stdout, nbytes, self._skip_buffer)
+            else:
+                self._read_raw_frame()
 
             # self.proc.stdout.flush()
-        self.pos += n
+        self.pos += n * self.stride
 
     def read_frame(self):
         """
@@ -186,7 +373,7 @@ class FFMPEG_VideoReader:
         w, h = self.size
         nbytes = self.depth * w * h
 
-        s = self.proc.stdout.read(nbytes)
+        s = self._read_raw_frame()
 
         if len(s) != nbytes:
             warnings.warn(
@@ -229,7 +416,7 @@ class FFMPEG_VideoReader:
             self.last_read = result
 
         # We have to do this down here because `self.pos` is used in the warning above
-        self.pos += 1
+        self.pos += self.stride
 
         return result
 
@@ -245,23 +432,79 @@ class FFMPEG_VideoReader:
         # after the frame is read. This makes the later comparisons easier.
         pos = self.get_frame_number(t) + 1
 
+        if self.proc and self._pid != os.getpid():
+            # The reader was copied in a forked process (see the ``n_jobs`` of
+            # ``write_videofile``) and gets its own ffmpeg process.
+            self._detach_process()
+            self.initialize(t)
+            return self.last_read
+
         # Initialize proc if it is not open
         if not self.proc:
             print("Proc not detected")
             self.initialize(t)
             return self.last_read
 
+        stride = self._detect_stride(pos - 1)
+
         if pos == self.pos:
             return self.last_read
-        elif (pos < self.pos) or (pos > self.pos + 100):
-            # We can't just skip forward to `pos` or it would take too long
+        elif (stride != self.stride) and (stride > 1 or self._needs_restart(pos)):
+            # Restart ffmpeg so that it only outputs the frames of the stride
+            self.stride = stride
             self.initialize(t)
             return self.last_read
-        else:
-            # If pos == self.pos + 1, this line has no effect
-            self.skip_frames(pos - self.pos - 1)
-            result = self.read_frame()
-            return result
+        elif self._needs_restart(pos):
+            self.initialize(t)
+            return self.last_read
+
+        # If pos == self.pos + self.stride, this line has no effect
+        self.skip_frames((pos - self.pos) // self.stride - 1)
+        result = self.read_frame()
+        return result
+
+    def _detect_stride(self, frame_number):
+        """Records the frame requested, and returns the constant stride between
+        the last frames requested if there is one, otherwise 1.
+        """
+        if self._last_requested_frame is None:
+            self._last_requested_frame = frame_number
+        elif frame_number != self._last_requested_frame:
+            step = frame_number - self._last_requested_frame
+            if step == self._last_step:
+                self._step_repeats += 1
+            else:
+                self._step_repeats = 0
+            self._last_step = step
+            self._last_requested_frame = frame_number
+
+        # The stride must have been seen 3 times in a row. Sparser frames are
+        # better reached by seeking than by decoding all the frames in between.
+        if (self._step_repeats >= 2) and (1 < self._last_step <= MAX_FORWARD_FRAMES):
+            return self._last_step
+        return 1
+
+    def _needs_restart(self, pos):
+        """Returns whether ffmpeg has to be restarted to get to the frame
+        position ``pos`` (as computed in ``get_frame``) instead of reading
+        forward from the current position.
+        """
+        if pos < self.pos:
+            return True
+        elif self.stride > 1:
+            # Only the frames of the stride can be read forward
+            n_strides, remainder = divmod(pos - self.pos, self.stride)
+            return (remainder != 0) or (n_strides > MAX_FORWARD_FRAMES)
+        elif self.keyframes is not None:
+            # Seeking is only worth it if a keyframe stands between the current
+            # position and the wanted frame, otherwise ffmpeg would have to
+            # decode the very same frames than when skipping forward.
+            keyframe_number = self.get_keyframe_number(pos - 1)
+            return (keyframe_number is not None) and (
+                self.keyframe_numbers[keyframe_number] > self.pos
+            )
+        # We can't just skip forward to `pos` or it would take too long
+        return pos > self.pos + MAX_FORWARD_FRAMES
 
     @property
     def lastread(self):
@@ -276,15 +519,50 @@ class FFMPEG_VideoReader:
         # are getting the nth frame by writing get_frame(n/fps).
         return int(self.fps * t + 0.00001)
 
+    def get_keyframe_number(self, frame_number):
+        """Helper method to return the position, in ``self.keyframes``, of the
+        last keyframe at or before the frame ``frame_number``. Returns ``None``
+        if there is no such keyframe or if the reader has no keyframe index.
+        """
+        if self.keyframe_numbers is None:
+            return None
+        index = bisect_right(self.keyframe_numbers, frame_number) - 1
+        return index if index >= 0 else None
+
+    def _detach_process(self):
+        """Forgets the ffmpeg process and prefetch thread of the reader, which
+        belong to the process from which the current process was forked, and
+        must be left running for it.
+        """
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+        self.proc = None
+        self._prefetch_thread = None
+        self._prefetch_queue = None
+        _PREFETCHING_READERS.discard(self)
+
     def close(self, delete_lastread=True):
         """Closes the reader terminating the process, if is still open."""
+        if self.proc and self._pid != os.getpid():
+            self._detach_process()
         if self.proc:
             if self.proc.poll() is None:
                 self.proc.terminate()
+                if self._prefetch_thread is not None:
+                    # The thread is unblocked by the termination of ffmpeg, and
+                    # must be done with stdout before it is closed.
+                    self._prefetch_stop.set()
+                    self._prefetch_thread.join()
                 self.proc.stdout.close()
                 self.proc.stderr.close()
                 self.proc.wait()
             self.proc = None
+        if self._prefetch_thread is not None:
+            self._prefetch_stop.set()
+            self._prefetch_thread.join()
+            self._prefetch_thread = None
+            self._prefetch_queue = None
+            _PREFETCHING_READERS.discard(self)
         if delete_lastread and hasattr(self, "last_read"):
             del self.last_read
 
@@ -292,6 +570,282 @@ class FFMPEG_VideoReader:
         self.close()
 
 
+def _close_prefetching_readers():
+    """Closes the readers of the current process whose prefetch thread is
+    running, before the process is forked: the threads don't exist in the
+    forked processes, where they could leave the output of ffmpeg locked. The
+    readers start ffmpeg again when their next frame is read.
+    """
+    for reader in list(_PREFETCHING_READERS):
+        reader.close(delete_lastread=False)
+
+
+def _target_size(size, target_resolution):
+    """Returns the size of frames of the given size once resized to
+    ``target_resolution``, in which one dimension can be ``None`` to keep the
+    aspect ratio.
+    """
+    if None in target_resolution:
+        ratio = 1
+        for idx, target in enumerate(target_resolution):
+            if target:
+                ratio = target / size[idx]
+        return (int(size[0] * ratio), int(size[1] * ratio))
+    return target_resolution
+
+
+def _read_frame_bytes(stdout, nbytes, buffer=None):
+    """Reads a frame of ``nbytes`` bytes from ``stdout``. If ``buffer`` is
+    provided the frame is read into it, and a read-only view on the bytes read
+    is returned. Less bytes are returned at the end of the stream.
+    """
+    if buffer is None:
+        return stdout.read(nbytes)
+
+    view = memoryview(buffer)
+    n_read = 0
+    while n_read < nbytes:
+        n = stdout.readinto(view[n_read:nbytes])
+        if not n:
+            break
+        n_read += n
+    data = buffer[:n_read]
+    data.flags.writeable = False
+    return data
+
+
+def _prefetch_frames(
+    stdout, nbytes, frames_queue, stop_event, buffers=None, buffer_index=0
+):
+    """Reads frames of ``nbytes`` bytes from ``stdout`` and puts them in
+    ``frames_queue`` until the end of the stream or until ``stop_event`` is
+    set. The last item put is shorter than ``nbytes`` (possibly empty) when
+    the end of the stream is reached.
+
+    If ``buffers`` is provided, the frames are read into its arrays in turns,
+    starting with the one at ``buffer_index``.
+
+    This is the target of the prefetch thread of ``FFMPEG_VideoReader``.
+    """
+    while not stop_event.is_set():
+        buffer = None
+        if buffers is not None:
+            buffer = buffers[buffer_index]
+            buffer_index = (buffer_index + 1) % len(buffers)
+        try:
+            data = _read_frame_bytes(stdout, nbytes, buffer)
+        except (OSError, ValueError):  # stream closed by the reader
+            data = b""
+        while not stop_event.is_set():
+            try:
+                frames_queue.put(data, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        if len(data) != nbytes:
+            return
+
+
+class FFMPEG_VideoReaderPool:
+    """Pool of ffmpeg processes reading video files, shared by clips.
+
+    Instead of each clip holding its own ``FFMPEG_VideoReader``, the clips
+    reading the same file with the same parameters lease readers from the
+    pool (see ``lease``). Every frame is read by the reader of the pool whose
+    current position is the closest before the frame, so that no reader has
+    to restart ffmpeg while another one could read forward. New readers are
+    started until ``max_processes`` ffmpeg processes are alive in the pool,
+    after which the least recently used reader is reused.
+
+    .. code:: python
+
+        pool = FFMPEG_VideoReaderPool(max_processes=4)
+        clips = [
+            VideoFileClip("long_video.mp4", reader_pool=pool).subclipped(t, t + 2)
+            for t in range(0, 100, 10)
+        ]
+
+    Parameters
+    ----------
+
+    max_processes
+      Maximum number of ffmpeg processes alive at the same time in the pool.
+    """
+
+    # The pool doesn't change the frames of the clips using it, so it is not
+    # part of their fingerprint (see ``moviepy.video.io.render_cache``)
+    _render_cache_ignored = True
+
+    def __init__(self, max_processes=4):
+        self._readers = {}  # key -> readers of that key
+        self._leases = {}  # key -> number of leases of that key
+        self._last_used = {}  # reader -> time of last use
+        self._clock = 0
+        self._lock = threading.RLock()
+        if max_processes < 1:
+            raise ValueError("A reader pool needs at least one process.")
+        self.max_processes = max_processes
+
+    @property
+    def n_processes(self):
+        """Number of ffmpeg processes currently alive in the pool."""
+        return sum(len(readers) for readers in self._readers.values())
+
+    def lease(self, filename, **reader_params):
+        """Returns a ``PooledVideoReader``, which reads the frames of
+        ``filename`` with the readers of the pool. ``reader_params`` are the
+        parameters of ``FFMPEG_VideoReader``, the readers being shared by the
+        leases with the same filename and parameters.
+        """
+        key = (
+            os.path.abspath(filename),
+            tuple(
+                sorted(
+                    (name, tuple(value) if isinstance(value, list) else value)
+                    for name, value in reader_params.items()
+                )
+            ),
+        )
+        with self._lock:
+            if key not in self._leases:
+                self._readers[key] = []
+                self._leases[key] = 0
+            if not self._readers[key]:
+                self._add_reader(key, filename, reader_params)
+            template = self._readers[key][0]
+            self._leases[key] += 1
+        return PooledVideoReader(self, key, filename, reader_params, template)
+
+    def release(self, key):
+        """Releases a lease of ``key``. The readers of a key are closed once all
+        its leases have been released.
+        """
+        with self._lock:
+            if key not in self._leases:  # the pool has been closed
+                return
+            self._leases[key] -= 1
+            if self._leases[key] == 0:
+                for reader in self._readers.pop(key):
+                    self._close_reader(reader)
+                del self._leases[key]
+
+    def get_frame(self, key, filename, reader_params, t):
+        """Reads the frame at time ``t`` with the best reader of ``key``."""
+        with self._lock:
+            reader = self._pick_reader(key, filename, reader_params, t)
+            self._clock += 1
+            self._last_used[reader] = self._clock
+            return reader.get_frame(t)
+
+    def close(self):
+        """Closes all the readers of the pool."""
+        with self._lock:
+            for readers in self._readers.values():
+                for reader in readers:
+                    self._close_reader(reader)
+            self._readers = {}
+            self._leases = {}
+
+    def _pick_reader(self, key, filename, reader_params, t):
+        readers = self._readers[key]
+        if readers:
+            # Readers which can get to the frame without restarting ffmpeg
+            pos = readers[0].get_frame_number(t) + 1
+            candidates = [
+                reader
+                for reader in readers
+                if reader.proc and not reader._needs_restart(pos)
+            ]
+            if candidates:
+                return min(candidates, key=lambda reader: pos - reader.pos)
+
+        if (not readers) or (self.n_processes < self.max_processes):
+            return self._add_reader(key, filename, reader_params)
+        # The least recently used reader of the key will seek to the frame
+        return min(readers, key=self._last_used.__getitem__)
+
+    def _add_reader(self, key, filename, reader_params):
+        """Starts a new reader for ``key``, closing the least recently used
+        reader of the pool if there are already too many processes.
+        """
+        if self.n_processes >= self.max_processes:
+            oldest_key, oldest = min(
+                (
+                    (reader_key, reader)
+                    for reader_key, readers in self._readers.items()
+                    for reader in readers
+                ),
+                key=lambda item: self._last_used[item[1]],
+            )
+            self._readers[oldest_key].remove(oldest)
+            self._close_reader(oldest)
+
+        reader = FFMPEG_VideoReader(filename, **reader_params)
+        self._readers[key].append(reader)
+        self._clock += 1
+        self._last_used[reader] = self._clock
+        return reader
+
+    def _close_reader(self, reader):
+        reader.close()
+        self._last_used.pop(reader, None)
+
+    def __del__(self):
+        self.close()
+
+
+class PooledVideoReader:
+    """Reader of a video file leased from a ``FFMPEG_VideoReaderPool``.
+
+    It provides the same attributes and ``get_frame`` method as
+    ``FFMPEG_VideoReader``, the frames being read by the readers of the pool.
+    Closing it releases the lease.
+    """
+
+    def __init__(self, pool, key, filename, reader_params, template):
+        self.pool = pool
+        self.key = key
+        self.filename = filename
+        self.reader_params = reader_params
+        for attribute in [
+            "fps",
+            "size",
+            "rotation",
+            "duration",
+            "ffmpeg_duration",
+            "n_frames",
+            "bitrate",
+            "infos",
+            "pixel_format",
+            "depth",
+            "keyframes",
+            "keyframe_numbers",
+            "resize_algo",
+            "decoder_options",
+            "input_filters",
+        ]:
+            setattr(self, attribute, getattr(template, attribute))
+
+    def get_frame(self, t):
+        """Read a file video frame at time t, with the readers of the pool."""
+        if self.pool is None:
+            raise ValueError("MoviePy error: the pooled reader has been closed.")
+        return self.pool.get_frame(self.key, self.filename, self.reader_params, t)
+
+    def get_frame_number(self, t):
+        """Helper method to return the frame number at time ``t``"""
+        return int(self.fps * t + 0.00001)
+
+    def close(self):
+        """Releases the lease of the pool's readers."""
+        if self.pool is not None:
+            self.pool.release(self.key)
+            self.pool = None
+
+    def __del__(self):
+        self.close()
+
+
 def ffmpeg_read_image(filename, with_mask=True, pixel_format=None):
     """Read an image file (PNG, BMP, JPEG...).
 
@@ -638,6 +1192,14 @@ class FFmpegInfosParser:
             block.data["codec_name"] = codec_name
             block.data["profile"] = profile
 
+        # The pixel format follows the codec, like in
+        # "Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), ..."
+        pixel_format_match = re.search(
+            r"Video:[^,]*,\s*(\w+)[,(]", block.head_line.lstrip()
+        )
+        if pixel_format_match is not None:
+            block.data["pixel_format"] = pixel_format_match.group(1)
+
         # Store default stream, or first stream if we dont find any default
         if block.data["default"] or not self.video_stream:
             self.video_stream = block
@@ -711,6 +1273,9 @@ class FFmpegInfosParser:
                 "codec_name", None
             )
             self.result["video_profile"] = self.video_stream.data.get("profile", None)
+            self.result["video_pixel_format"] = self.video_stream.data.get(
+                "pixel_format", None
+            )
             for child in self.video_stream.childs:
                 if child.type in ("metadata", "side_data"):
                     for key, data in child.data.items():
@@ -839,6 +1404,7 @@ def ffmpeg_parse_infos(
     fps_source="fps",
     decode_file=False,
     print_infos=False,
+    cache_dir=None,
 ):
     """Get the information of a file using ffmpeg.
 
@@ -858,6 +1424,7 @@ def ffmpeg_parse_infos(
     - ``"video_fps"``
     - ``"video_found"``
     - ``"video_n_frames"``
+    - ``"video_pixel_format"``
     - ``"video_profile"``
     - ``"video_rotation"``
     - ``"video_size"``
@@ -885,34 +1452,49 @@ def ffmpeg_parse_infos(
       Indicates if the whole file must be read to retrieve their duration.
       This is needed for some files in order to get the correct duration (see
       https://github.com/Zulko/moviepy/pull/1222).
-    """
-    # Open the file in a pipe, read output
-    cmd = [FFMPEG_BINARY, "-hide_banner", "-i", ffmpeg_escape_filename(filename)]
-    if decode_file:
-        cmd.extend(["-f", "null", "-"])
 
-    popen_params = cross_platform_popen_params(
-        {
-            "bufsize": 10**5,
-            "stdout": sp.PIPE,
-            "stderr": sp.PIPE,
-            "stdin": sp.DEVNULL,
-        }
+    cache_dir
+      Directory where the output of ffmpeg is kept between runs, so that
+      opening the same file again doesn't need to run ffmpeg. Entries are
+      keyed on the path, size and modification time of the file and on the
+      ffmpeg binary used. Defaults to the ``MOVIEPY_CACHE_DIR`` environment
+      variable, the cache being disabled if it isn't set.
+    """
+    cache_path = _media_cache_path(
+        cache_dir or MOVIEPY_CACHE_DIR, "infos", filename, decode_file
     )
+    cached = _read_media_cache(cache_path)
 
-    proc = sp.Popen(cmd, **popen_params)
-    (output, error) = proc.communicate()
-    infos = error.decode("utf8", errors="ignore")
+    if cached is not None:
+        infos = cached["infos"]
+    else:
+        # Open the file in a pipe, read output
+        cmd = [FFMPEG_BINARY, "-hide_banner", "-i", ffmpeg_escape_filename(filename)]
+        if decode_file:
+            cmd.extend(["-f", "null", "-"])
 
-    proc.terminate()
-    del proc
+        popen_params = cross_platform_popen_params(
+            {
+                "bufsize": 10**5,
+                "stdout": sp.PIPE,
+                "stderr": sp.PIPE,
+                "stdin": sp.DEVNULL,
+            }
+        )
+
+        proc = sp.Popen(cmd, **popen_params)
+        (output, error) = proc.communicate()
+        infos = error.decode("utf8", errors="ignore")
+
+        proc.terminate()
+        del proc
 
     if print_infos:
         # print the whole info text returned by FFMPEG
         print(infos)
 
     try:
-        return FFmpegInfosParser(
+        result = FFmpegInfosParser(
             infos,
             filename,
             fps_source=fps_source,
@@ -927,3 +1509,441 @@ def ffmpeg_parse_infos(
         elif not os.path.exists(filename):
             raise FileNotFoundError(f"'{filename}' not found")
         raise IOError(f"Error passing `ffmpeg -i` command output: \n\n{infos}") from exc
+
+    # Only cache the outputs that could be parsed
+    if cached is None:
+        _write_media_cache(cache_path, {"infos": infos})
+    return result
+
+
+# Keyframes times already read by ``ffmpeg_read_keyframes``, by file identity
+_KEYFRAMES_CACHE = {}
+
+
+def ffmpeg_read_keyframes(filename, start=0, cache_dir=None):
+    """Get the times of the keyframes of the video stream of a file.
+
+    The packets of the video stream are copied (not decoded) by ffmpeg to its
+    ``framecrc`` muxer, which reports the flags of each packet, so that
+    building the index is very fast even for long videos. The result is
+    memoized for the lifetime of the file, and kept in ``cache_dir`` (see
+    ``ffmpeg_parse_infos``) between runs.
+
+    Returns a sorted list of times in seconds.
+
+    Parameters
+    ----------
+
+    filename
+      Name of the video file.
+
+    start
+      Start time of the file as reported by ffmpeg (``"start"`` field of
+      ``ffmpeg_parse_infos``), subtracted from the packets timestamps so that
+      keyframe times match the ones used for seeking.
+
+    cache_dir
+      Directory where the index is kept between runs. Defaults to the
+      ``MOVIEPY_CACHE_DIR`` environment variable.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, start)
+    if key in _KEYFRAMES_CACHE:
+        return list(_KEYFRAMES_CACHE[key])
+
+    cache_path = _media_cache_path(
+        cache_dir or MOVIEPY_CACHE_DIR, "keyframes", filename, start
+    )
+    cached = _read_media_cache(cache_path)
+    if cached is not None:
+        _KEYFRAMES_CACHE[key] = tuple(cached["keyframes"])
+        return list(cached["keyframes"])
+
+    cmd = [
+        FFMPEG_BINARY,
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        ffmpeg_escape_filename(filename),
+        "-map",
+        "0:v:0",
+        "-c",
+        "copy",
+        "-f",
+        "framecrc",
+        "-",
+    ]
+
+    popen_params = cross_platform_popen_params(
+        {"stdout": sp.PIPE, "stderr": sp.PIPE, "stdin": sp.DEVNULL}
+    )
+
+    proc = sp.Popen(cmd, **popen_params)
+    output, error = proc.communicate()
+
+    if proc.returncode:
+        raise IOError(
+            "MoviePy error: failed to read the keyframes of file '%s':\n\n%s"
+            % (filename, error.decode("utf8", errors="ignore"))
+        )
+
+    time_base = 1.0
+    keyframes = []
+    for line in output.decode("utf8", errors="ignore").splitlines():
+        if line.startswith("#tb 0:"):
+            num, den = line.split(":", 1)[1].strip().split("/")
+            time_base = int(num) / int(den)
+        elif line and not line.startswith("#"):
+            fields = [field.strip() for field in line.split(",")]
+            if _framecrc_flags(fields) & 1:
+                keyframes.append(int(fields[2]) * time_base - start)
+
+    keyframes.sort()
+    _KEYFRAMES_CACHE[key] = tuple(keyframes)
+    _write_media_cache(cache_path, {"keyframes": keyframes})
+    return keyframes
+
+
+def _framecrc_flags(fields):
+    """Returns the flags of a packet from the fields of its line in the output
+    of the ``framecrc`` muxer of ffmpeg.
+
+    The fields are ``stream_index, dts, pts, duration, size, hash``, followed by
+    the flags (``F=0x..``), which are only printed when they are not exactly
+    the keyframe flag (``AV_PKT_FLAG_KEY``), and by the number of side data
+    (``S=..``) and the side data, if any.
+    """
+    for field in fields[6:]:
+        if field.startswith("F="):
+            return int(field[2:], 16)
+    return 1  # AV_PKT_FLAG_KEY
+
+
+def ffmpeg_probe_video_output(
+    filename, decoder_options=None, input_filters=None, cache_dir=None
+):
+    """Get the size and frame rate of the frames of the video stream of a file
+    once decoded with ``decoder_options`` and filtered with ``input_filters``
+    (see ``FFMPEG_VideoReader``).
+
+    A single frame is decoded by ffmpeg, and the properties of the output
+    stream are read from its logs. Returns a dictionary with the keys
+    ``video_size`` and ``video_fps`` (``None`` if it can't be read).
+
+    Parameters
+    ----------
+
+    filename
+      Name of the video file.
+
+    decoder_options
+      List of ffmpeg options placed before the input file.
+
+    input_filters
+      List of ffmpeg filters applied to the frames.
+
+    cache_dir
+      Directory where the result is kept between runs. Defaults to the
+      ``MOVIEPY_CACHE_DIR`` environment variable.
+    """
+    decoder_options = list(decoder_options or [])
+    input_filters = list(input_filters or [])
+    cache_path = _media_cache_path(
+        cache_dir or MOVIEPY_CACHE_DIR,
+        "output",
+        filename,
+        decoder_options,
+        input_filters,
+    )
+    cached = _read_media_cache(cache_path)
+    if cached is not None:
+        return cached
+
+    cmd = [FFMPEG_BINARY, "-hide_banner"] + decoder_options
+    cmd += ["-i", ffmpeg_escape_filename(filename), "-map", "0:v:0"]
+    if input_filters:
+        cmd += ["-vf", ",".join(input_filters)]
+    cmd += ["-frames:v", "1", "-f", "null", "-"]
+
+    popen_params = cross_platform_popen_params(
+        {"stdout": sp.DEVNULL, "stderr": sp.PIPE, "stdin": sp.DEVNULL}
+    )
+    proc = sp.Popen(cmd, **popen_params)
+    _, error = proc.communicate()
+    infos = error.decode("utf8", errors="ignore")
+
+    stream_line = None
+    if "Output #0" in infos:
+        output_infos = infos[infos.index("Output #0") :]
+        stream_line = re.search(r"Stream #\d+:\d+.*: Video: .*", output_infos)
+    if proc.returncode or (stream_line is None):
+        raise IOError(
+            (
+                "MoviePy error: failed to decode file '%s' with the options %s "
+                "and filters %s.\nHere is what ffmpeg says:\n\n%s"
+            )
+            % (filename, decoder_options, input_filters, infos)
+        )
+
+    stream_line = stream_line.group(0)
+    size_match = re.search(r" (\d+)x(\d+)[,\s]", stream_line)
+    fps_match = re.search(r" (\d+.?\d*) fps", stream_line)
+    result = {
+        "video_size": [int(size_match.group(1)), int(size_match.group(2))],
+        "video_fps": float(fps_match.group(1)) if fps_match else None,
+    }
+    _write_media_cache(cache_path, result)
+    return result
+
+
+# ffmpeg filters changing the times or the number of the frames
+_TIME_FILTERS = {
+    "decimate",
+    "fps",
+    "framerate",
+    "framestep",
+    "loop",
+    "minterpolate",
+    "mpdecimate",
+    "reverse",
+    "select",
+    "setpts",
+    "telecine",
+    "thumbnail",
+    "tinterlace",
+    "tpad",
+    "trim",
+    "yadif",
+}
+
+
+def _frame_filters(input_filters):
+    """Returns the list of the filters of ``input_filters`` transforming each
+    frame, without the ones changing the times or the number of the frames
+    (like ``fps``, ``select`` or ``trim``), so that each frame output by ffmpeg
+    is still the frame of the file at the same time.
+    """
+    if isinstance(input_filters, str):
+        input_filters = [input_filters]
+    filters = []
+    for chain in input_filters or []:
+        # The commas separating filters, not the ones quoted in their options
+        for input_filter in re.split(r",(?=(?:[^']*'[^']*')*[^']*$)", chain):
+            name = input_filter.split("=", 1)[0].strip()
+            if name and name not in _TIME_FILTERS:
+                filters.append(input_filter.strip())
+    return filters
+
+
+def ffmpeg_iter_keyframes(
+    filename,
+    size,
+    decoder_options=None,
+    input_filters=None,
+    pixel_format="rgb24",
+    resize_algo="bicubic",
+):
+    """Yields the keyframes of the video stream of a file, resized to ``size``.
+
+    Only the keyframes are decoded by ffmpeg (``-skip_frame nokey``), which is
+    much faster than decoding the whole video, and they are resized by ffmpeg
+    before being piped. Their times are given by ``ffmpeg_read_keyframes``.
+    The filters of ``input_filters`` changing the times or the number of the
+    frames (like ``fps``, ``select`` or ``trim``) are not applied, so that a
+    frame is yielded for each keyframe.
+
+    Parameters
+    ----------
+
+    filename
+      Name of the video file.
+
+    size
+      Size ``(width, height)`` of the frames yielded.
+
+    decoder_options, input_filters
+      ffmpeg input options and filters, as for ``FFMPEG_VideoReader``.
+
+    pixel_format
+      Pixel format of the frames yielded.
+
+    resize_algo
+      The algorithm used by ffmpeg for resizing.
+    """
+    cmd = [FFMPEG_BINARY, "-skip_frame", "nokey"] + list(decoder_options or [])
+    cmd += ["-i", ffmpeg_escape_filename(filename)] + _passthrough_options()
+    yield from _ffmpeg_iter_raw_frames(
+        cmd, size, _frame_filters(input_filters), pixel_format, resize_algo
+    )
+
+
+def ffmpeg_read_frame_at(
+    filename,
+    t,
+    size,
+    accurate=True,
+    decoder_options=None,
+    input_filters=None,
+    pixel_format="rgb24",
+    resize_algo="bicubic",
+):
+    """Returns the frame of a video file at time ``t``, resized to ``size``,
+    using a new ffmpeg process which seeks directly to ``t``.
+
+    If ``accurate`` is ``False``, the frame returned is the keyframe at or
+    before ``t``, which avoids decoding the frames between them. Other
+    parameters are the ones of ``ffmpeg_iter_keyframes``, the filters changing
+    the times of the frames being likewise not applied. Returns ``None`` if
+    there is no frame at ``t``.
+    """
+    cmd = [FFMPEG_BINARY] + list(decoder_options or [])
+    if not accurate:
+        cmd.append("-noaccurate_seek")
+    cmd += ["-ss", "%.06f" % t, "-i", ffmpeg_escape_filename(filename)]
+    cmd += ["-frames:v", "1"]
+    for frame in _ffmpeg_iter_raw_frames(
+        cmd, size, _frame_filters(input_filters), pixel_format, resize_algo
+    ):
+        return frame.copy()
+    return None
+
+
+def _ffmpeg_iter_raw_frames(cmd, size, input_filters, pixel_format, resize_algo):
+    """Runs the ffmpeg command ``cmd`` (up to the output options), with the
+    frames filtered and resized to ``size``, and yields them as arrays. The
+    arrays are only valid until the next one is yielded.
+    """
+    w, h = size
+    depth = 4 if pixel_format[-1] == "a" else 3
+    nbytes = depth * w * h
+    cmd = cmd + [
+        "-loglevel",
+        "error",
+        "-f",
+        "image2pipe",
+        "-vf",
+        ",".join(list(input_filters or []) + ["scale=%d:%d" % (w, h)]),
+        "-sws_flags",
+        resize_algo,
+        "-pix_fmt",
+        pixel_format,
+        "-vcodec",
+        "rawvideo",
+        "-",
+    ]
+    popen_params = cross_platform_popen_params(
+        {
+            "bufsize": nbytes + 100,
+            "stdout": sp.PIPE,
+            "stderr": sp.PIPE,
+            "stdin": sp.DEVNULL,
+        }
+    )
+    proc = sp.Popen(cmd, **popen_params)
+    buffer = np.empty(nbytes, dtype="uint8")
+    try:
+        while True:
+            data = _read_frame_bytes(proc.stdout, nbytes, buffer)
+            if len(data) != nbytes:
+                break
+            yield data.reshape((h, w, depth))
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+        error = proc.stderr.read()
+        proc.stderr.close()
+        proc.wait()
+
+    if proc.returncode and len(data) != nbytes:
+        raise IOError(
+            "MoviePy error: failed to read the frames with ffmpeg:\n\n%s"
+            % error.decode("utf8", errors="ignore")
+        )
+
+
+@lru_cache(maxsize=None)
+def _passthrough_options():
+    """Returns the ffmpeg output options passing the frames through with their
+    timestamps, without duplicating or dropping frames: ``-fps_mode`` replaced
+    ``-vsync`` in ffmpeg 5.1, and ``-vsync`` is deprecated since.
+    """
+    try:
+        version = [int(n) for n in ffmpeg_version()[1].split(".") if n][:2]
+    except (OSError, sp.SubprocessError, AttributeError, IndexError, ValueError):
+        # Versions which can't be parsed are development builds
+        version = None
+    if version and version < [5, 1]:
+        return ["-vsync", "passthrough"]
+    return ["-fps_mode", "passthrough"]
+
+
+@lru_cache(maxsize=None)
+def _ffmpeg_binary_identity():
+    """Returns the path, size and modification time of the ffmpeg binary, used
+    to discard the cached informations when ffmpeg is changed.
+    """
+    path = shutil.which(FFMPEG_BINARY) or FFMPEG_BINARY
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return [path]
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _media_cache_path(cache_dir, kind, filename, *params):
+    """Returns the path of the file of ``cache_dir`` holding the informations of
+    type ``kind`` read by ffmpeg on ``filename`` with the parameters ``params``.
+
+    Returns ``None`` if the cache is disabled or if the file can't be
+    identified (for instance URLs).
+    """
+    if not cache_dir:
+        return None
+    try:
+        stat = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+
+    key = json.dumps(
+        [
+            kind,
+            os.path.abspath(filename),
+            stat.st_size,
+            stat.st_mtime_ns,
+            _ffmpeg_binary_identity(),
+            *params,
+        ]
+    )
+    digest = hashlib.sha1(key.encode("utf8")).hexdigest()
+    return os.path.join(cache_dir, "%s-%s.json" % (kind, digest))
+
+
+def _read_media_cache(cache_path):
+    """Returns the data stored in a cache file, or ``None`` if there is none."""
+    if cache_path is None:
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_media_cache(cache_path, data):
+    """Stores data in a cache file. The file is first written under a temporary
+    name then renamed, so that concurrent processes never read partial files.
+    Failures are ignored, the cache being only an optimization.
+    """
+    if cache_path is None:
+        return
+    temp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, "w", encoding="utf8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
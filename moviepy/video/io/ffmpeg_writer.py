@@ -3,13 +3,39 @@ On the long term this will implement several methods to make videos
 out of VideoClips
 """
 
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
 import subprocess as sp
+import sys
+import threading
+import time
+import traceback
+import warnings
+from fractions import Fraction
+from functools import lru_cache
 
 import numpy as np
 from proglog import proglog
 
+from moviepy.Clip import Clip
 from moviepy.config import FFMPEG_BINARY
 from moviepy.tools import cross_platform_popen_params, ffmpeg_escape_filename
+from moviepy.video.io.ffmpeg_reader import _close_prefetching_readers
+from moviepy.video.io.ffmpeg_tools import ffmpeg_version
+from moviepy.video.io.render_cache import RenderCache
+
+
+# Names of the ffmpeg formats (muxers) which differ from the file extensions
+_FFMPEG_FORMATS = {
+    "mkv": "matroska",
+    "ogv": "ogg",
+    "ts": "mpegts",
+    "m3u8": "hls",
+    "mpd": "dash",
+}
 
 
 class FFMPEG_VideoWriter:
@@ -18,10 +44,13 @@ class FFMPEG_VideoWriter:
     Parameters
     ----------
 
-    filename : str
+    filename : str or file object
       Any filename like ``"video.mp4"`` etc. but if you want to avoid
       complications it is recommended to use the generic extension ``".avi"``
-      for all your videos.
+      for all your videos. It can also be a file object opened for writing
+      bytes, like ``sys.stdout``, a socket file or a ``BytesIO``, to which the
+      video is written as ffmpeg outputs it, so that it can be sent or served
+      while it is being written. ``output_format`` is then required.
 
     size : tuple or list
       Size of the output video in pixels (width, height).
@@ -45,7 +74,25 @@ class FFMPEG_VideoWriter:
       The name of an audio file that will be incorporated to the video.
 
     audio_codec : str, optional
-      FFMPEG audio codec. If None, ``"copy"`` codec is used.
+      FFMPEG audio codec. If None, ``"copy"`` codec is used for ``audiofile``,
+      and the default codec of the format of the file for ``audio_fps``.
+
+    audio_fps : int, optional
+      If provided, the writer also receives raw audio at this frame rate,
+      given to ``write_audio`` alongside the frames of the video, and
+      sent to ffmpeg through a second pipe, so that the audio and the video
+      are encoded and muxed together without a temporary audio file. Not
+      available on Windows.
+
+    audio_nchannels : int, optional
+      Number of channels of the raw audio given to ``write_audio``.
+
+    audio_nbytes : int, optional
+      Number of bytes of the samples of the raw audio (2 for 16 bits, 4 for
+      32 bits) given to ``write_audio``.
+
+    audio_bitrate : str, optional
+      Bitrate of the audio encoded from the raw audio, like ``"128k"``.
 
     preset : str, optional
       Sets the time that FFMPEG will take to compress the video. The slower,
@@ -60,6 +107,13 @@ class FFMPEG_VideoWriter:
     with_mask : bool, optional
       Set to ``True`` if there is a mask in the video to be encoded.
 
+    input_pixel_format : str, optional
+      Pixel format of the frames given to ``write_frame``, which are sent as
+      they are to ffmpeg, like ``"bgr24"``, ``"gray"`` or ``"yuv420p"`` for
+      frames already converted to YUV (as arrays holding the bytes of the
+      planes), so that ffmpeg doesn't convert them again. Default is
+      ``"rgba"`` if ``with_mask`` is ``True``, else ``"rgb24"``.
+
     pixel_format : str, optional
       Optional: Pixel format for the output video file. If is not specified
       ``"rgb24"`` will be used as the default format unless ``with_mask`` is
@@ -80,6 +134,32 @@ class FFMPEG_VideoWriter:
       If set to ``True``, the ffmpeg command used to write the video will be
       printed to the console. This can be useful for debugging purposes.
       Default is ``False``.
+
+    output_format : str, optional
+      Format of the output, as a file extension or a ffmpeg format name, like
+      ``"mp4"``, ``"webm"``, ``"mkv"``, ``"ts"``, ``"hls"`` or ``"segment"``.
+      By default it is found by ffmpeg from the extension of ``filename``.
+      The MP4 and MOV videos written to file objects are fragmented, as these
+      formats can't be written sequentially otherwise.
+
+    queue_size : int, optional
+      If positive, ``write_frame`` only puts the frames in a queue of at most
+      ``queue_size`` frames, and they are written to ffmpeg by a separate
+      thread, so that the next frames can be computed while ffmpeg reads and
+      encodes the previous ones. The frames must then not be modified once
+      given to ``write_frame`` (frames read with ``frame_buffers`` need more
+      buffers than ``queue_size``). Default is 0 (frames are written
+      immediately).
+
+    Attributes
+    ----------
+
+    timings : dict
+      Time spent (in seconds) in the stages of the writing: ``"write"`` is
+      the time spent writing the frames to ffmpeg, which is waiting for ffmpeg
+      to encode them when it is the bottleneck, and ``"queue"`` the time spent
+      waiting for room in the queue of frames, if any. ``ffmpeg_write_video``
+      adds the time spent computing the frames, ``"frames"``.
     """
 
     def __init__(
@@ -90,6 +170,10 @@ class FFMPEG_VideoWriter:
         codec="libx264",
         audiofile=None,
         audio_codec=None,
+        audio_fps=None,
+        audio_nchannels=2,
+        audio_nbytes=2,
+        audio_bitrate=None,
         preset="medium",
         bitrate=None,
         with_mask=False,
@@ -98,16 +182,26 @@ class FFMPEG_VideoWriter:
         ffmpeg_params=None,
         pixel_format=None,
         print_cmd=False,
+        output_format=None,
+        queue_size=0,
+        input_pixel_format=None,
     ):
         if logfile is None:
             logfile = sp.PIPE
         self.logfile = logfile
+        to_file_object = hasattr(filename, "write")
+        if to_file_object and output_format is None:
+            raise ValueError(
+                "The output_format (like 'mp4' or 'webm') must be provided to "
+                "write a video to a file object"
+            )
         self.filename = filename
         self.codec = codec
         self.audio_codec = audio_codec
-        self.ext = self.filename.split(".")[-1]
+        self.ext = output_format if to_file_object else self.filename.split(".")[-1]
 
-        input_pixel_format = "rgba" if with_mask else "rgb24"
+        if input_pixel_format is None:
+            input_pixel_format = "rgba" if with_mask else "rgb24"
 
         # order is important
         cmd = [
@@ -129,10 +223,37 @@ class FFMPEG_VideoWriter:
             "-i",
             "-",
         ]
+        if audiofile is not None and audio_fps is not None:
+            raise ValueError(
+                "FFMPEG_VideoWriter can't write the audio of both an audiofile "
+                "and of raw audio frames (audio_fps)"
+            )
+        audio_read_fd = None
+        self.audio_pipe = None
         if audiofile is not None:
             if audio_codec is None:
                 audio_codec = "copy"
             cmd.extend(["-i", audiofile, "-acodec", audio_codec])
+        elif audio_fps is not None:
+            audio_read_fd, audio_write_fd = os.pipe()
+            self.audio_pipe = os.fdopen(audio_write_fd, "wb")
+            cmd.extend(
+                [
+                    "-f",
+                    "s%dle" % (8 * audio_nbytes),
+                    "-ar",
+                    "%d" % audio_fps,
+                    "-ac",
+                    "%d" % audio_nchannels,
+                    "-i",
+                    "pipe:%d" % audio_read_fd,
+                ]
+            )
+            if audio_codec is not None:
+                cmd.extend(["-acodec", audio_codec])
+            if audio_bitrate is not None:
+                cmd.extend(["-b:a", audio_bitrate])
+            cmd.extend(["-strict", "-2"])  # needed to support codec 'aac'
 
         if codec == "h264_nvenc":
             cmd.extend(["-c:v", codec])
@@ -167,19 +288,186 @@ class FFMPEG_VideoWriter:
                 pixel_format = "rgba" if with_mask else "rgb24"
             cmd.extend(["-pix_fmt", pixel_format])
 
-        cmd.extend([ffmpeg_escape_filename(filename)])
+        if output_format is not None:
+            cmd.extend(["-f", _FFMPEG_FORMATS.get(output_format, output_format)])
+        stdout = sp.DEVNULL
+        output_file = None
+        if to_file_object:
+            if output_format in ("mp4", "mov") and "-movflags" not in (
+                ffmpeg_params or []
+            ):
+                cmd.extend(["-movflags", "frag_keyframe+empty_moov"])
+            cmd.append("pipe:1")
+            # Text streams like sys.stdout are written through their buffer
+            output_file = getattr(filename, "buffer", filename)
+            output_file.flush()
+            stdout = _fileno(output_file)
+            if stdout is None:
+                # ffmpeg can't write directly to the file, its output is copied
+                stdout = sp.PIPE
+        else:
+            cmd.extend([ffmpeg_escape_filename(filename)])
 
         if print_cmd:
-            print("FFMPEG command:", " ".join(cmd))
+            print(
+                "FFMPEG command:",
+                " ".join(cmd),
+                file=sys.stderr if _writes_to_stdout(filename) else sys.stdout,
+            )
 
         popen_params = cross_platform_popen_params(
-            {"stdout": sp.DEVNULL, "stderr": logfile, "stdin": sp.PIPE}
+            {"stdout": stdout, "stderr": logfile, "stdin": sp.PIPE}
         )
+        if audio_read_fd is not None:
+            popen_params["pass_fds"] = (audio_read_fd,)
 
-        self.proc = sp.Popen(cmd, **popen_params)
+        try:
+            self.proc = sp.Popen(cmd, **popen_params)
+        finally:
+            if audio_read_fd is not None:
+                # Only ffmpeg reads the audio pipe
+                os.close(audio_read_fd)
+
+        self.timings = {"write": 0.0, "queue": 0.0}
+        self._queue = None
+        self._thread = None
+        self._error = None
+        self._error_raised = False
+        self._audio_thread = None
+        self._audio_error = None
+        self._output_thread = None
+        self._output_error = None
+        if stdout == sp.PIPE:
+            self._output_thread = threading.Thread(
+                target=self._copy_output, args=(output_file,), daemon=True
+            )
+            self._output_thread.start()
+        if queue_size > 0:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._write_queued_frames)
+            self._thread.daemon = True
+            self._thread.start()
+        # Buffers in which the frames given with their mask are made RGBA. A
+        # buffer is reused once the frame it holds was written, after it went
+        # through the queue and the writing thread.
+        self._rgba_buffers = [None] * (queue_size + 2 if queue_size > 0 else 1)
+        self._rgba_index = 0
+
+    def write_frame(self, img_array, mask=None):
+        """Writes one frame in the file, or puts it in the queue of the frames
+        to write if the writer has one.
+
+        For a writer created ``with_mask``, the frame can be given as an RGB
+        frame and its ``mask`` (an array of values between 0 and 1), which are
+        copied to a reused RGBA buffer, instead of an RGBA frame.
+        """
+        self._raise_thread_error()
+        if mask is not None:
+            img_array = self._rgba_frame(img_array, mask)
+        if self._queue is None:
+            self._write_frame(img_array)
+            return
+        start = time.perf_counter()
+        if not self._put_in_queue(img_array):
+            self._raise_thread_error()
+            raise IOError(
+                "MoviePy error: the thread writing the frames of the file %s "
+                "stopped" % _output_name(self.filename)
+            )
+        self.timings["queue"] += time.perf_counter() - start
+
+    def _rgba_frame(self, img_array, mask):
+        """Returns the RGB frame and its mask in the next RGBA buffer."""
+        if mask.shape != img_array.shape[:2]:
+            raise ValueError(
+                "MoviePy error: the mask frame of shape %s doesn't match the "
+                "frame of shape %s, it must be a 2D array of the same width and "
+                "height" % (mask.shape, img_array.shape)
+            )
+        buffer = self._rgba_buffers[self._rgba_index]
+        if buffer is None or buffer.shape[:2] != img_array.shape[:2]:
+            buffer = np.empty(img_array.shape[:2] + (4,), dtype="uint8")
+            self._rgba_buffers[self._rgba_index] = buffer
+        self._rgba_index = (self._rgba_index + 1) % len(self._rgba_buffers)
+        buffer[:, :, :3] = img_array
+        np.multiply(mask, 255, out=buffer[:, :, 3], casting="unsafe")
+        return buffer
+
+    def write_audio(self, chunks):
+        """Starts writing the chunks of raw audio of the iterable ``chunks``
+        to ffmpeg, in a separate thread, while the frames of the video are
+        written with ``write_frame``.
+
+        The chunks are arrays of samples of shape ``(n, audio_nchannels)``,
+        quantized on ``audio_nbytes`` bytes, like the ones returned by
+        ``AudioClip.iter_chunks(quantize=True)``.
+        """
+        self._audio_thread = threading.Thread(
+            target=self._write_audio_chunks, args=(chunks,), daemon=True
+        )
+        self._audio_thread.start()
 
-    def write_frame(self, img_array):
-        """Writes one frame in the file."""
+    def _write_audio_chunks(self, chunks):
+        """Writes the chunks of audio to the audio pipe, then closes it."""
+        try:
+            for chunk in chunks:
+                self.audio_pipe.write(chunk.tobytes())
+        except BaseException as err:
+            self._audio_error = err
+        finally:
+            try:
+                self.audio_pipe.close()
+            except IOError:
+                pass
+
+    def _copy_output(self, output_file):
+        """Copies the output of ffmpeg to the file object, in a separate thread.
+        After an error, the output is discarded so that ffmpeg isn't blocked.
+        """
+        for data in iter(lambda: self.proc.stdout.read1(65536), b""):
+            if self._output_error is None:
+                try:
+                    output_file.write(data)
+                except BaseException as err:
+                    self._output_error = err
+
+    def _write_queued_frames(self):
+        """Writes the frames of the queue to ffmpeg until ``None`` is found in
+        it, in the thread of the writer. After an error, the frames are
+        discarded so that ``write_frame`` never blocks.
+        """
+        while True:
+            img_array = self._queue.get()
+            if img_array is None:
+                return
+            if self._error is None:
+                try:
+                    self._write_frame(img_array)
+                except BaseException as err:
+                    self._error = err
+
+    def _put_in_queue(self, item):
+        """Puts the item in the queue of the writing thread, waiting for room
+        in the queue only as long as the thread is alive. Returns whether the
+        item was put in the queue.
+        """
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _raise_thread_error(self):
+        """Raises the error of the writing thread, if any, only once."""
+        if self._error is not None and not self._error_raised:
+            self._error_raised = True
+            raise self._error
+
+    def _write_frame(self, img_array):
+        """Writes one frame to ffmpeg."""
+        start = time.perf_counter()
         try:
             # ffmpeg expects the data to be in C order, so we ensure that
             # the input array is contiguous in memory.
@@ -187,8 +475,16 @@ class FFMPEG_VideoWriter:
                 img_array = img_array.copy(order="C")
 
             self.proc.stdin.write(img_array)
+            self.timings["write"] += time.perf_counter() - start
         except IOError as err:
-            _, ffmpeg_error = self.proc.communicate()
+            if self._output_thread is None:
+                _, ffmpeg_error = self.proc.communicate()
+            else:
+                # The output of ffmpeg is read by the thread copying it
+                ffmpeg_error = None
+                if self.proc.stderr is not None:
+                    ffmpeg_error = self.proc.stderr.read()
+                self.proc.wait()
             if ffmpeg_error is not None:
                 ffmpeg_error = ffmpeg_error.decode()
             else:
@@ -199,7 +495,7 @@ class FFMPEG_VideoWriter:
 
             error = (
                 f"{err}\n\nMoviePy error: FFMPEG encountered the following error while "
-                f"writing file {self.filename}: \n\n {ffmpeg_error}"
+                f"writing file {_output_name(self.filename)}: \n\n {ffmpeg_error}"
             )
 
             if "Unknown encoder" in ffmpeg_error or "Unknown decoder" in ffmpeg_error:
@@ -241,14 +537,44 @@ class FFMPEG_VideoWriter:
             raise IOError(error)
 
     def close(self):
-        """Closes the writer, terminating the subprocess if is still alive."""
+        """Closes the writer, terminating the subprocess if is still alive.
+
+        The frames left in the queue, if any, are written first.
+        """
+        if self._thread is not None:
+            # The error of the thread, if it stopped, is raised below
+            self._put_in_queue(None)
+            self._thread.join()
+            self._thread = None
         if self.proc:
             self.proc.stdin.close()
+            if self._audio_thread is not None:
+                # ffmpeg reads the end of the audio once the video is complete
+                self._audio_thread.join()
+                self._audio_thread = None
+            elif self.audio_pipe is not None and not self.audio_pipe.closed:
+                self.audio_pipe.close()
+            if self._output_thread is not None:
+                self._output_thread.join()
+                self._output_thread = None
+                self.proc.stdout.close()
             if self.proc.stderr is not None:
                 self.proc.stderr.close()
             self.proc.wait()
 
             self.proc = None
+        self._raise_thread_error()
+        if self._output_error is not None:
+            error, self._output_error = self._output_error, None
+            raise error
+        if self._audio_error is not None:
+            error, self._audio_error = self._audio_error, None
+            if isinstance(error, BrokenPipeError):
+                raise IOError(
+                    "%s\n\nMoviePy error: FFMPEG stopped reading the audio while "
+                    "writing the file %s" % (error, _output_name(self.filename))
+                )
+            raise error
 
     # Support the Context Manager protocol, to ensure that resources are cleaned up.
 
@@ -259,6 +585,39 @@ class FFMPEG_VideoWriter:
         self.close()
 
 
+def _output_name(output):
+    """Returns the name of the output of a writer shown in the logs and errors:
+    the filename, or the name of the file object (like ``<stdout>``).
+    """
+    if not hasattr(output, "write"):
+        return output
+    name = getattr(output, "name", None)
+    return name if isinstance(name, str) else "<%s>" % type(output).__name__
+
+
+def _writes_to_stdout(output):
+    """Returns whether the output of a writer is the standard output of the
+    process, on which nothing else can then be printed.
+    """
+    if not hasattr(output, "write"):
+        return False
+    if output is sys.stdout or output is getattr(sys.stdout, "buffer", None):
+        return True
+    # The file descriptor 1 is the standard output, even when sys.stdout is
+    # replaced (for instance by the capture of the outputs of tests)
+    return _fileno(getattr(output, "buffer", output)) == 1
+
+
+def _fileno(file):
+    """Returns the file descriptor of a file object, or ``None`` if it has none
+    (like ``BytesIO``) to which a process can write directly.
+    """
+    try:
+        return file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
 def ffmpeg_write_video(
     clip,
     filename,
@@ -273,18 +632,145 @@ def ffmpeg_write_video(
     ffmpeg_params=None,
     logger="bar",
     pixel_format=None,
+    n_jobs=1,
+    queue_size=0,
+    audio_clip=None,
+    audio_fps=44100,
+    audio_nbytes=2,
+    audio_bufsize=2000,
+    audio_bitrate=None,
+    output_format=None,
+    render_cache=None,
+    smart_cut=False,
 ):
     """Write the clip to a videofile. See VideoClip.write_videofile for details
     on the parameters.
+
+    If ``audio_clip`` is provided, its sound is encoded with ``audio_codec``
+    and muxed with the video by the same ffmpeg process, to which it is sent
+    through a pipe (see ``audio_fps`` in ``FFMPEG_VideoWriter``).
+
+    Returns the time spent in the stages of the writing (see the ``timings``
+    of ``FFMPEG_VideoWriter``), or ``None`` when rendered with ``n_jobs``, a
+    ``render_cache`` or a ``smart_cut``.
     """
+    if logger == "bar" and _writes_to_stdout(filename):
+        # The messages of the logger would be mixed with the video
+        logger = None
     logger = proglog.default_bar_logger(logger)
 
+    segmented = n_jobs > 1 or render_cache is not None or smart_cut
+    if hasattr(filename, "write") and (write_logfile or segmented):
+        raise ValueError(
+            "A video written to a file object can't have a logfile, and can't "
+            "be written in segments (n_jobs, render_cache or smart_cut)"
+        )
+    if audio_clip is not None and segmented:
+        raise ValueError(
+            "The audio can only be sent through a pipe to ffmpeg when the "
+            "video is written by one process (n_jobs=1) without render_cache "
+            "or smart_cut"
+        )
+
     if write_logfile:
         logfile = open(filename + ".log", "w+")
     else:
         logfile = None
 
-    logger(message="MoviePy - Writing video %s\n" % filename)
+    logger(message="MoviePy - Writing video %s\n" % _output_name(filename))
+
+    if n_jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        warnings.warn(
+            "MoviePy can only render videos in parallel on platforms where "
+            "processes can be forked. The video will be rendered with one process.",
+            UserWarning,
+        )
+        n_jobs = 1
+    n_frames = int(clip.duration * fps)
+    if smart_cut:
+        from moviepy.video.io.smart_cut import ffmpeg_write_smart_cut, smart_cut_pieces
+
+        try:
+            pieces, smart_cut_codec, smart_cut_pixel_format = smart_cut_pieces(
+                clip, fps, codec
+            )
+        except ValueError as err:
+            logger(
+                message="MoviePy - The video can't be smart cut (%s), all its "
+                "frames are rendered." % err
+            )
+        else:
+            ffmpeg_write_smart_cut(
+                clip,
+                filename,
+                fps,
+                pieces,
+                logfile=logfile,
+                logger=logger,
+                audiofile=audiofile,
+                audio_codec=audio_codec,
+                output_format=output_format,
+                codec=smart_cut_codec,
+                preset=preset,
+                bitrate=bitrate,
+                threads=threads,
+                ffmpeg_params=ffmpeg_params,
+                pixel_format=smart_cut_pixel_format,
+                queue_size=queue_size,
+            )
+            if write_logfile:
+                logfile.close()
+            logger(message="MoviePy - Done !")
+            return
+    if render_cache is not None:
+        if not isinstance(render_cache, RenderCache):
+            render_cache = RenderCache(render_cache)
+        _ffmpeg_write_video_cached(
+            clip,
+            filename,
+            fps,
+            render_cache,
+            n_jobs=n_jobs,
+            logfile=logfile,
+            logger=logger,
+            audiofile=audiofile,
+            audio_codec=audio_codec,
+            codec=codec,
+            preset=preset,
+            bitrate=bitrate,
+            threads=threads,
+            ffmpeg_params=ffmpeg_params,
+            pixel_format=pixel_format,
+            queue_size=queue_size,
+            output_format=output_format,
+        )
+        if write_logfile:
+            logfile.close()
+        logger(message="MoviePy - Done !")
+        return
+    if min(n_jobs, n_frames) > 1:
+        _ffmpeg_write_video_segments(
+            clip,
+            filename,
+            fps,
+            n_jobs=min(n_jobs, n_frames),
+            logfile=logfile,
+            logger=logger,
+            audiofile=audiofile,
+            audio_codec=audio_codec,
+            codec=codec,
+            preset=preset,
+            bitrate=bitrate,
+            threads=threads,
+            ffmpeg_params=ffmpeg_params,
+            pixel_format=pixel_format,
+            queue_size=queue_size,
+            output_format=output_format,
+        )
+        if write_logfile:
+            logfile.close()
+        logger(message="MoviePy - Done !")
+        return
 
     has_mask = clip.mask is not None
 
@@ -302,21 +788,391 @@ def ffmpeg_write_video(
         threads=threads,
         ffmpeg_params=ffmpeg_params,
         pixel_format=pixel_format,
+        queue_size=queue_size,
+        output_format=output_format,
+        audio_fps=audio_fps if audio_clip is not None else None,
+        audio_nchannels=audio_clip.nchannels if audio_clip is not None else 2,
+        audio_nbytes=audio_nbytes,
+        audio_bitrate=audio_bitrate,
     ) as writer:
+        if audio_clip is not None:
+            writer.write_audio(
+                audio_clip.iter_chunks(
+                    chunksize=audio_bufsize,
+                    quantize=True,
+                    nbytes=audio_nbytes,
+                    fps=audio_fps,
+                )
+            )
+        timings = writer.timings
+        timings["frames"] = 0.0
+        start = time.perf_counter()
         for t, frame in clip.iter_frames(
             logger=logger, with_times=True, fps=fps, dtype="uint8"
         ):
-            if clip.mask is not None:
-                mask = 255 * clip.mask.get_frame(t)
-                if mask.dtype != "uint8":
-                    mask = mask.astype("uint8")
-                frame = np.dstack([frame, mask])
-
-            writer.write_frame(frame)
+            mask = None if clip.mask is None else clip.mask.get_frame(t)
+            timings["frames"] += time.perf_counter() - start
+            writer.write_frame(frame, mask=mask)
+            start = time.perf_counter()
 
     if write_logfile:
         logfile.close()
+    logger(
+        message="MoviePy - Time spent computing the frames: %.2fs, writing them "
+        "to ffmpeg: %.2fs, waiting for the queue: %.2fs"
+        % (timings["frames"], timings["write"], timings["queue"])
+    )
     logger(message="MoviePy - Done !")
+    return timings
+
+
+def _ffmpeg_write_video_segments(
+    clip,
+    filename,
+    fps,
+    n_jobs,
+    logfile,
+    logger,
+    audiofile=None,
+    audio_codec=None,
+    output_format=None,
+    **writer_params,
+):
+    """Writes the clip to a video file by rendering ``n_jobs`` consecutive
+    segments of its frames in parallel, each in a forked process writing its
+    own video file, and joining these files (and the audio file, if any) with
+    the concat demuxer of ffmpeg, without encoding them again.
+
+    Each segment starts with a keyframe as it is encoded on its own, so that
+    the files can be joined.
+    """
+    n_frames = int(clip.duration * fps)
+    bounds = [n_frames * i // n_jobs for i in range(n_jobs + 1)]
+    name, ext = os.path.splitext(filename)
+    segment_filenames = [
+        "%s%swvf_part%d%s" % (name, Clip._TEMP_FILES_PREFIX, i, ext)
+        for i in range(n_jobs)
+    ]
+    concat_list_filename = name + Clip._TEMP_FILES_PREFIX + "wvf_parts.txt"
+    try:
+        _render_video_segments(
+            clip,
+            filename,
+            fps,
+            [
+                (segment_filename, range(start, end))
+                for segment_filename, start, end in zip(
+                    segment_filenames, bounds[:-1], bounds[1:]
+                )
+            ],
+            n_jobs,
+            logger,
+            writer_params,
+        )
+        _concat_video_segments(
+            filename,
+            segment_filenames,
+            concat_list_filename,
+            logfile,
+            audiofile=audiofile,
+            audio_codec=audio_codec,
+            output_format=output_format,
+            fps=fps,
+            segment_n_frames=[end - start for start, end in zip(bounds, bounds[1:])],
+        )
+    finally:
+        for temp_filename in segment_filenames + [concat_list_filename]:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+
+def _ffmpeg_write_video_cached(
+    clip,
+    filename,
+    fps,
+    render_cache,
+    n_jobs,
+    logfile,
+    logger,
+    audiofile=None,
+    audio_codec=None,
+    output_format=None,
+    **writer_params,
+):
+    """Writes the clip to a video file by joining its segments found in the
+    render cache with the other ones, which are rendered (with ``n_jobs``
+    processes) and added to the cache, as ``_ffmpeg_write_video_segments``
+    does. See ``RenderCache``.
+    """
+    os.makedirs(render_cache.directory, exist_ok=True)
+    n_frames = int(clip.duration * fps)
+    name, ext = os.path.splitext(filename)
+    segment_params = dict(
+        writer_params, size=clip.size, with_mask=clip.mask is not None
+    )
+
+    segment_filenames = []
+    segment_n_frames = []
+    # The segments to render, with the files where they are rendered
+    missing = []
+    for i, frame_indices in enumerate(render_cache.segments(n_frames, fps)):
+        segment_filename = render_cache.segment_filename(
+            clip, fps, frame_indices, segment_params, ext[1:]
+        )
+        if segment_filename is None:
+            # The segment can't be cached, it is rendered in a temporary file
+            segment_filename = "%s%swvf_part%d%s" % (
+                name,
+                Clip._TEMP_FILES_PREFIX,
+                i,
+                ext,
+            )
+            missing.append((segment_filename, frame_indices, segment_filename))
+        elif os.path.exists(segment_filename):
+            render_cache.hits += 1
+        else:
+            render_cache.misses += 1
+            # Rendered in a temporary file so that an interrupted rendering
+            # doesn't leave an incomplete segment in the cache
+            part_filename = "%s_part%s" % os.path.splitext(segment_filename)
+            missing.append((part_filename, frame_indices, segment_filename))
+        segment_filenames.append(segment_filename)
+        segment_n_frames.append(len(frame_indices))
+    logger(
+        message="MoviePy - %d of the %d segments of the video found in the "
+        "render cache" % (len(segment_filenames) - len(missing), len(segment_filenames))
+    )
+
+    concat_list_filename = name + Clip._TEMP_FILES_PREFIX + "wvf_parts.txt"
+    try:
+        if missing:
+            # Each process renders consecutive segments
+            n_jobs = min(n_jobs, len(missing))
+            bounds = [len(missing) * i // n_jobs for i in range(n_jobs + 1)]
+            _render_video_segments(
+                clip,
+                filename,
+                fps,
+                [
+                    (part_filename, frame_indices)
+                    for part_filename, frame_indices, _ in missing
+                ],
+                n_jobs,
+                logger,
+                writer_params,
+                groups=list(zip(bounds[:-1], bounds[1:])),
+            )
+            for part_filename, _, segment_filename in missing:
+                if part_filename != segment_filename:
+                    os.replace(part_filename, segment_filename)
+        _concat_video_segments(
+            filename,
+            segment_filenames,
+            concat_list_filename,
+            logfile,
+            audiofile=audiofile,
+            audio_codec=audio_codec,
+            output_format=output_format,
+            fps=fps,
+            segment_n_frames=segment_n_frames,
+        )
+    finally:
+        temp_filenames = [part_filename for part_filename, _, _ in missing]
+        for temp_filename in temp_filenames + [concat_list_filename]:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+
+def _render_video_segments(
+    clip, filename, fps, segments, n_jobs, logger, writer_params, groups=None
+):
+    """Renders the segments of the clip, given as pairs ``(segment_filename,
+    frame_indices)``, each in its own video file.
+
+    With ``n_jobs > 1``, the segments are rendered by ``n_jobs`` processes
+    forked from the current one, each rendering a group of segments, given in
+    ``groups`` as ranges ``(start, end)`` of indices in ``segments`` (one
+    segment per process by default).
+    """
+    n_frames = sum(len(frame_indices) for _, frame_indices in segments)
+    if n_jobs <= 1:
+        logger(frame_index__total=n_frames)
+        frames_written = 0
+        for segment_filename, frame_indices in segments:
+            for _ in _write_video_segment_frames(
+                clip, segment_filename, fps, frame_indices, writer_params
+            ):
+                frames_written += 1
+                logger(frame_index__index=frames_written)
+        return
+
+    if groups is None:
+        groups = [(i, i + 1) for i in range(len(segments))]
+    # No other thread must be running when the processes are forked
+    _close_prefetching_readers()
+    context = multiprocessing.get_context("fork")
+    frames_written = context.Value("l", 0)
+    errors = context.SimpleQueue()
+    processes = [
+        context.Process(
+            target=_write_video_segments,
+            args=(
+                clip,
+                segments[start:end],
+                fps,
+                writer_params,
+                frames_written,
+                errors,
+            ),
+        )
+        for start, end in groups
+    ]
+    try:
+        for process in processes:
+            process.start()
+        logger(frame_index__total=n_frames)
+        running = [process.sentinel for process in processes]
+        while running:
+            finished = multiprocessing.connection.wait(running, timeout=0.2)
+            running = [sentinel for sentinel in running if sentinel not in finished]
+            logger(frame_index__index=frames_written.value)
+
+        if not errors.empty() or any(process.exitcode for process in processes):
+            error = errors.get() if not errors.empty() else ""
+            raise IOError(
+                "MoviePy error: the rendering of a segment of the video %s in a "
+                "separate process failed:\n\n%s" % (filename, error)
+            )
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            if process.pid is not None:
+                process.join()
+
+
+def _concat_video_segments(
+    filename,
+    segment_filenames,
+    concat_list_filename,
+    logfile,
+    audiofile=None,
+    audio_codec=None,
+    output_format=None,
+    fps=None,
+    segment_n_frames=None,
+):
+    """Joins the video files of the segments (and the audio file, if any) in
+    ``filename`` with the concat demuxer of ffmpeg, without encoding them
+    again.
+
+    If the ``fps`` of the video and the numbers of frames of the segments
+    ``segment_n_frames`` are given, each segment starts exactly at the time of
+    its first frame, and each frame lasts until the time of the next one,
+    instead of the duration of the frames being rounded down in the timescale
+    of the files (1ms in WebM files), which shortens the video at each joint.
+    """
+    with open(concat_list_filename, "w") as file:
+        for i, segment_filename in enumerate(segment_filenames):
+            path = os.path.abspath(segment_filename).replace("'", "'\\''")
+            file.write("file '%s'\n" % path)
+            if segment_n_frames is not None:
+                file.write("duration %.6f\n" % (segment_n_frames[i] / fps))
+
+    cmd = [
+        FFMPEG_BINARY,
+        "-y",
+        "-loglevel",
+        "error" if logfile is None else "info",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        concat_list_filename,
+    ]
+    if audiofile is not None:
+        cmd.extend(["-i", audiofile, "-map", "0:v", "-map", "1:a"])
+        cmd.extend(["-c:v", "copy", "-c:a", audio_codec or "copy"])
+    else:
+        cmd.extend(["-c", "copy"])
+    if segment_n_frames is not None:
+        cmd.extend(_frame_durations_options(fps))
+    if output_format is not None:
+        cmd.extend(["-f", _FFMPEG_FORMATS.get(output_format, output_format)])
+    cmd.append(ffmpeg_escape_filename(filename))
+
+    popen_params = cross_platform_popen_params(
+        {
+            "stdout": sp.DEVNULL,
+            "stderr": sp.PIPE if logfile is None else logfile,
+            "stdin": sp.DEVNULL,
+        }
+    )
+    proc = sp.Popen(cmd, **popen_params)
+    _, error = proc.communicate()
+    if proc.returncode:
+        raise IOError(
+            "MoviePy error: FFMPEG encountered the following error while "
+            "joining the segments of the video %s:\n\n%s"
+            % (filename, error.decode() if error else "")
+        )
+
+
+@lru_cache(maxsize=None)
+def _frame_durations_options(fps):
+    """Returns the ffmpeg options setting the duration of each frame of the
+    video stream copied to the time of the next frame at ``fps``, with the
+    ``setts`` bitstream filter (ffmpeg 4.4 and above).
+    """
+    try:
+        version = [int(n) for n in ffmpeg_version()[1].split(".") if n][:2]
+    except (OSError, sp.SubprocessError, AttributeError, IndexError, ValueError):
+        # Versions which can't be parsed are development builds
+        version = None
+    if version and version < [4, 4]:
+        return []
+    rate = Fraction(fps).limit_denominator(1001)
+    rate = "(%d/%d)" % (rate.numerator, rate.denominator)
+    next_frame_time = "round((floor(DTS*TB*%s+0.5)+1)/(%s*TB))" % (rate, rate)
+    return ["-bsf:v", "setts=pts=PTS:dts=DTS:duration=%s-DTS" % next_frame_time]
+
+
+def _write_video_segments(clip, segments, fps, writer_params, frames_written, errors):
+    """Writes the segments of the clip, given as pairs ``(segment_filename,
+    frame_indices)``, in a process forked by ``_render_video_segments``.
+    """
+    try:
+        for segment_filename, frame_indices in segments:
+            for _ in _write_video_segment_frames(
+                clip, segment_filename, fps, frame_indices, writer_params
+            ):
+                with frames_written.get_lock():
+                    frames_written.value += 1
+    except BaseException:
+        errors.put(traceback.format_exc())
+        raise SystemExit(1)
+
+
+def _write_video_segment_frames(clip, filename, fps, frame_indices, writer_params):
+    """Writes the frames of the clip with the given indices to a video file,
+    yielding after each frame written.
+    """
+    with FFMPEG_VideoWriter(
+        filename,
+        clip.size,
+        fps,
+        with_mask=clip.mask is not None,
+        **writer_params,
+    ) as writer:
+        for frame_index in frame_indices:
+            t = frame_index / fps
+            frame = clip.get_frame(t)
+            if clip.mask is not None:
+                writer.write_frame(frame, mask=clip.mask.get_frame(t))
+            else:
+                writer.write_frame(frame.astype("uint8", copy=False))
+            yield
 
 
 def ffmpeg_write_image(filename, image, logfile=False, pixel_format=None):
@@ -0,0 +1,165 @@
+"""Implements the raw proxy files, in which the frames of a video file are
+decoded once and stored uncompressed to be read back through a memory map.
+
+A raw proxy file is made of a header of ``RAW_PROXY_HEADER_SIZE`` bytes
+followed by the frames, as contiguous ``uint8`` arrays of shape
+``(height, width, depth)``.
+"""
+
+import os
+import struct
+
+import numpy as np
+import proglog
+
+
+RAW_PROXY_MAGIC = b"MPYRAW01"
+RAW_PROXY_HEADER_SIZE = 64
+
+# magic, width, height, depth, number of frames, fps, key of the source
+_HEADER_STRUCT = struct.Struct("<8sIIIId16s")
+
+
+class RawProxyReader:
+    """Reads the frames of a raw proxy file.
+
+    The file is memory-mapped, so that a frame is returned without any copy
+    or decoding, in constant time whatever the order in which the frames are
+    requested. Several processes reading the same file share its pages in
+    memory.
+
+    Parameters
+    ----------
+
+    filename
+      Path of the raw proxy file, as written by ``write_raw_proxy``.
+
+    key
+      If provided, the key of the source that the file must have been written
+      for, otherwise a ``ValueError`` is raised.
+    """
+
+    def __init__(self, filename, key=None):
+        header = read_raw_proxy_header(filename)
+        if header is None:
+            raise ValueError("MoviePy error: %s is not a raw proxy file" % filename)
+        if key is not None and header["key"] != key:
+            raise ValueError(
+                "MoviePy error: the raw proxy file %s was written for another "
+                "source or with other parameters" % filename
+            )
+
+        self.filename = filename
+        self.size = (header["width"], header["height"])
+        self.depth = header["depth"]
+        self.n_frames = header["n_frames"]
+        self.fps = header["fps"]
+        self.duration = self.n_frames / self.fps
+        self.frames = np.memmap(
+            filename,
+            dtype="uint8",
+            mode="r",
+            offset=RAW_PROXY_HEADER_SIZE,
+            shape=(self.n_frames, self.size[1], self.size[0], self.depth),
+        )
+
+    def get_frame_number(self, t):
+        """Returns the index of the frame at time ``t``, as ``FFMPEG_VideoReader``
+        does.
+        """
+        return int(self.fps * t + 0.00001)
+
+    def get_frame(self, t):
+        """Returns the frame at time ``t``, as a read-only view of the file."""
+        index = min(max(self.get_frame_number(t), 0), self.n_frames - 1)
+        return self.frames[index]
+
+    def close(self):
+        """Releases the memory map of the file."""
+        self.frames = None
+
+
+def read_raw_proxy_header(filename):
+    """Returns the header of a raw proxy file as a dictionary with keys
+    ``width``, ``height``, ``depth``, ``n_frames``, ``fps`` and ``key``, or
+    ``None`` if the file is not a complete raw proxy file.
+    """
+    try:
+        with open(filename, "rb") as file:
+            data = file.read(_HEADER_STRUCT.size)
+        file_size = os.path.getsize(filename)
+    except OSError:
+        return None
+    if len(data) != _HEADER_STRUCT.size:
+        return None
+
+    magic, width, height, depth, n_frames, fps, key = _HEADER_STRUCT.unpack(data)
+    if magic != RAW_PROXY_MAGIC:
+        return None
+    if file_size != RAW_PROXY_HEADER_SIZE + n_frames * height * width * depth:
+        return None
+    return {
+        "width": width,
+        "height": height,
+        "depth": depth,
+        "n_frames": n_frames,
+        "fps": fps,
+        "key": key,
+    }
+
+
+def write_raw_proxy(filename, reader, n_frames, key=b"", logger="bar"):
+    """Decodes the first ``n_frames`` frames read by ``reader`` (a
+    ``FFMPEG_VideoReader``) into the raw proxy file ``filename``.
+
+    The frames are written to a temporary file renamed to ``filename`` once
+    complete, so that an interrupted decoding doesn't leave an invalid proxy
+    behind.
+
+    Parameters
+    ----------
+
+    filename
+      Path of the raw proxy file.
+
+    reader
+      The reader of the frames.
+
+    n_frames
+      Number of frames to decode.
+
+    key
+      Identifier of the source and of the reading parameters, of at most 16
+      bytes, stored in the header to check that a proxy file is up to date.
+
+    logger
+      Either ``"bar"`` for progress bar or ``None`` or any Proglog logger.
+    """
+    logger = proglog.default_bar_logger(logger)
+    width, height = reader.size
+    depth = reader.depth
+    header = _HEADER_STRUCT.pack(
+        RAW_PROXY_MAGIC, width, height, depth, n_frames, reader.fps, key
+    )
+
+    temp_filename = filename + ".part"
+    with open(temp_filename, "wb") as file:
+        file.write(header.ljust(RAW_PROXY_HEADER_SIZE, b"\0"))
+        file.truncate(RAW_PROXY_HEADER_SIZE + n_frames * height * width * depth)
+    try:
+        frames = np.memmap(
+            temp_filename,
+            dtype="uint8",
+            mode="r+",
+            offset=RAW_PROXY_HEADER_SIZE,
+            shape=(n_frames, height, width, depth),
+        )
+        for index in logger.iter_bar(frame_index=range(n_frames)):
+            frames[index] = reader.get_frame(index / reader.fps)
+        frames.flush()
+        frames = None  # the file can't be renamed while mapped on Windows
+        os.replace(temp_filename, filename)
+    except BaseException:
+        frames = None
+        os.remove(temp_filename)
+        raise
@@ -0,0 +1,468 @@
+"""Implements the render cache, in which ``write_videofile`` keeps the encoded
+segments of the videos it writes, to only encode again the segments of a
+video which changed since it was last written.
+
+A segment is identified by a fingerprint of everything its frames depend on:
+the files read (path, size and modification time), the parameters of the
+clips and of their effects, the code of the functions computing the frames
+and the times of the frames in the segment. The fingerprint of a composition
+(``CompositeVideoClip`` or ``concatenate_videoclips``) only covers the clips
+playing during the segment, so that modifying one clip of an edit only
+invalidates the segments where this clip is visible.
+"""
+
+import functools
+import hashlib
+import os
+import types
+
+import numpy as np
+
+from moviepy.version import __version__
+
+
+# Attributes of the clips which don't change their frames (caches, audio...)
+_IGNORED_CLIP_ATTRIBUTES = {
+    "audio",
+    "_composition_cache",
+    "frame_cache",
+    "_frame_cache_function",
+    "memoized_frame",
+    "memoized_t",
+    "_playing_index",
+    "reader",
+    "_reader_pool",
+}
+
+# Attributes of the readers of files which change the frames or samples read
+_READER_PARAMETERS = (
+    "size",
+    "fps",
+    "pixel_format",
+    "resize_algo",
+    "decoder_options",
+    "input_filters",
+    "nbytes",
+    "nchannels",
+    "audio_stream_index",
+)
+
+
+class RenderCache:
+    """Directory where ``write_videofile`` keeps the encoded segments of the
+    videos it writes, to stream-copy the unchanged ones when the same video
+    is written again after some edits, instead of computing and encoding all
+    its frames again.
+
+    The video is cut into segments of ``segment_duration`` seconds, which are
+    each identified by a fingerprint of all the clips, effects and parameters
+    their frames depend on (see ``clip_fingerprint``), and of the encoding
+    parameters. The segments found in the cache are joined without being
+    encoded again, and the other ones are rendered and added to the cache.
+
+    The segments whose frames depend on objects which can't be fingerprinted
+    (open files, locks...) are always rendered. Note that the functions
+    computing the frames must only depend on their parameters: frames
+    depending on random numbers, on the current time or on external resources
+    modified in place are not detected as changed.
+
+    Parameters
+    ----------
+
+    directory : str or path-like
+      Directory where the segments are kept. It is created if needed.
+
+    segment_duration : float, optional
+      Duration of the segments in seconds. Shorter segments are re-rendered
+      more precisely around the edits, at the cost of a slightly bigger video,
+      as each segment starts with a keyframe.
+
+    Attributes
+    ----------
+
+    hits : int
+      Number of segments which were found in the cache.
+
+    misses : int
+      Number of segments which were rendered.
+
+    Examples
+    --------
+
+    .. code:: python
+
+        from moviepy import RenderCache
+
+        cache = RenderCache("render_cache")
+        final_clip.write_videofile("edit.mp4", render_cache=cache)
+        # ... change the title of the video, then:
+        final_clip.write_videofile("edit.mp4", render_cache=cache)
+        print(cache.hits, cache.misses)
+    """
+
+    def __init__(self, directory, segment_duration=2.0):
+        if segment_duration <= 0:
+            raise ValueError(
+                "MoviePy error: the segment_duration of a RenderCache must be "
+                "positive, not %s" % segment_duration
+            )
+        self.directory = os.fspath(directory)
+        self.segment_duration = segment_duration
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "%s(%r, %d hits, %d misses)" % (
+            self.__class__.__name__,
+            self.directory,
+            self.hits,
+            self.misses,
+        )
+
+    def segments(self, n_frames, fps):
+        """Returns the ranges of the indices of the frames in each segment of
+        a video of ``n_frames`` frames at ``fps`` frames per second.
+        """
+        length = max(1, int(round(self.segment_duration * fps)))
+        return [
+            range(start, min(start + length, n_frames))
+            for start in range(0, n_frames, length)
+        ]
+
+    def segment_filename(self, clip, fps, frame_indices, writer_params, ext):
+        """Returns the path of the file of the segment of ``clip`` made of the
+        frames with indices ``frame_indices``, encoded with ``writer_params``,
+        or ``None`` if the frames of the segment can't be fingerprinted.
+        """
+        t_start = frame_indices[0] / fps
+        t_end = frame_indices[-1] / fps
+        try:
+            fingerprint = clip_fingerprint(clip, t_start, t_end)
+        except TypeError:
+            return None
+        params = _fingerprint(sorted(writer_params.items()), {}, set())
+        key = hashlib.sha256(
+            repr(
+                (
+                    __version__,
+                    fingerprint,
+                    params,
+                    fps,
+                    frame_indices.start,
+                    frame_indices.stop,
+                )
+            ).encode("utf8")
+        ).hexdigest()
+        return os.path.join(self.directory, "%s.%s" % (key, ext))
+
+    def clear(self):
+        """Removes all the segments from the cache."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def clip_fingerprint(clip, t_start=None, t_end=None):
+    """Returns a digest of everything the frames of ``clip`` between the times
+    ``t_start`` and ``t_end`` (included) depend on, which is the same for two
+    clips producing the same frames, in the same or in another Python process.
+
+    The clips, effects and other objects are fingerprinted from their
+    attributes, the functions from their code, default arguments, closures
+    and the global variables they use, and the video files from their path,
+    size and modification time. A ``TypeError`` is raised if one of the
+    objects can't be fingerprinted.
+
+    For the compositions (``CompositeVideoClip`` and the clips made by
+    ``concatenate_videoclips``), only the clips playing between ``t_start``
+    and ``t_end`` are fingerprinted, if these times are provided.
+    """
+    return _clip_fingerprint(clip, t_start, t_end, {})
+
+
+def _clip_fingerprint(clip, t_start, t_end, arrays):
+    """Returns the fingerprint of the clip between ``t_start`` and ``t_end``
+    (local times of the clip), only looking at the clips playing in this
+    interval for the compositions.
+    """
+    if t_start is None or t_end is None:
+        return _fingerprint(clip, arrays, set())
+
+    from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+
+    if isinstance(clip, CompositeVideoClip) and "frame_function" not in vars(clip):
+        # The frames are blitted from the clips playing at each time
+        parts = [
+            "CompositeVideoClip",
+            _fingerprint(
+                [clip.size, clip.bg_color, clip.is_mask, clip.bg.start, clip.bg.pos],
+                arrays,
+                set(),
+            ),
+            _clip_fingerprint(
+                clip.bg, t_start - clip.bg.start, t_end - clip.bg.start, arrays
+            ),
+            _local_mask_fingerprint(clip, t_start, t_end, arrays),
+        ]
+        for child in clip.clips:
+            child_start = child.start
+            child_end = np.inf if child.end is None else child.end
+            if child_start > t_end or child_end <= t_start:
+                continue
+            parts.append(
+                (
+                    _fingerprint(
+                        [
+                            child_start,
+                            child.end,
+                            child.layer_index,
+                            child.pos,
+                            child.relative_pos,
+                        ],
+                        arrays,
+                        set(),
+                    ),
+                    _clip_fingerprint(
+                        child,
+                        max(t_start, child_start) - child_start,
+                        min(t_end, child_end) - child_start,
+                        arrays,
+                    ),
+                )
+            )
+        return _digest(parts)
+
+    concatenation = clip._chain_concatenation()
+    if concatenation is not None:
+        # The frames are the ones of the clips following each other
+        timings, clips = concatenation
+        parts = [
+            "concatenate_videoclips",
+            _fingerprint([clip.size, clip.is_mask, list(timings)], arrays, set()),
+            _local_mask_fingerprint(clip, t_start, t_end, arrays),
+        ]
+        for child, child_start, child_end in zip(clips, timings[:-1], timings[1:]):
+            if child_start > t_end or child_end <= t_start:
+                continue
+            parts.append(
+                _clip_fingerprint(
+                    child,
+                    max(t_start, child_start) - child_start,
+                    min(t_end, child_end) - child_start,
+                    arrays,
+                )
+            )
+        return _digest(parts)
+
+    return _fingerprint(clip, arrays, set())
+
+
+def _local_mask_fingerprint(clip, t_start, t_end, arrays):
+    """Returns the fingerprint of the mask of a composition between
+    ``t_start`` and ``t_end``, if any.
+    """
+    if clip.mask is None:
+        return None
+    if clip.mask.frame_function is getattr(clip, "_mask_frame_function", None):
+        # The mask is the one computed with the frames of the composition
+        return "composition mask"
+    return _clip_fingerprint(clip.mask, t_start, t_end, arrays)
+
+
+def _digest(value):
+    """Returns the digest of a structure of strings and digests."""
+    return hashlib.sha256(repr(value).encode("utf8")).hexdigest()
+
+
+def _fingerprint(obj, arrays, in_progress):
+    """Returns the fingerprint of any object, in which ``arrays`` caches the
+    digests of the arrays by id and ``in_progress`` holds the ids of the
+    objects being fingerprinted, to stop at reference cycles.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        return (type(obj).__name__, repr(obj))
+    if isinstance(obj, np.generic):
+        return (type(obj).__name__, repr(obj.item()))
+    if isinstance(obj, np.dtype):
+        return ("dtype", obj.str)
+    if isinstance(obj, np.ndarray):
+        cached = arrays.get(id(obj))
+        if cached is None or cached[0] is not obj:
+            digest = hashlib.sha256(np.ascontiguousarray(obj).data).hexdigest()
+            # The array is kept so that its id isn't reused by another one
+            cached = arrays[id(obj)] = (obj, (str(obj.dtype), obj.shape, digest))
+        return cached[1]
+    if isinstance(obj, (types.ModuleType, type)):
+        return (type(obj).__name__, getattr(obj, "__module__", None), obj.__name__)
+    if getattr(type(obj), "_render_cache_ignored", False):
+        # Caches of frames and pools of readers, which don't change the frames
+        return ("ignored", type(obj).__qualname__)
+
+    if id(obj) in in_progress:
+        return ("cycle", type(obj).__qualname__)
+    in_progress.add(id(obj))
+    try:
+        return _digest(_fingerprint_parts(obj, arrays, in_progress))
+    finally:
+        in_progress.discard(id(obj))
+
+
+def _fingerprint_parts(obj, arrays, in_progress):
+    """Returns the parts of the fingerprint of a container, a function or an
+    object with attributes.
+    """
+
+    def fingerprint(value):
+        return _fingerprint(value, arrays, in_progress)
+
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, [fingerprint(value) for value in obj])
+    if isinstance(obj, (set, frozenset)):
+        return (type(obj).__name__, sorted(fingerprint(value) for value in obj))
+    if isinstance(obj, dict):
+        return (
+            "dict",
+            sorted(
+                (fingerprint(key), fingerprint(value)) for key, value in obj.items()
+            ),
+        )
+    if isinstance(obj, types.FunctionType):
+        return _function_fingerprint_parts(obj, fingerprint)
+    if isinstance(obj, types.MethodType):
+        return ("method", fingerprint(obj.__func__), fingerprint(obj.__self__))
+    if isinstance(obj, functools.partial):
+        return (
+            "partial",
+            fingerprint(obj.func),
+            fingerprint(obj.args),
+            fingerprint(obj.keywords),
+        )
+    if isinstance(obj, (types.BuiltinFunctionType, np.ufunc)):
+        owner = getattr(obj, "__self__", None)
+        return (
+            "builtin",
+            getattr(obj, "__module__", None),
+            obj.__name__,
+            None if isinstance(owner, types.ModuleType) else fingerprint(owner),
+        )
+
+    cls = type(obj)
+    reader_file = _reader_file(obj)
+    if reader_file is not None:
+        parameters = {
+            name: getattr(obj, name)
+            for name in _READER_PARAMETERS
+            if hasattr(obj, name)
+        }
+        return (cls.__qualname__, reader_file, fingerprint(parameters))
+
+    if not hasattr(obj, "__dict__"):
+        raise TypeError("MoviePy error: %r can't be fingerprinted" % obj)
+    attributes = vars(obj)
+
+    from moviepy.Clip import Clip
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+
+    parts = [cls.__module__, cls.__qualname__]
+    if isinstance(obj, Clip):
+        attributes = {
+            name: value
+            for name, value in attributes.items()
+            if name not in _IGNORED_CLIP_ATTRIBUTES
+        }
+        if "frame_function" not in attributes:
+            attributes["frame_function"] = obj.frame_function
+    if isinstance(obj, VideoFileClip):
+        # The file read, in its current version, with the reading parameters
+        parts.append(obj._proxy_key(obj._reader_params).hex())
+    parts.append(fingerprint(attributes))
+    return parts
+
+
+def _function_fingerprint_parts(function, fingerprint):
+    """Returns the parts of the fingerprint of a Python function: its code, its
+    default arguments, the values in its closure and the global variables it
+    uses (only by name for the modules, classes and functions of other
+    modules).
+    """
+    code = function.__code__
+    closure = function.__closure__ or ()
+    cells = []
+    for name, cell in zip(code.co_freevars, closure):
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            # The variable was not assigned yet
+            value = None
+        cells.append((name, fingerprint(value)))
+
+    global_values = []
+    for name in sorted(_code_names(code)):
+        if name not in function.__globals__:
+            continue
+        value = function.__globals__[name]
+        if isinstance(value, (types.FunctionType, type)) and (
+            value.__module__ != function.__module__
+        ):
+            global_values.append((name, value.__module__, value.__qualname__))
+            if isinstance(value, types.FunctionType):
+                global_values.append(_code_fingerprint(value.__code__))
+        elif not isinstance(value, types.ModuleType):
+            global_values.append((name, fingerprint(value)))
+
+    return (
+        "function",
+        function.__module__,
+        function.__qualname__,
+        _code_fingerprint(code),
+        fingerprint(function.__defaults__),
+        fingerprint(function.__kwdefaults__),
+        cells,
+        global_values,
+    )
+
+
+def _code_fingerprint(code):
+    """Returns the fingerprint of a code object and of the code objects defined
+    in it (lambdas, nested functions...).
+    """
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            consts.append(_code_fingerprint(const))
+        elif isinstance(const, frozenset):
+            # The order of the items of sets changes between Python processes
+            consts.append(sorted(repr(item) for item in const))
+        else:
+            consts.append(repr(const))
+    return _digest([code.co_code.hex(), consts, code.co_names, code.co_varnames])
+
+
+def _code_names(code):
+    """Returns the names used in a code object and in the code objects defined
+    in it, some of which are global variables.
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _reader_file(obj):
+    """Returns the identity of the file read by a reader of video or audio
+    files (path, size and modification time), or ``None`` if ``obj`` is not
+    a reader.
+    """
+    from moviepy.audio.io.readers import FFMPEG_AudioReader
+    from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader, PooledVideoReader
+    from moviepy.video.io.raw_proxy import RawProxyReader
+
+    readers = (FFMPEG_AudioReader, FFMPEG_VideoReader, PooledVideoReader)
+    if not isinstance(obj, readers + (RawProxyReader,)):
+        return None
+    stat = os.stat(obj.filename)
+    return (os.path.abspath(obj.filename), stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,284 @@
+"""Implements the smart cut, which writes the clips made of spans of video
+files (``VideoFileClip.subclipped`` and ``concatenate_videoclips``) by copying
+the encoded frames of the files between their keyframes, and only encoding
+the frames around the cuts.
+"""
+
+import math
+import os
+import subprocess as sp
+from bisect import bisect_right
+from fractions import Fraction
+
+from moviepy.Clip import Clip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.tools import cross_platform_popen_params, ffmpeg_escape_filename
+from moviepy.video.io.ffmpeg_reader import ffmpeg_read_keyframes
+
+
+# Encoders producing streams which can be joined with the streams of the files
+# of each codec
+_SMART_CUT_ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "mpeg4": "mpeg4",
+    "vp8": "libvpx",
+    "vp9": "libvpx-vp9",
+}
+
+# Formats in which the timescale of the video stream (the number of ticks per
+# second of its timestamps) is chosen by the muxer, and must be set to be the
+# same in all the pieces joined
+_TIMESCALE_FORMATS = ("mp4", "mov", "m4v")
+
+
+def smart_cut_pieces(clip, fps, codec=None):
+    """Splits the frames of the clip, written at ``fps`` frames per second, in
+    consecutive pieces which are either copied from a video file or encoded.
+
+    Returns a tuple ``(pieces, codec, pixel_format)`` where ``pieces`` is a
+    list of pairs ``(frame_indices, source)``, with ``source`` ``None`` for the
+    pieces to encode and ``(filename, keyframe_time)`` for the pieces to copy
+    from a file, starting at the keyframe at ``keyframe_time``, and ``codec`` and
+    ``pixel_format`` are the ones with which the pieces must be encoded.
+
+    A ``ValueError`` is raised, with the reason, if the clip can't be smart cut:
+    it must play spans of video files with the same codec, pixel format and
+    size, without effects, and be written at the fps of the files.
+    """
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+
+    def source_frame(clip, t):
+        """Returns the file and the index of the frame of the file shown by
+        the clip at time ``t``, or ``None`` if it doesn't show a frame of a
+        file.
+        """
+        offset = clip._file_offset() if isinstance(clip, VideoFileClip) else None
+        if offset is not None:
+            return clip, clip.reader.get_frame_number(offset + t)
+        concatenation = clip._chain_concatenation()
+        if concatenation is not None:
+            timings, clips = concatenation
+            i = min(max(bisect_right(timings, t) - 1, 0), len(clips) - 1)
+            return source_frame(clips[i], t - timings[i])
+        return None
+
+    if clip.mask is not None:
+        raise ValueError("the clip has a mask")
+
+    # Runs of consecutive frames of the same file, or of frames of no file,
+    # as lists [start, end, filename, index of the first frame in the file]
+    runs = []
+    sources = {}
+    for frame_index in range(int(clip.duration * fps)):
+        found = source_frame(clip, frame_index / fps)
+        filename = index = None
+        if found is not None:
+            source, index = found
+            filename = os.path.abspath(source.filename)
+            sources.setdefault(filename, source)
+        if (
+            runs
+            and runs[-1][2] == filename
+            and (filename is None or runs[-1][3] + frame_index - runs[-1][0] == index)
+        ):
+            runs[-1][1] = frame_index + 1
+        else:
+            runs.append([frame_index, frame_index + 1, filename, index])
+
+    if not sources:
+        raise ValueError("the clip doesn't play any span of a video file")
+    formats = {
+        (
+            source.reader.infos.get("video_codec_name"),
+            source.reader.infos.get("video_pixel_format"),
+            tuple(source.size),
+        )
+        for source in sources.values()
+    }
+    if len(formats) > 1:
+        raise ValueError("the video files have different codecs or sizes")
+    codec_name, pixel_format, size = formats.pop()
+    encoder = _SMART_CUT_ENCODERS.get(codec_name)
+    if encoder is None or pixel_format is None:
+        raise ValueError("the codec of the video files isn't supported")
+    if codec not in (None, encoder):
+        raise ValueError("the codec isn't the one of the video files")
+    if tuple(clip.size) != size:
+        raise ValueError("the clip doesn't have the size of the video files")
+    for source in sources.values():
+        if not math.isclose(source.reader.fps, fps, rel_tol=1e-4):
+            raise ValueError("the fps isn't the one of the video files")
+
+    pieces = []
+    for start, end, filename, index in runs:
+        if filename is None:
+            pieces.append((range(start, end), None))
+            continue
+        source = sources[filename]
+        keyframe_times = ffmpeg_read_keyframes(filename, source.reader.infos["start"])
+        keyframes = [int(round(t * source.reader.fps)) for t in keyframe_times]
+        # The frames from the first keyframe of the span to its last keyframe
+        # (or its end, if it's a keyframe) are copied
+        i = bisect_right(keyframes, index - 1)
+        j = bisect_right(keyframes, index + end - start) - 1
+        if i >= len(keyframes) or j < i or keyframes[j] <= keyframes[i]:
+            pieces.append((range(start, end), None))
+            continue
+        copy_start = start + keyframes[i] - index
+        copy_end = start + keyframes[j] - index
+        pieces.append((range(start, copy_start), None))
+        pieces.append((range(copy_start, copy_end), (filename, keyframe_times[i])))
+        pieces.append((range(copy_end, end), None))
+
+    # Consecutive pieces to encode are encoded together
+    merged_pieces = []
+    for frame_indices, source in pieces:
+        if not frame_indices:
+            continue
+        if merged_pieces and source is None and merged_pieces[-1][1] is None:
+            previous_indices = merged_pieces[-1][0]
+            frame_indices = range(previous_indices.start, frame_indices.stop)
+            merged_pieces[-1] = (frame_indices, None)
+        else:
+            merged_pieces.append((frame_indices, source))
+    return merged_pieces, encoder, pixel_format
+
+
+def ffmpeg_write_smart_cut(
+    clip,
+    filename,
+    fps,
+    pieces,
+    logfile,
+    logger,
+    audiofile=None,
+    audio_codec=None,
+    output_format=None,
+    **writer_params,
+):
+    """Writes the clip to a video file from the pieces returned by
+    ``smart_cut_pieces``, copying or encoding each piece in its own file, and
+    joining these files (and the audio file, if any) with the concat demuxer
+    of ffmpeg.
+
+    ``writer_params`` are the parameters of ``FFMPEG_VideoWriter`` with which
+    the pieces are encoded, with the codec and the pixel format returned by
+    ``smart_cut_pieces``.
+    """
+    from moviepy.video.io.ffmpeg_writer import (
+        _concat_video_segments,
+        _write_video_segment_frames,
+    )
+
+    name, ext = os.path.splitext(filename)
+    # The pieces copied from the files and the ones encoded must have the same
+    # timescale, or the concat demuxer mixes up their timestamps
+    output_params = []
+    if (output_format or ext[1:]).lower() in _TIMESCALE_FORMATS:
+        output_params = ["-video_track_timescale", str(_timescale(fps))]
+    writer_params = dict(
+        writer_params,
+        ffmpeg_params=list(writer_params.get("ffmpeg_params") or []) + output_params,
+    )
+    piece_filenames = [
+        "%s%swvf_cut%d%s" % (name, Clip._TEMP_FILES_PREFIX, i, ext)
+        for i in range(len(pieces))
+    ]
+    concat_list_filename = name + Clip._TEMP_FILES_PREFIX + "wvf_cuts.txt"
+    n_copied = sum(len(indices) for indices, source in pieces if source is not None)
+    n_frames = sum(len(indices) for indices, _ in pieces)
+    logger(
+        message="MoviePy - Smart cut: %d of the %d frames are copied from the "
+        "video files" % (n_copied, n_frames)
+    )
+    try:
+        logger(frame_index__total=n_frames)
+        frames_done = 0
+        for (frame_indices, source), piece_filename in zip(pieces, piece_filenames):
+            if source is None:
+                for _ in _write_video_segment_frames(
+                    clip, piece_filename, fps, frame_indices, writer_params
+                ):
+                    frames_done += 1
+                    logger(frame_index__index=frames_done)
+            else:
+                _copy_video_frames(
+                    source[0],
+                    source[1],
+                    len(frame_indices),
+                    fps,
+                    piece_filename,
+                    output_params,
+                )
+                frames_done += len(frame_indices)
+                logger(frame_index__index=frames_done)
+        _concat_video_segments(
+            filename,
+            piece_filenames,
+            concat_list_filename,
+            logfile,
+            audiofile=audiofile,
+            audio_codec=audio_codec,
+            output_format=output_format,
+            fps=fps,
+            segment_n_frames=[len(frame_indices) for frame_indices, _ in pieces],
+        )
+    finally:
+        for temp_filename in piece_filenames + [concat_list_filename]:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+
+def _timescale(fps):
+    """Returns the timescale of the pieces of a MP4 or MOV video written at
+    ``fps``, in which the times of all the frames are exact: the number of
+    frames per ``n`` seconds (like 24000 for 24000/1001 fps), doubled up to at
+    least 10000 ticks per second like the MP4 muxer of ffmpeg does.
+    """
+    timescale = Fraction(fps).limit_denominator(1001).numerator
+    while timescale < 10000:
+        timescale *= 2
+    return timescale
+
+
+def _copy_video_frames(
+    source_filename, keyframe_time, n_frames, fps, filename, output_params=()
+):
+    """Copies ``n_frames`` encoded frames of the video stream of a file,
+    starting at the keyframe at ``keyframe_time``, to a new file, written with
+    the ffmpeg options ``output_params``.
+    """
+    cmd = [
+        FFMPEG_BINARY,
+        "-y",
+        "-loglevel",
+        "error",
+        # Seeking half a frame after the keyframe, as ffmpeg copies the
+        # frames from the last keyframe before the given time
+        "-ss",
+        "%.6f" % (keyframe_time + 0.5 / fps),
+        "-i",
+        ffmpeg_escape_filename(source_filename),
+        "-map",
+        "0:v:0",
+        "-c",
+        "copy",
+        "-frames:v",
+        str(n_frames),
+        "-avoid_negative_ts",
+        "make_zero",
+        *output_params,
+        ffmpeg_escape_filename(filename),
+    ]
+    popen_params = cross_platform_popen_params(
+        {"stdout": sp.DEVNULL, "stderr": sp.PIPE, "stdin": sp.DEVNULL}
+    )
+    proc = sp.Popen(cmd, **popen_params)
+    _, error = proc.communicate()
+    if proc.returncode:
+        raise IOError(
+            "MoviePy error: FFMPEG encountered the following error while "
+            "copying the frames of %s:\n\n%s"
+            % (source_filename, error.decode() if error else "")
+        )
@@ -7,6 +7,7 @@ import numpy as np
 import pytest
 
 from moviepy.Clip import Clip
+from moviepy.FrameCache import FrameCache
 from moviepy.video.VideoClip import BitmapClip, ColorClip
 
 
@@ -255,5 +256,53 @@ def test_clip_memoize():
     assert isinstance(memoize_clip.get_frame(1), np.ndarray)
 
 
+def test_clip_frame_cache():
+    clip = BitmapClip([["RR", "RR"], ["GG", "GG"], ["BB", "BB"]], fps=1)
+    calls = []
+
+    def frame_function(t):
+        calls.append(t)
+        return np.full((2, 2, 3), t, dtype="uint8")
+
+    clip.frame_function = frame_function
+    assert clip.frame_cache is None
+
+    # room for two frames of 12 bytes
+    cached_clip = clip.with_frame_cache(24)
+    cache = cached_clip.frame_cache
+    assert cached_clip.get_frame(0) is cached_clip.get_frame(0)
+    cached_clip.get_frame(1)
+    cached_clip.get_frame(0)
+    cached_clip.get_frame(2)  # evicts the frame at t=1, least recently used
+    assert calls == [0, 1, 2]
+    assert (cache.hits, cache.misses, len(cache), cache.nbytes) == (2, 3, 2, 24)
+
+    cached_clip.get_frame(1)
+    assert calls == [0, 1, 2, 1]
+
+    # copies share the cache, clips transforming the frames don't use it
+    assert cached_clip.with_start(2).get_frame(1) is cached_clip.get_frame(1)
+    inverted_clip = cached_clip.image_transform(lambda frame: 255 - frame)
+    assert inverted_clip.get_frame(1)[0, 0, 0] == 254
+    assert cache.hits == 5
+
+    assert cached_clip.with_frame_cache(None).frame_cache is None
+
+
+def test_frame_cache_by_frame_index():
+    cache = FrameCache(max_bytes=100, fps=10)
+    frames = [cache.get_frame(lambda t: np.array([t]), t) for t in (0.1, 0.15, 0.2)]
+    assert frames[0] is frames[1]
+    assert frames[2] is not frames[1]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # frames bigger than the whole cache are not kept
+    cache.get_frame(lambda t: np.zeros(101, dtype="uint8"), 5)
+    assert len(cache) == 2
+
+    cache.clear()
+    assert (len(cache), cache.nbytes) == (0, 0)
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -251,6 +251,24 @@ def test_setaudio_with_audiofile(util):
     assert os.path.isfile(location)
 
 
+@pytest.mark.parametrize("audio_mode", ("concurrent", "stream"))
+def test_write_videofile_audio_mode(util, audio_mode):
+    clip = ColorClip(size=(100, 60), color=(255, 0, 0), duration=0.5)
+    audio = AudioFileClip("media/crunching.mp3").subclipped(0, 0.5)
+    clip = clip.with_audio(audio)
+    location = os.path.join(util.TMP_DIR, "audio_mode.mp4")
+    clip.write_videofile(location, fps=24, audio_mode=audio_mode, logger=None)
+
+    result = VideoFileClip(location)
+    assert result.reader.n_frames == 12
+    assert abs(result.audio.duration - 0.5) < 0.05
+    result.close()
+    assert not [name for name in os.listdir(".") if "audio_modeTEMP" in name]
+
+    with pytest.raises(ValueError, match="audio_mode"):
+        clip.write_videofile(location, fps=24, audio_mode="foo", logger=None)
+
+
 def test_setopacity(util, video):
     clip = video(start_time=0.2, end_time=0.6)
     clip = clip.with_opacity(0.5)
@@ -4,13 +4,21 @@ import copy
 import os
 from pathlib import Path
 
+import numpy as np
+
 import pytest
 
+from moviepy import vfx
+from moviepy.FrameCache import FrameCache
 from moviepy.video.compositing.CompositeVideoClip import clips_array
 from moviepy.video.io.errors import VideoCorruptedError
+from moviepy.video.io.ffmpeg_reader import (
+    FFMPEG_VideoReaderPool,
+    ffmpeg_read_keyframes,
+)
 from moviepy.video.io.ffmpeg_tools import ffmpeg_copy
 from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.video.VideoClip import ColorClip
+from moviepy.video.VideoClip import ColorClip, VideoClip
 
 
 def test_setup(util):
@@ -47,6 +55,187 @@ def test_ffmpeg_resizing():
         video.close()
 
 
+def test_ffmpeg_input_filters():
+    video_file = "media/big_buck_bunny_432_433.webm"
+    with VideoFileClip(video_file) as clip:
+        expected = clip.get_frame(0.5)[::-1, :, :][100:300]
+    with VideoFileClip(
+        video_file, input_filters=["vflip", "crop=iw:200:0:100"], audio=False
+    ) as clip:
+        assert clip.size == [1280, 200]
+        assert clip.get_frame(0.5).shape == (200, 1280, 3)
+        assert np.array_equal(clip.get_frame(0.5), expected)
+
+
+def test_effects_done_by_ffmpeg(monkeypatch):
+    video_file = "media/big_buck_bunny_0_30.webm"
+    clip = VideoFileClip(video_file, audio=False).with_start(1)
+
+    crop = vfx.Crop(x1=101, y1=51, width=333, height=201)
+    cropped = clip.with_effects([crop])
+    assert cropped.reader is not clip.reader
+    assert cropped.reader.input_filters[-1] == "crop=333:201:101:51:exact=1"
+    assert cropped.size == [333, 201]
+    assert cropped.start == 1
+    expected = VideoClip.with_effects(clip, [crop])
+    for t in [0, 2.5, 7]:
+        assert np.array_equal(cropped.get_frame(t), expected.get_frame(t))
+
+    # resizing is only done by ffmpeg when asked to, its pixels being different
+    assert clip.resized(width=320).reader is clip.reader
+    clip = VideoFileClip(video_file, audio=False, ffmpeg_resize=True)
+
+    # the effects done in Python after the ones done by a single new reader
+    resized = clip.with_effects(
+        [vfx.Resize(width=320), vfx.Crop(x1=10, x2=100), vfx.MirrorX()]
+    )
+    assert resized.reader.input_filters == [
+        "scale=320:180:flags=area",
+        "format=rgb24",
+        "crop=90:180:10:0:exact=1",
+    ]
+    assert resized.get_frame(1).shape == (180, 90, 3)
+    assert np.array_equal(resized.get_frame(1), resized.reader.get_frame(1)[:, ::-1])
+
+    # nothing is done by a new reader when nothing is cropped or resized
+    assert clip.cropped(x1=0).reader is clip.reader
+    assert clip.resized(clip.size).reader is clip.reader
+
+    # the file is not probed again for the new readers
+    def ffmpeg_parse_infos(*args, **kwargs):
+        raise AssertionError("the file should not be probed")
+
+    monkeypatch.setattr(
+        "moviepy.video.io.ffmpeg_reader.ffmpeg_parse_infos", ffmpeg_parse_infos
+    )
+    assert clip.cropped(x1=10).size == [1270, 720]
+    monkeypatch.undo()
+
+    # clips whose frames are not the ones of the reader are cropped in Python
+    subclip = clip.subclipped(1, 2)
+    assert subclip.cropped(x1=10).reader is clip.reader
+    assert clip.resized(lambda t: 1 + t).reader is clip.reader
+
+    # the resizing of the reader is done first
+    clip = VideoFileClip(video_file, audio=False, target_resolution=(640, None))
+    cropped = clip.cropped(x1=100, y1=100, width=200, height=100)
+    assert cropped.reader.input_filters[0] == "scale=640:360"
+    assert cropped.reader.size == [200, 100]
+    assert np.array_equal(cropped.get_frame(3), clip.get_frame(3)[100:200, 100:300])
+
+
+def test_iter_keyframes():
+    video_file = "media/big_buck_bunny_0_30.webm"
+    small_clip = VideoFileClip(video_file, target_resolution=(160, None))
+    with VideoFileClip(video_file) as clip:
+        keyframes = [(t, frame.copy()) for t, frame in clip.iter_keyframes((160, None))]
+    assert [t for t, frame in keyframes] == ffmpeg_read_keyframes(video_file)
+    for t, frame in keyframes:
+        assert frame.shape == (90, 160, 3)
+        assert np.array_equal(frame, small_clip.get_frame(t))
+
+    # the keyframes have the size of the clip by default
+    (t, frame), *_ = small_clip.iter_keyframes()
+    assert frame.shape == (90, 160, 3)
+
+    # the filters changing the times of the frames are not applied
+    with VideoFileClip(video_file, input_filters=["fps=2", "vflip"]) as clip:
+        flipped = [(t, frame.copy()) for t, frame in clip.iter_keyframes((160, 90))]
+    assert [t for t, frame in flipped] == [t for t, frame in keyframes]
+    for (t, frame), (_, expected) in zip(flipped, keyframes):
+        assert np.array_equal(frame, expected[::-1])
+
+
+@pytest.mark.parametrize("accurate", (True, False))
+def test_thumbnails(accurate):
+    video_file = "media/big_buck_bunny_0_30.webm"
+    small_clip = VideoFileClip(video_file, target_resolution=(None, 90))
+    with VideoFileClip(video_file) as clip:
+        thumbnails = clip.thumbnails(4, size=(None, 90), accurate=accurate)
+    times = [3.75, 11.25, 18.75, 26.25]
+    if not accurate:
+        # the times of the keyframes at or before these times
+        keyframes = ffmpeg_read_keyframes(video_file)
+        times = [max(k for k in keyframes if k <= t) for t in times]
+    assert [t for t, frame in thumbnails] == times
+    for t, frame in thumbnails:
+        assert frame.shape == (90, 160, 3)
+        assert np.array_equal(frame, small_clip.get_frame(t))
+
+
+def test_frame_cache():
+    clip = VideoFileClip("media/big_buck_bunny_0_30.webm", audio=False)
+    assert clip.frame_cache.max_bytes == 8 * 1280 * 720 * 3
+
+    # the default cache of large frames is bounded in bytes
+    big_clip = VideoFileClip(
+        "media/big_buck_bunny_0_30.webm", audio=False, target_resolution=(2160, 3840)
+    )
+    assert big_clip.frame_cache.max_bytes == 64e6
+    big_clip.close()
+
+    frame = clip.get_frame(1)
+    clip.get_frame(1.5)
+    pos = clip.reader.pos
+    # going back to a frame in the cache doesn't restart the reader
+    assert clip.get_frame(1 + 0.2 / clip.fps) is frame
+    assert clip.reader.pos == pos
+    assert (clip.frame_cache.hits, clip.frame_cache.misses) == (1, 2)
+
+    # the clips with frames cropped by ffmpeg have their own cache
+    cropped_clip = clip.cropped(x2=640)
+    assert cropped_clip.get_frame(1).shape == (720, 640, 3)
+    assert cropped_clip.frame_cache is not clip.frame_cache
+    clip.close()
+
+    clip = VideoFileClip("media/chaplin.mp4", audio=False, frame_buffers=4)
+    assert clip.frame_cache is None
+    clip.close()
+    clip = VideoFileClip("media/chaplin.mp4", audio=False, frame_cache=False)
+    assert clip.frame_cache is None
+    clip.close()
+
+    with pytest.raises(ValueError, match="frame_buffers"):
+        VideoFileClip("media/chaplin.mp4", frame_buffers=4, frame_cache=FrameCache())
+
+
+def test_to_proxy_cache(util, monkeypatch):
+    proxy_filepath = os.path.join(util.TMP_DIR, "chaplin.mpyraw")
+    clip = VideoFileClip("media/chaplin.mp4")
+    proxy_clip = clip.to_proxy_cache(proxy_filepath, target_resolution=(160, None))
+    assert proxy_clip.size == (160, 90)
+    assert proxy_clip.reader.n_frames == int(clip.duration * clip.fps)
+    assert proxy_clip.audio is not None
+
+    reference = VideoFileClip("media/chaplin.mp4", target_resolution=(160, None))
+    for t in [5, 0.5, 9.5, 2.04, 2]:
+        frame = proxy_clip.get_frame(t)
+        assert not frame.flags.writeable
+        assert np.array_equal(frame, reference.get_frame(t))
+
+    # the keyframes and thumbnails are read from the file, at the proxy's size
+    (t, keyframe), *_ = proxy_clip.iter_keyframes()
+    assert np.array_equal(keyframe, reference.get_frame(t))
+    ((t, thumbnail),) = proxy_clip.thumbnails(1, accurate=False)
+    assert np.array_equal(thumbnail, reference.get_frame(t))
+    reference.close()
+
+    # an up-to-date proxy file isn't written again
+    monkeypatch.setattr(
+        "moviepy.video.io.VideoFileClip.write_raw_proxy", lambda *a, **k: 1 / 0
+    )
+    proxy_clip = clip.to_proxy_cache(proxy_filepath, target_resolution=(160, None))
+    assert proxy_clip.size == (160, 90)
+    with pytest.raises(ZeroDivisionError):
+        clip.to_proxy_cache(proxy_filepath)
+
+    with pytest.raises(ValueError, match="without effects"):
+        clip.with_effects([vfx.InvertColors()]).to_proxy_cache(proxy_filepath)
+
+    clip.close()
+    proxy_clip.close()
+
+
 def test_copied_videofileclip_write_videofile(util):
     """Check that a copied ``VideoFileClip`` can be renderizable using
     ``write_videofile``, opened from that render and the new video shares
@@ -101,6 +290,39 @@ def test_ffmpeg_transparency_mask(util):
     video.close()
 
 
+def test_ffmpeg_transparency_mask_dtype():
+    video = VideoFileClip("media/transparent.webm", has_mask=True)
+    mask_frame = video.mask.get_frame(0.5)
+    assert mask_frame.dtype == np.float32
+    # the alpha channel is converted once per frame read
+    assert video.mask.get_frame(0.5) is mask_frame
+    video.close()
+
+    video = VideoFileClip("media/transparent.webm", has_mask=True, mask_dtype="float64")
+    mask_frame64 = video.mask.get_frame(0.5)
+    assert mask_frame64.dtype == np.float64
+    assert np.allclose(mask_frame64, mask_frame)
+    video.close()
+
+    with pytest.raises(ValueError, match="floating point"):
+        VideoFileClip("media/transparent.webm", has_mask=True, mask_dtype="uint8")
+
+
+def test_ffmpeg_transparency_mask_reader_pool():
+    video_file = "media/transparent.webm"
+    with VideoFileClip(video_file, has_mask=True) as video:
+        expected = [video.mask.get_frame(t).copy() for t in [0, 0.5, 1]]
+
+    pool = FFMPEG_VideoReaderPool()
+    video = VideoFileClip(video_file, has_mask=True, reader_pool=pool)
+    for t, expected_mask in zip([0, 0.5, 1], expected):
+        mask_frame = video.mask.get_frame(t)
+        assert np.array_equal(mask_frame, expected_mask)
+        assert video.mask.get_frame(t) is mask_frame
+    video.close()
+    pool.close()
+
+
 def test_no_duration_raise_io_error():
     with pytest.raises(
         VideoCorruptedError,
@@ -75,6 +75,19 @@ def test_concatenate_self(util):
     assert concatenated == target
 
 
+def test_concatenate_chain_clips():
+    clips = [ColorClip((2, 2), color=(i, 0, 0), duration=1) for i in range(3)]
+    concatenated = concatenate_videoclips(clips)
+    timings, chained_clips = concatenated._chain_concatenation()
+    assert list(timings) == [0, 1, 2, 3]
+    assert chained_clips == clips
+
+    # copies keep the clips while their frames are not transformed
+    assert concatenated.with_start(1)._chain_concatenation() is not None
+    assert concatenated.with_effects([vfx.MirrorX()])._chain_concatenation() is None
+    assert clips[0]._chain_concatenation() is None
+
+
 def test_concatenate_floating_point(util):
     """
     >>> print("{0:.20f}".format(1.12))
@@ -179,6 +192,201 @@ def test_compositing_with_transparency_colors(util):
     assert abs(opacity3 - 0.657) < 0.01
 
 
+def test_compose_on_inplace():
+    background = np.full((10, 10, 3), 100, dtype="uint8")
+    background_mask = np.full((10, 10), 0.5)
+    clip = ColorClip((4, 4), (0, 0, 255, 127.5)).with_position((2, 3))
+
+    frame, mask = clip.compose_on(background, 0, background_mask)
+    assert (background == 100).all() and (background_mask == 0.5).all()
+
+    inplace_frame, inplace_mask = clip.compose_on(
+        background, 0, background_mask, inplace=True
+    )
+    assert inplace_frame is background and inplace_mask is background_mask
+    assert (inplace_frame == frame).all() and (inplace_mask == mask).all()
+    # only the region of the clip is modified
+    assert (background[3:7, 2:6] != 100).all()
+    assert (np.delete(background[:, :, 0], np.s_[3:7], 0) == 100).all()
+
+    # the layers of a composite are blended in a copy of its background, which
+    # is left untouched
+    bg_clip = ImageClip(np.full((10, 10, 3), 100, dtype="uint8"), duration=1)
+    bg_clip = bg_clip.with_mask(ColorClip((10, 10), 0.5, is_mask=True, duration=1))
+    layers = [
+        ColorClip((4, 4), (255, 0, 0), duration=1).with_position((i, i))
+        for i in range(5)
+    ]
+    composite = CompositeVideoClip([bg_clip] + layers, use_bgclip=True, bg_color=None)
+    frame = composite.get_frame(0)
+    assert (frame[4:8, 4:8] == (255, 0, 0)).all()
+    assert (frame[0, 9] == 100).all()
+    assert (composite.mask.get_frame(0)[4:8, 4:8] == 1).all()
+    assert (bg_clip.get_frame(0) == 100).all()
+    assert (bg_clip.mask.get_frame(0) == 0.5).all()
+
+
+def test_compositing_premultiplied_alpha():
+    rng = np.random.default_rng(0)
+    layers = [
+        ColorClip((20, 20), tuple(int(c) for c in rng.integers(0, 256, 3)))
+        .with_duration(1)
+        .with_opacity(float(rng.uniform(0.1, 0.9)))
+        .with_position(tuple(int(c) for c in rng.integers(-5, 15, 2)))
+        for _ in range(20)
+    ]
+    # colors of the layers blended in float64
+    expected = np.zeros((30, 30, 3))
+    for layer in layers:
+        x, y = layer.pos(0)
+        region = expected[max(y, 0) : y + 20, max(x, 0) : x + 20]
+        opacity = layer.mask.get_frame(0)[0, 0]
+        region[:] = layer.get_frame(0)[0, 0] * opacity + region * (1 - opacity)
+
+    # the colors are only rounded once all the layers are blended
+    composite = CompositeVideoClip(layers, size=(30, 30), premultiplied_alpha=True)
+    assert np.abs(composite.get_frame(0) - expected).max() <= 0.5
+
+    # transparent composites give the same colors and mask as the default
+    clip1 = ColorClip((100, 100), (255, 0, 0, 76.5)).with_duration(2)
+    clip2 = ColorClip((50, 50), (0, 255, 0, 76.5)).with_duration(2)
+    composite = CompositeVideoClip(
+        [clip1, clip2.with_position(("center", "center"))],
+        bg_color=None,
+        premultiplied_alpha=True,
+    )
+    frame = composite.get_frame(1)
+    mask = composite.mask.get_frame(1)
+    assert np.allclose(frame[50, 10], [255, 0, 0], atol=1)
+    assert np.allclose(frame[50, 30], [105, 150, 0], atol=1)
+    assert abs(mask[50, 10] - 0.3) < 0.01
+    assert abs(mask[50, 30] - 0.51) < 0.01
+
+
+def test_constant_opacity():
+    clip = ColorClip((10, 10), (255, 0, 0), duration=1)
+    assert clip.constant_opacity() == 1
+    assert clip.with_mask().constant_opacity() == 1
+    assert clip.with_opacity(0.5).constant_opacity() == 0.5
+    assert clip.with_opacity(0.5).with_opacity(0.5).constant_opacity() == 0.25
+    assert ColorClip((10, 10), (0, 0, 0, 0)).constant_opacity() == 0
+    # masks which vary, or changed by effects, have no known opacity
+    gradient = np.tile(np.linspace(0, 1, 10), (10, 1))
+    assert clip.with_mask(ImageClip(gradient, is_mask=True)).constant_opacity() is None
+    masked_clip = clip.with_mask(clip.with_mask().mask.with_effects([vfx.FadeIn(1)]))
+    assert masked_clip.constant_opacity() is None
+    assert (
+        clip.with_mask(ColorClip((5, 5), 1.0, is_mask=True)).constant_opacity() is None
+    )
+
+    # the masks of known opacity are not computed during compositing
+    calls = []
+
+    def mask_frame_function(t):
+        calls.append(t)
+        return np.full((4, 4), 0.5)
+
+    layer = ColorClip((4, 4), (0, 0, 255), duration=1).with_mask(
+        VideoClip(mask_frame_function, is_mask=True, duration=1)
+    )
+    layer.mask._constant_frame = (0.5, mask_frame_function)
+    calls.clear()
+    for bg_color in [(0, 0, 0), None]:
+        for premultiplied_alpha in [False, True]:
+            composite = CompositeVideoClip(
+                [clip, layer, clip.with_opacity(0.5).with_position((6, 6))],
+                bg_color=bg_color,
+                premultiplied_alpha=premultiplied_alpha,
+            )
+            frame = composite.get_frame(0)
+            assert np.allclose(frame[0, 0], [127, 0, 127], atol=1)
+            assert np.allclose(frame[5, 5], [255, 0, 0], atol=1)
+            assert np.allclose(frame[8, 8], [255, 0, 0], atol=1)
+            if bg_color is None:
+                assert (composite.mask.get_frame(0) == 1).all()
+    assert not calls
+
+
+def test_composite_frame_and_mask():
+    calls = []
+
+    def frame_function(t):
+        calls.append(t)
+        return np.full((10, 10, 3), 255 * t, dtype="uint8")
+
+    layer = VideoClip(frame_function, duration=1).with_opacity(0.5)
+    composite = CompositeVideoClip(
+        [layer.with_position((5, 0))], size=(20, 10), bg_color=None
+    )
+    frame, frame_mask = composite._get_frame_and_mask(0.5)
+    assert np.allclose(frame[0, 5], 127, atol=1)
+    assert (frame_mask[:, :5] == 0).all() and (frame_mask[:, 5:15] == 0.5).all()
+
+    # the frame and the mask of the transformed clip are computed in a single
+    # pass over the clips, in any order
+    composite = composite.with_position((1, 1)).subclipped(0.25, 1)
+    calls.clear()
+    for t in [0.5, 0.2, 0.5000001]:
+        mask = composite.mask.get_frame(t)
+        frame = composite.get_frame(t)
+        assert np.allclose(frame[0, 5], 255 * (t + 0.25), atol=1)
+        assert (mask[:, :5] == 0).all() and (mask[:, 5:15] == 0.5).all()
+    assert calls == [0.75, 0.45, 0.7500001]
+
+    # opaque composites have no mask
+    composite = CompositeVideoClip([layer], size=(20, 10))
+    assert composite.mask is None
+    assert composite._get_frame_and_mask(0.5)[1] is None
+
+
+def test_playing_clips_index():
+    clips = [
+        ColorClip((2, 2), (i, 0, 0), duration=0.1).with_start(i * 0.05)
+        for i in range(200)
+    ]
+    composite = CompositeVideoClip(clips[::-1], size=(2, 2))
+    for t in [0, 0.05, 0.07, 3.33, 9.99, 10.05]:
+        expected = [clip for clip in composite.clips if clip.is_playing(t)]
+        assert composite.playing_clips(t) == expected
+    # the clips playing are blitted in the order of the list
+    assert composite.get_frame(5.02)[0, 0, 0] == 99
+
+    # the index follows the changes of the clips
+    composite.clips = composite.clips[:10]
+    assert composite.playing_clips(5.02) == []
+    composite.clips.append(clips[0].with_start(5))
+    assert composite.playing_clips(5.02) == [composite.clips[-1]]
+    del composite.clips[-1]
+    assert composite.playing_clips(5.02) == []
+    # ... and the clips replaced or moved in the list
+    composite.clips[0] = clips[0].with_start(5)
+    assert composite.playing_clips(5.02) == [composite.clips[0]]
+    composite.clips[0].start, composite.clips[0].end = 6, 6.1
+    assert composite.playing_clips(5.02) == []
+    assert composite.playing_clips(6.02) == [composite.clips[0]]
+
+    audio = CompositeAudioClip(
+        [
+            AudioClip(
+                lambda t: np.ones((np.size(t), 1)), duration=0.1, fps=100
+            ).with_start(i * 0.05)
+            for i in range(200)
+        ]
+    )
+    assert (audio.get_frame(np.array([0.0, 0.06, 5.02])).ravel() == [1, 2, 2]).all()
+    assert audio.get_frame(20) == 0
+    audio.clips.append(audio.clips[0].with_start(20))
+    assert audio.get_frame(20) == 1
+    audio.clips[-1] = audio.clips[0].with_start(30)
+    assert audio.get_frame(20) == 0
+    assert audio.get_frame(30) == 1
+
+    # the times out of a chain of clips are the ones of its first or last clip
+    concatenated = concatenate_videoclips(clips[:3])
+    assert concatenated.get_frame(-0.5)[0, 0, 0] == 0
+    assert concatenated.get_frame(concatenated.duration)[0, 0, 0] == 2
+
+
 def test_slide_in():
     duration = 0.1
     size = (10, 1)
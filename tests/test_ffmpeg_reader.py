@@ -1,6 +1,8 @@
 """FFmpeg reader tests meant to be run with pytest."""
 
+import io
 import os
+import shutil
 import subprocess
 import time
 
@@ -12,10 +14,14 @@ from moviepy.audio.AudioClip import AudioClip
 from moviepy.config import FFMPEG_BINARY
 from moviepy.tools import ffmpeg_escape_filename
 from moviepy.video.compositing.CompositeVideoClip import clips_array
+from moviepy.video.io import ffmpeg_reader
 from moviepy.video.io.ffmpeg_reader import (
     FFMPEG_VideoReader,
+    FFMPEG_VideoReaderPool,
     FFmpegInfosParser,
     ffmpeg_parse_infos,
+    ffmpeg_probe_video_output,
+    ffmpeg_read_keyframes,
 )
 from moviepy.video.io.ffmpeg_tools import ffmpeg_version
 from moviepy.video.io.VideoFileClip import VideoFileClip
@@ -701,6 +707,297 @@ def test_large_small_skip_equal():
     assert np.array_equal(small_skip_final_frame, large_skip_final_frame)
 
 
+@pytest.mark.parametrize("prefetch", (1, 8))
+def test_prefetch_frame_pos(prefetch):
+    sequential_reader = FFMPEG_VideoReader("media/big_buck_bunny_432_433.webm")
+    reader = FFMPEG_VideoReader("media/big_buck_bunny_432_433.webm", prefetch=prefetch)
+    assert reader._prefetch_thread.is_alive()
+
+    frames = [sequential_reader.get_frame(i / 24).copy() for i in range(24)]
+    for i in range(12):
+        assert np.array_equal(reader.get_frame(i / 24), frames[i])
+    assert reader._prefetch_queue.qsize() <= prefetch
+
+    # seeking backward and forward restarts the thread
+    assert np.array_equal(reader.get_frame(5 / 24), frames[5])
+    assert np.array_equal(reader.get_frame(6 / 24), frames[6])
+    assert np.array_equal(reader.get_frame(20 / 24), frames[20])
+
+    # the last frame is reused after the end of the video
+    last_frame = reader.get_frame(reader.duration - 0.001).copy()
+    with pytest.warns(UserWarning, match="Using the last valid frame instead"):
+        assert np.array_equal(reader.get_frame(reader.duration + 1), last_frame)
+
+    thread = reader._prefetch_thread
+    reader.close()
+    assert not thread.is_alive()
+    assert reader._prefetch_thread is None
+
+
+@pytest.mark.parametrize("prefetch", (0, 3))
+def test_frame_buffers(prefetch):
+    filename = "media/big_buck_bunny_432_433.webm"
+    sequential_reader = FFMPEG_VideoReader(filename)
+    reader = FFMPEG_VideoReader(filename, frame_buffers=4, prefetch=prefetch)
+    assert len(reader._buffers) == (5 if not prefetch else 8)
+
+    expected = [sequential_reader.get_frame(i / 24).copy() for i in range(24)]
+    frames = []
+    for i in range(12):
+        frame = reader.get_frame(i / 24)
+        assert np.shares_memory(frame, reader._buffers)
+        assert not frame.flags.writeable
+        frames.append(frame)
+        # the last 4 frames read are still valid
+        for j in range(max(0, i - 3), i + 1):
+            assert np.array_equal(frames[j], expected[j])
+
+    # seeking only reads one frame, keeping the previous ones
+    assert np.array_equal(reader.get_frame(2 / 24), expected[2])
+    for j in range(9, 12):
+        assert np.array_equal(frames[j], expected[j])
+    assert np.array_equal(reader.get_frame(20 / 24), expected[20])
+    reader.close()
+
+
+def test_frame_buffers_end_of_file():
+    # the incomplete frame read at the end of the file doesn't overwrite the
+    # last frame read, even with a single buffer
+    reader = FFMPEG_VideoReader("media/test_video.mp4", frame_buffers=1)
+    frame = reader.get_frame(0)
+    expected = frame.copy()
+    proc_stdout = reader.proc.stdout
+    reader.proc.stdout = io.BytesIO(b"\xff")
+    with pytest.warns(UserWarning, match="Using the last valid frame instead"):
+        assert reader.read_frame() is frame
+    assert np.array_equal(frame, expected)
+    reader.proc.stdout = proc_stdout
+    reader.close()
+
+
+def test_reader_pool():
+    filename = "media/big_buck_bunny_0_30.webm"
+    sequential_reader = FFMPEG_VideoReader(filename)
+    expected = {
+        i: sequential_reader.get_frame(i / 24).copy()
+        for i in [*range(20), 72, 150, *range(300, 320)]
+    }
+
+    pool = FFMPEG_VideoReaderPool(max_processes=2)
+    clips = [VideoFileClip(filename, audio=False, reader_pool=pool) for i in range(3)]
+    assert pool.n_processes == 1
+    (readers,) = pool._readers.values()
+    assert all(clip.reader.size == readers[0].size for clip in clips)
+
+    # interleaved sequential reads of two distant parts use a process each
+    for i in range(10):
+        assert np.array_equal(clips[0].get_frame(i / 24), expected[i])
+        assert np.array_equal(clips[1].get_frame((300 + i) / 24), expected[300 + i])
+    assert pool.n_processes == 2
+    procs = [reader.proc for reader in readers]
+    for i in range(10, 20):
+        assert np.array_equal(clips[1].get_frame((300 + i) / 24), expected[300 + i])
+        assert np.array_equal(clips[0].get_frame(i / 24), expected[i])
+    assert [reader.proc for reader in readers] == procs
+
+    # no more processes than allowed: the least recently used one seeks
+    assert np.array_equal(clips[2].get_frame(150 / 24), expected[150])
+    assert pool.n_processes == 2
+    assert sorted(reader.pos for reader in readers) == [20, 151]
+
+    # other files get processes from the least recently used ones
+    other_clip = VideoFileClip("media/chaplin.mp4", audio=False, reader_pool=pool)
+    assert pool.n_processes == 2
+    assert other_clip.get_frame(1).shape == (360, 640, 3)
+    assert np.array_equal(clips[0].get_frame(3), expected[72])
+
+    # the processes of a file are closed when all its clips are closed
+    other_clip.close()
+    assert pool.n_processes == 1
+    for clip in clips:
+        clip.close()
+    assert pool.n_processes == 0
+    pool.close()
+
+
+def test_ffmpeg_probe_video_output():
+    assert ffmpeg_probe_video_output("media/chaplin.mp4") == {
+        "video_size": [640, 360],
+        "video_fps": 25.0,
+    }
+    assert ffmpeg_probe_video_output(
+        "media/chaplin.mp4", ["-threads", "1"], ["crop=100:50", "fps=10"]
+    ) == {"video_size": [100, 50], "video_fps": 10.0}
+
+    with pytest.raises(IOError, match="failed to decode file"):
+        ffmpeg_probe_video_output("media/chaplin.mp4", input_filters=["nofilter"])
+
+
+def test_reader_input_filters():
+    filename = "media/big_buck_bunny_0_30.webm"
+    full_reader = FFMPEG_VideoReader(filename)
+
+    reader = FFMPEG_VideoReader(
+        filename,
+        decoder_options=["-threads", "2"],
+        input_filters="crop=640:360:100:50",
+        target_resolution=(320, None),
+    )
+    assert reader.size == (320, 180)
+    assert "-threads" in reader.proc.args
+    reader = FFMPEG_VideoReader(filename, input_filters=["crop=640:360:100:50"])
+    assert reader.size == [640, 360]
+    for t in [0, 1, 5.5, 3]:
+        expected = full_reader.get_frame(t)[50:410, 100:740]
+        assert np.array_equal(reader.get_frame(t), expected)
+
+    # seeking gives the same frames as reading sequentially
+    reader = FFMPEG_VideoReader(filename, input_filters="fps=10")
+    assert reader.fps == 10
+    assert reader.n_frames == 300
+    frames = [reader.get_frame(i / 10).copy() for i in range(60)]
+    for i in [50, 20, 59, 35, 36]:
+        assert np.array_equal(reader.get_frame(i / 10), frames[i])
+
+
+def test_stride_frame_pos():
+    filename = "media/big_buck_bunny_0_30.webm"
+    sequential_reader = FFMPEG_VideoReader(filename)
+    expected = [sequential_reader.get_frame(i / 24).copy() for i in range(310)]
+
+    reader = FFMPEG_VideoReader(filename)
+    for i in range(0, 24, 6):
+        assert np.array_equal(reader.get_frame(i / 24), expected[i])
+    assert reader.stride == 6
+
+    # only the frames of the stride are read by the new process
+    proc = reader.proc
+    for i in range(24, 300, 6):
+        assert np.array_equal(reader.get_frame(i / 24), expected[i])
+        assert reader.get_frame(i / 24) is reader.last_read
+    assert reader.proc is proc
+    assert reader.pos == 295
+
+    # frames of the stride can still be read after the pattern is broken
+    assert np.array_equal(reader.get_frame(306 / 24), expected[306])
+    assert reader.stride == 6
+    assert np.array_equal(reader.get_frame(307 / 24), expected[307])
+    assert reader.stride == 1
+    for i in [308, 309, 200, 201, 203]:
+        assert np.array_equal(reader.get_frame(i / 24), expected[i])
+    assert reader.stride == 1
+
+
+def test_sparse_frames_no_stride():
+    filename = "media/big_buck_bunny_0_30.webm"
+    sequential_reader = FFMPEG_VideoReader(filename)
+    expected = [sequential_reader.get_frame(i / 24).copy() for i in range(0, 720, 200)]
+
+    # frames 200 frames apart are reached by seeking, not by a stride
+    reader = FFMPEG_VideoReader(filename)
+    for i, frame in zip(range(0, 720, 200), expected):
+        assert np.array_equal(reader.get_frame(i / 24), frame)
+        assert reader.stride == 1
+
+
+@pytest.mark.parametrize(
+    "version, expected",
+    (
+        ("4.4.2", ["-vsync", "passthrough"]),
+        ("5.0", ["-vsync", "passthrough"]),
+        ("5.1.2", ["-fps_mode", "passthrough"]),
+        ("7.0.2", ["-fps_mode", "passthrough"]),
+        (None, ["-fps_mode", "passthrough"]),
+    ),
+)
+def test_passthrough_options(version, expected, monkeypatch):
+    monkeypatch.setattr(ffmpeg_reader, "ffmpeg_version", lambda: ("", version))
+    ffmpeg_reader._passthrough_options.cache_clear()
+    try:
+        assert ffmpeg_reader._passthrough_options() == expected
+    finally:
+        ffmpeg_reader._passthrough_options.cache_clear()
+
+
+def test_ffmpeg_read_keyframes():
+    keyframes = ffmpeg_read_keyframes("media/big_buck_bunny_0_30.webm")
+    assert len(keyframes) == 10
+    assert keyframes == sorted(keyframes)
+    assert keyframes[0] == pytest.approx(0.003)
+    assert keyframes[3] == pytest.approx(5.795)
+
+    # a single keyframe for the whole video
+    assert ffmpeg_read_keyframes("media/chaplin.mp4") == [0]
+
+
+@pytest.mark.parametrize(
+    "line, is_keyframe",
+    (
+        ("0,          3,          3,       41,     1574, 0xb3d0c24b", True),
+        ("0,         45,         45,       41,      100, 0x747a2b96, F=0x0", False),
+        ("0,  0,  0,  512,  20368, 0x5f70561e, S=1,       10, 0x00e8002b", True),
+        ("0,  512,  512,  512,  52, 0x5e8a1c3d, F=0x0, S=1,  10, 0x00e8002b", False),
+        ("0,  1024,  1024,  512,  52, 0x5e8a1c3d, F=0x3, S=1,  8, 0x1", True),
+    ),
+)
+def test_framecrc_flags(line, is_keyframe):
+    fields = [field.strip() for field in line.split(",")]
+    assert bool(ffmpeg_reader._framecrc_flags(fields) & 1) == is_keyframe
+
+
+def test_ffmpeg_parse_infos_cache_dir(util, monkeypatch):
+    cache_dir = os.path.join(util.TMP_DIR, "moviepy_ffmpeg_cache")
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    monkeypatch.setattr(ffmpeg_reader, "_KEYFRAMES_CACHE", {})
+
+    filename = "media/big_buck_bunny_0_30.webm"
+    infos = ffmpeg_parse_infos(filename, cache_dir=cache_dir)
+    keyframes = ffmpeg_read_keyframes(filename, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # ffmpeg is not run anymore
+    def popen(*args, **kwargs):
+        raise AssertionError("ffmpeg should not be run")
+
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    monkeypatch.setattr(ffmpeg_reader, "_KEYFRAMES_CACHE", {})
+    cached_infos = ffmpeg_parse_infos(filename, cache_dir=cache_dir)
+    for key in ("duration", "video_size", "video_fps", "video_n_frames", "inputs"):
+        assert cached_infos[key] == infos[key]
+    assert ffmpeg_read_keyframes(filename, cache_dir=cache_dir) == keyframes
+
+    # the parameters are part of the key
+    with pytest.raises(AssertionError, match="should not be run"):
+        ffmpeg_parse_infos(filename, decode_file=True, cache_dir=cache_dir)
+
+
+def test_keyframe_index_frame_pos():
+    sequential_reader = FFMPEG_VideoReader("media/big_buck_bunny_0_30.webm")
+    reader = FFMPEG_VideoReader("media/big_buck_bunny_0_30.webm", keyframe_index=True)
+    assert reader.keyframe_numbers[:4] == [0, 9, 11, 139]
+
+    frames = [sequential_reader.get_frame(i / 24).copy() for i in range(150)]
+
+    # Jump of more than 100 frames without keyframe in between: no restart
+    reader.get_frame(1)
+    proc = reader.proc
+    assert np.array_equal(reader.get_frame(132 / 24), frames[132])
+    assert reader.proc is proc
+    assert reader.pos == 133
+
+    # Keyframe between current position and wanted frame: restart on it
+    assert np.array_equal(reader.get_frame(141 / 24), frames[141])
+    assert reader.proc is not proc
+    assert reader.pos == 142
+
+    # Going backwards, on and around keyframes
+    for frame_number in [9, 8, 10, 139, 0, 11, 12, 138]:
+        frame = reader.get_frame(frame_number / 24)
+        assert np.array_equal(frame, frames[frame_number])
+        assert reader.pos == frame_number + 1
+
+
 def test_seeking_beyond_file_end():
     reader = FFMPEG_VideoReader("media/test_video.mp4")
     frame_1 = reader.get_frame(0)
@@ -1,16 +1,28 @@
 """FFmpeg writer tests of moviepy."""
 
+import io
 import multiprocessing
 import os
+import subprocess
+import sys
+import threading
 
+import numpy as np
 from PIL import Image
 
 import pytest
 
 from moviepy import *
 from moviepy.video.compositing.CompositeVideoClip import concatenate_videoclips
-from moviepy.video.io.ffmpeg_writer import ffmpeg_write_image, ffmpeg_write_video
+from moviepy.video.io.ffmpeg_writer import (
+    FFMPEG_VideoWriter,
+    _output_name,
+    ffmpeg_write_image,
+    ffmpeg_write_video,
+)
 from moviepy.video.io.gif_writers import write_gif_with_imageio
+from moviepy.video.io.render_cache import clip_fingerprint
+from moviepy.video.io.smart_cut import smart_cut_pieces
 from moviepy.video.tools.drawing import color_gradient
 
 
@@ -68,7 +80,7 @@ def test_ffmpeg_write_video(
     clip = BitmapClip([["R"], ["G"], ["B"]], fps=10).with_duration(0.3)
     if with_mask:
         clip = clip.with_mask(
-            BitmapClip([["W"], ["O"], ["O"]], fps=10, is_mask=True).with_duration(0.3)
+            BitmapClip([["W"], ["O"], ["O"]], fps=10).with_duration(0.3).to_mask()
         )
 
     kwargs = dict(
@@ -95,14 +107,14 @@ def test_ffmpeg_write_video(
         assert b == 0
 
         r, g, b = final_clip.get_frame(0.1)[0][0]
-        assert r == (0 if not with_mask else 1)
-        assert g == (255 if not with_mask else 1)
+        assert r == 0
+        assert g == 255
         assert b == 1
 
         r, g, b = final_clip.get_frame(0.2)[0][0]
         assert r == 0
         assert g == 0
-        assert b == (255 if not with_mask else 0)
+        assert b == 255
 
     if write_logfile:
         assert os.path.isfile(logfile_name)
@@ -255,6 +267,349 @@ def test_transparent_video(util):
     result.close()
 
 
+def test_ffmpeg_videowriter_pixel_formats(util):
+    # frames given with their mask are assembled in RGBA buffers which are
+    # reused, but only once the frames they hold are written
+    filename = os.path.join(util.TMP_DIR, "mask_buffers.webm")
+    with FFMPEG_VideoWriter(
+        filename, (8, 8), 5, codec="libvpx", with_mask=True, queue_size=2
+    ) as writer:
+        for i in range(10):
+            frame = np.full((8, 8, 3), 25 * i, dtype="uint8")
+            writer.write_frame(frame, mask=np.full((8, 8), i / 10))
+    result = VideoFileClip(filename, has_mask=True)
+    for i in range(10):
+        t = i / 5 + 0.01
+        assert abs(int(result.get_frame(t)[4, 4, 0]) - 25 * i) <= 3
+        assert abs(result.mask.get_frame(t)[4, 4] - i / 10) < 0.01
+    result.close()
+
+    # masks are 2D arrays of the size of the frames
+    with FFMPEG_VideoWriter(filename, (8, 8), 5, with_mask=True) as writer:
+        with pytest.raises(ValueError, match="2D array"):
+            writer.write_frame(frame, mask=np.ones((8, 8, 3)))
+
+    # frames in another format are sent as they are
+    filename = os.path.join(util.TMP_DIR, "gray.mp4")
+    with FFMPEG_VideoWriter(filename, (8, 8), 5, input_pixel_format="gray") as writer:
+        for i in range(3):
+            writer.write_frame(np.full((8, 8), 100 * i, dtype="uint8"))
+    result = VideoFileClip(filename)
+    for i in range(3):
+        assert abs(int(result.get_frame(i / 5 + 0.01)[4, 4, 1]) - 100 * i) <= 3
+    result.close()
+
+
+def test_ffmpeg_write_video_queue_size(util):
+    filename = os.path.join(util.TMP_DIR, "queue_size.mp4")
+    clip = BitmapClip([["R"], ["G"], ["B"]], fps=10).with_duration(0.3)
+
+    timings = ffmpeg_write_video(clip, filename, 10, logger=None, queue_size=2)
+    assert set(timings) == {"frames", "write", "queue"}
+
+    final_clip = VideoFileClip(filename)
+    for t, color in [(0, (254, 0, 0)), (0.1, (0, 255, 1)), (0.2, (0, 0, 255))]:
+        assert tuple(final_clip.get_frame(t)[0][0]) == color
+    final_clip.close()
+
+    # the errors of the writing thread are raised in the main thread
+    frame = np.zeros((720, 1280, 3), dtype="uint8")
+    with pytest.raises(IOError, match="libcrazyfoobar"):
+        with FFMPEG_VideoWriter(
+            filename, (1280, 720), 10, codec="libcrazyfoobar", queue_size=2
+        ) as writer:
+            for i in range(100):
+                writer.write_frame(frame)
+
+    # any error of the thread is raised, and a stopped thread doesn't block
+    def stopping_write_frame(img_array):
+        raise KeyboardInterrupt()
+
+    writer = FFMPEG_VideoWriter(filename, (1280, 720), 10, queue_size=2)
+    writer._write_frame = stopping_write_frame
+    with pytest.raises(KeyboardInterrupt):
+        for i in range(10):
+            writer.write_frame(frame)
+    writer._queue.put(None)
+    writer._thread.join()
+    with pytest.raises(IOError, match="stopped"):
+        for i in range(10):
+            writer.write_frame(frame)
+    writer.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Rendering in parallel requires forking processes",
+)
+def test_write_videofile_n_jobs(util):
+    filename = os.path.join(util.TMP_DIR, "n_jobs's video.mp4")
+    clip = VideoFileClip("media/chaplin.mp4", target_resolution=(160, None))
+    clip = clip.subclipped(1, 3)
+    # the reader of the file is already running when the processes are forked
+    frame = clip.get_frame(0.5)
+
+    clip.write_videofile(filename, n_jobs=3, logger=None)
+
+    assert (clip.get_frame(0.5) == frame).all()
+    result = VideoFileClip(filename)
+    assert result.reader.n_frames == 50
+    assert result.audio is not None
+    assert abs(result.audio.duration - 2) < 0.1
+    for t in (0, 0.64, 0.68, 1.32, 1.36, 1.96):
+        error = abs(result.get_frame(t).astype(int) - clip.get_frame(t)).mean()
+        assert error < 6
+    assert not [name for name in os.listdir(util.TMP_DIR) if "wvf_part" in name]
+    result.close()
+    clip.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Rendering in parallel requires forking processes",
+)
+@pytest.mark.parametrize("audio_mode", ("prepass", "concurrent", "stream"))
+def test_write_videofile_n_jobs_no_thread_forked(util, monkeypatch, audio_mode):
+    filename = os.path.join(util.TMP_DIR, "n_jobs_threads.mp4")
+    # threads of other libraries, like the monitor thread of tqdm
+    other_threads = threading.enumerate()
+    clip = VideoFileClip("media/chaplin.mp4", target_resolution=(160, None), prefetch=2)
+    clip = clip.subclipped(1, 2)
+    # the prefetch thread of the reader is running
+    frame = clip.get_frame(0.5)
+
+    threads_at_fork = []
+    fork = os.fork
+
+    def counting_fork():
+        threads_at_fork.append(
+            [thread for thread in threading.enumerate() if thread not in other_threads]
+        )
+        return fork()
+
+    monkeypatch.setattr(os, "fork", counting_fork)
+    clip.write_videofile(filename, n_jobs=2, audio_mode=audio_mode, logger=None)
+    monkeypatch.undo()
+
+    # the audio was written and the reader closed before forking
+    assert threads_at_fork == [[], []]
+    assert (clip.get_frame(0.5) == frame).all()
+    result = VideoFileClip(filename)
+    assert result.reader.n_frames == 25
+    assert abs(result.audio.duration - 1) < 0.1
+    result.close()
+    clip.close()
+
+
+@pytest.mark.parametrize(
+    "output_format, header", (("mp4", b"ftyp"), ("webm", b"\x1aE\xdf\xa3"))
+)
+def test_write_videofile_to_file_object(util, output_format, header):
+    clip = BitmapClip([["R"], ["G"], ["B"]], fps=10).with_duration(0.3)
+    filename = os.path.join(util.TMP_DIR, "file_object.%s" % output_format)
+
+    # a BytesIO has no file descriptor, the output of ffmpeg is copied to it
+    buffer = io.BytesIO()
+    clip.write_videofile(buffer, output_format=output_format, logger=None)
+    assert header in buffer.getvalue()[:8]
+
+    # ffmpeg writes directly to a file open in binary mode
+    with open(filename, "wb") as file:
+        clip.write_videofile(file, output_format=output_format, logger=None)
+    with open(filename, "rb") as file:
+        assert header in file.read(8)
+
+    if output_format == "mp4":
+        # the streamed MP4 is fragmented but can be read like any other
+        result = VideoFileClip(filename)
+        assert result.reader.n_frames == 3
+        assert tuple(result.get_frame(0.2)[0][0]) == (0, 0, 255)
+        result.close()
+
+    with pytest.raises(ValueError, match="output_format"):
+        clip.write_videofile(io.BytesIO(), logger=None)
+
+
+def test_write_videofile_to_stdout(util):
+    filename = os.path.join(util.TMP_DIR, "stdout.mp4")
+    code = (
+        "import sys\n"
+        "from moviepy import ColorClip\n"
+        "clip = ColorClip((16, 16), color=(0, 0, 255), duration=0.3).with_fps(10)\n"
+        "clip.write_videofile(sys.stdout, output_format='mp4', logger='bar')\n"
+    )
+    with open(filename, "wb") as file:
+        subprocess.run([sys.executable, "-c", code], stdout=file, check=True)
+
+    # nothing but the video is written to the standard output
+    with open(filename, "rb") as file:
+        assert b"ftyp" in file.read(8)
+    result = VideoFileClip(filename)
+    assert result.reader.n_frames == 3
+    result.close()
+
+    with open(filename, "rb") as file:
+        assert _output_name(file) == filename
+    assert _output_name(io.BytesIO()) == "<BytesIO>"
+    assert _output_name("video.mp4") == "video.mp4"
+
+
+def test_write_videofile_hls(util):
+    filename = os.path.join(util.TMP_DIR, "hls", "playlist.m3u8")
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    clip = ColorClip((16, 16), color=(0, 0, 255)).with_fps(10).with_duration(1)
+
+    clip.write_videofile(filename, logger=None)
+
+    with open(filename) as file:
+        playlist = file.read()
+    segments = [line for line in playlist.splitlines() if line.endswith(".ts")]
+    assert segments
+    for segment in segments:
+        assert os.path.exists(os.path.join(util.TMP_DIR, "hls", segment))
+
+
+def test_write_videofile_render_cache(util):
+    directory = os.path.join(util.TMP_DIR, "render_cache")
+    filename = os.path.join(util.TMP_DIR, "render_cache.mp4")
+    cache = RenderCache(directory, segment_duration=1)
+    cache.clear()
+    background = ColorClip((32, 16), color=(0, 0, 255)).with_fps(10).with_duration(3)
+
+    def edit(title_color):
+        title = ColorClip((8, 8), color=title_color).with_duration(0.5)
+        return CompositeVideoClip([background, title.with_start(1.2)])
+
+    edit((255, 0, 0)).write_videofile(filename, render_cache=cache, logger=None)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    # only the segment where the title is visible is rendered again
+    edit((0, 255, 0)).write_videofile(filename, render_cache=cache, logger=None)
+    assert (cache.hits, cache.misses) == (2, 4)
+    edit((0, 255, 0)).write_videofile(filename, render_cache=cache, logger=None)
+    assert (cache.hits, cache.misses) == (5, 4)
+
+    result = VideoFileClip(filename)
+    assert result.reader.n_frames == 30
+    for t, color in [(0.5, (0, 0, 255)), (1.5, (0, 255, 0)), (2.5, (0, 0, 255))]:
+        assert tuple(result.get_frame(t)[0, 0]) == pytest.approx(color, abs=8)
+    result.close()
+    assert not [name for name in os.listdir(util.TMP_DIR) if "wvf_part" in name]
+
+
+def test_clip_fingerprint():
+    clip = ColorClip((4, 4), color=(255, 0, 0)).with_duration(2)
+    other_clip = ColorClip((4, 4), color=(0, 255, 0)).with_duration(1)
+
+    assert clip_fingerprint(clip) == clip_fingerprint(clip.copy())
+    assert clip_fingerprint(clip) != clip_fingerprint(clip.with_position((1, 1)))
+    assert clip_fingerprint(clip.with_effects([vfx.FadeIn(1)])) != clip_fingerprint(
+        clip.with_effects([vfx.FadeIn(0.5)])
+    )
+    assert clip_fingerprint(clip.image_transform(lambda im: im)) != (
+        clip_fingerprint(clip.image_transform(lambda im: 255 - im))
+    )
+
+    # the fingerprint of a composition only covers the clips playing
+    concatenation = concatenate_videoclips([clip, other_clip])
+    new_concatenation = concatenate_videoclips([clip, other_clip.with_fps(5)])
+    assert clip_fingerprint(concatenation, 0, 1.5) == (
+        clip_fingerprint(new_concatenation, 0, 1.5)
+    )
+    assert clip_fingerprint(concatenation, 0, 2.5) != (
+        clip_fingerprint(new_concatenation, 0, 2.5)
+    )
+
+    with pytest.raises(TypeError):
+        clip_fingerprint(clip.with_updated_frame_function(threading.Lock()))
+
+    # the readers of files are fingerprinted with the parameters of the frames
+    def reading_clip(reader):
+        return clip.with_updated_frame_function(reader.get_frame)
+
+    video = VideoFileClip("media/chaplin.mp4", audio=False)
+    same_video = VideoFileClip("media/chaplin.mp4", audio=False)
+    cropped_video = video.cropped(x2=100)
+    assert clip_fingerprint(reading_clip(video.reader)) == (
+        clip_fingerprint(reading_clip(same_video.reader))
+    )
+    assert clip_fingerprint(reading_clip(video.reader)) != (
+        clip_fingerprint(reading_clip(cropped_video.reader))
+    )
+
+    # the caches of the frames are not part of the fingerprint
+    video = VideoFileClip("media/transparent.webm", has_mask=True)
+    fingerprint = clip_fingerprint(video.mask)
+    video.get_frame(0.5)
+    video.mask.get_frame(0.5)
+    assert clip_fingerprint(video.mask) == fingerprint
+    for video_clip in (video, same_video, cropped_video):
+        video_clip.close()
+
+
+@pytest.mark.parametrize(
+    "ext, source_params",
+    (
+        # a timescale which isn't the one of the encoded pieces
+        ("mp4", ["-video_track_timescale", "90000"]),
+        # timestamps in milliseconds, in which 1/24s is rounded
+        ("webm", []),
+    ),
+)
+def test_write_videofile_smart_cut(util, ext, source_params):
+    source_filename = os.path.join(util.TMP_DIR, "smart_cut_source.%s" % ext)
+    filename = os.path.join(util.TMP_DIR, "smart_cut.%s" % ext)
+    reference_filename = os.path.join(util.TMP_DIR, "smart_cut_reference.%s" % ext)
+    # each frame has its own color
+    source = VideoClip(
+        lambda t: np.full((16, 32, 3), round(t * 24) % 32 * 8, dtype="uint8"),
+        duration=3,
+    )
+    # a keyframe every second
+    source.write_videofile(
+        source_filename,
+        fps=24,
+        ffmpeg_params=["-g", "24", "-sc_threshold", "0"] + source_params,
+        logger=None,
+    )
+    source = VideoFileClip(source_filename)
+    title = ColorClip(source.size, color=(255, 0, 0), duration=0.5)
+    clip = concatenate_videoclips(
+        [source.subclipped(0.5, 2.5), title, source.subclipped(1, 2)]
+    )
+
+    pieces, codec, pixel_format = smart_cut_pieces(clip, 24)
+    assert pixel_format == "yuv420p"
+    assert [(indices.start, indices.stop, piece) for indices, piece in pieces] == [
+        (0, 12, None),
+        (12, 36, (source_filename, 1.0)),
+        (36, 60, None),
+        (60, 84, (source_filename, 1.0)),
+    ]
+
+    # the video has the frames, fps and duration of the one rendered normally
+    clip.write_videofile(filename, smart_cut=True, logger=None)
+    clip.write_videofile(reference_filename, logger=None)
+    result = VideoFileClip(filename)
+    reference = VideoFileClip(reference_filename)
+    assert result.fps == reference.fps == 24
+    assert result.reader.n_frames == reference.reader.n_frames == 84
+    assert result.duration == reference.duration
+    for frame_index in range(84):
+        t = frame_index / 24
+        error = abs(result.get_frame(t).astype(int) - reference.get_frame(t)).max()
+        assert error < 4
+    result.close()
+    reference.close()
+    assert not [name for name in os.listdir(util.TMP_DIR) if "wvf_cut" in name]
+
+    with pytest.raises(ValueError, match="fps"):
+        smart_cut_pieces(clip, 12)
+    with pytest.raises(ValueError, match="span"):
+        smart_cut_pieces(source.with_effects([vfx.MirrorX()]), 24)
+    source.close()
+
+
 def test_write_file_with_spaces(util):
     filename = os.path.join(util.TMP_DIR, "name with spaces.mp4")
     clip = ColorClip((1, 1), color=1, is_mask=True).with_fps(1).with_duration(0.3)
@@ -4,6 +4,7 @@ import contextlib
 import importlib
 import io
 import os
+import random
 import shutil
 import sys
 
@@ -91,6 +92,28 @@ def test_cross_platform_popen_params(os_name, monkeypatch):
     assert len(params) == (1 if os_name == "nt" else 0)
 
 
+def test_interval_tree():
+    random.seed(0)
+    starts = [random.uniform(0, 20) for _ in range(200)]
+    ends = [
+        None if i % 50 == 0 else start + random.uniform(0, 2)
+        for i, start in enumerate(starts)
+    ]
+    ends[1] = starts[1]  # empty intervals never overlap anything
+    tree = tools.IntervalTree(starts, ends)
+
+    def is_overlapping(i, t_start, t_end):
+        end = float("inf") if ends[i] is None else ends[i]
+        return end > starts[i] and starts[i] <= t_end and end > t_start
+
+    for t in [-1, 0, starts[5], ends[7], 10.5, 25]:
+        expected = [i for i in range(200) if is_overlapping(i, t, t)]
+        assert tree.overlapping(t) == expected
+        expected = [i for i in range(200) if is_overlapping(i, t, t + 0.5)]
+        assert tree.overlapping(t, t + 0.5) == expected
+    assert tools.IntervalTree([], []).overlapping(0) == []
+
+
 @pytest.mark.parametrize("old_name", ("bar", "foo"))
 def test_deprecated_version_of(old_name):
     def to_file(*args, **kwargs):